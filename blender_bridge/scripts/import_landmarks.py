@@ -113,6 +113,8 @@ class LandmarkImporter:
         try:
             with open(filepath, 'r', encoding='utf-8') as f:
                 data = json.load(f)
+            if data.get('layout') == 'columnar':
+                data = self._expand_columnar(data)
             
             print(f"Loaded landmarks from {filepath}")
             print(f"Format: {data.get('format', 'unknown')}")
@@ -123,6 +125,19 @@ class LandmarkImporter:
             print(f"Error loading landmarks: {e}")
             return {}
     
+    @staticmethod
+    def _expand_columnar(data: Dict) -> Dict:
+        """columnar 形式（x / y / visibility の並列配列）をフレームごとの landmarks リストに展開"""
+        landmarks = []
+        for frame, ts, xs, ys, vs in zip(data['frames'], data['timestamps'], data['x'], data['y'], data['visibility']):
+            landmarks.append({
+                'frame': frame,
+                'timestamp': ts,
+                'landmarks': [{'id': i, 'x': x, 'y': y, 'visibility': v}
+                              for i, (x, y, v) in enumerate(zip(xs, ys, vs))],
+            })
+        return {**data, 'landmarks': landmarks}
+
     def find_or_create_armature(self, name: str = "Human") -> Optional['bpy.types.Object']:
         """アーマチュアオブジェクトを検索または作成"""
         # 既存のアーマチュアを検索
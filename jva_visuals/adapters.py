@@ -18,6 +18,20 @@ class AdaptedLandmarks:
     px2m: float  # pixel to meter conversion factor
     frame_shape: tuple  # (height, width)
 
+    @classmethod
+    def zeros(cls, right_wrist: Optional[tuple], fps: float, px2m: float,
+              frame_shape: tuple) -> "AdaptedLandmarks":
+        """全点が (0, 0, 不可視) のランドマーク。points は共有の読み取り専用配列なので毎回確保しない
+
+        points に書き込むと ValueError になる。書き換える場合は points.copy() を使うこと。
+        """
+        return cls(_ZERO_POINTS, right_wrist, fps, px2m, frame_shape)
+
+
+# AdaptedLandmarks.zeros() が共有する全ゼロの points（書き込み不可にして使い回す）
+_ZERO_POINTS = np.zeros((33, 3), dtype=np.float32)
+_ZERO_POINTS.setflags(write=False)
+
 
 def adapt_state(state: Dict[str, Any], fps: float = 30.0, height_m: Optional[float] = None, 
                 frame_shape: tuple = (480, 640)) -> AdaptedLandmarks:
@@ -6,8 +6,9 @@ heatmap.py - ヒートマップ描画モジュール
 
 import numpy as np
 import cv2
-from typing import Dict, Any, Tuple, Optional
+from typing import Deque, Dict, Any, Tuple, Optional
 import logging
+from collections import deque
 
 from .registry import VisualPassBase
 from .adapters import AdaptedLandmarks
@@ -19,6 +20,8 @@ logger = logging.getLogger(__name__)
 class HeatmapPass(VisualPassBase):
     """速度ヒートマップの描画"""
     
+    supports_downscale = True  # ぼかしたスポットなので縮小フレームに描いても見た目が変わらない
+    
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         
@@ -51,8 +54,8 @@ class HeatmapPass(VisualPassBase):
         
         # 動的スケール調整
         self.adaptive_scale = config.get("adaptive_scale", True)
-        self.speed_history = []
         self.max_history_length = 60  # 2秒分のフレーム数
+        self.speed_history: Deque[float] = deque(maxlen=self.max_history_length)
         
         self.frame_count = 0
         # キャリブレーション済み px2m キャッシュ
@@ -95,11 +98,7 @@ class HeatmapPass(VisualPassBase):
         valid_speeds = speeds[speeds > 0]
         if len(valid_speeds) > 0:
             max_speed = np.max(valid_speeds)
-            self.speed_history.append(max_speed)
-        
-        # 履歴長さ制限
-        if len(self.speed_history) > self.max_history_length:
-            self.speed_history = self.speed_history[-self.max_history_length:]
+            self.speed_history.append(max_speed)  # 履歴長は deque の maxlen で制限
     
     def _get_speed_scale(self) -> Tuple[float, float]:
         """現在の速度スケールを取得"""
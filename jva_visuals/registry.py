@@ -7,6 +7,8 @@ registry.py - 可視化パスの登録と管理
 
 import logging
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 from typing import List, Dict, Any, Optional
 import numpy as np
 import cv2
@@ -19,6 +21,16 @@ logger = logging.getLogger(__name__)
 class VisualPassBase(ABC):
     """可視化パスの基底クラス"""
     
+    # True のパスは VisualPipeline(parallel=True) で他の True のパスと並列に適用できる。
+    # 条件: 入力フレームを書き換えず、描画で変わる画素が小さな領域に限られること
+    # （全面に色を重ねるヒートマップや、前のパスの描画結果を読む HUD は False のまま）
+    parallel_safe = False
+    
+    # True のパスは VisualPipeline(render_scale<1) で縮小フレームに描いてから拡大合成できる。
+    # 条件: 描画が整数画素座標の線や点で、全解像度でなくても見た目が保てること
+    # （文字の読みやすさが要る HUD などは False のまま）
+    supports_downscale = False
+    
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.enabled = config.get("enabled", True)
@@ -75,13 +87,28 @@ class VisualPassRegistry:
             "glow_trail"  # 最後に適用（最前面）
         ]
         
+        # 通常の軌跡と光軌跡が両方有効で、間に描くパスが1つもなければ、1つの CombinedTrailPass に
+        # まとめる（間にパスがあると重なり順が変わるので分けたままにする。fuse_trails: false で常に分ける）
+        between = pass_order[pass_order.index("wrist_trail") + 1:pass_order.index("glow_trail")]
+        fuse_trails = bool(visuals_config.get("wrist_trail") and visuals_config.get("glow_trail")
+                           and visuals_config.get("fuse_trails", True)
+                           and not any(visuals_config.get(name, False) for name in between))
+        
         for pass_name in pass_order:
+            if fuse_trails and pass_name == "wrist_trail":
+                continue  # glow_trail の位置で一緒に描く
             if visuals_config.get(pass_name, False):
                 pass_config = visuals_config.get(f"{pass_name}_cfg", {})
                 pass_config["fps"] = fps
                 pass_config["height_m"] = height_m
                 
-                visual_pass = VisualPassRegistry._create_pass(pass_name, pass_config)
+                if fuse_trails and pass_name == "glow_trail":
+                    trail_config = visuals_config.get("wrist_trail_cfg", {})
+                    trail_config["fps"] = fps
+                    trail_config["height_m"] = height_m
+                    visual_pass = VisualPassRegistry._create_combined_trail(trail_config, pass_config)
+                else:
+                    visual_pass = VisualPassRegistry._create_pass(pass_name, pass_config)
                 if visual_pass and visual_pass.is_enabled():
                     passes.append(visual_pass)
                     logger.info(f"Enabled visual pass: {pass_name}")
@@ -89,6 +116,17 @@ class VisualPassRegistry:
         logger.info(f"Created {len(passes)} visual passes")
         return passes
     
+    @staticmethod
+    def _create_combined_trail(trail_config: Dict[str, Any],
+                               glow_config: Dict[str, Any]) -> Optional[VisualPassBase]:
+        """wrist_trail と glow_trail をまとめた CombinedTrailPass を作成"""
+        try:
+            from .trails import CombinedTrailPass
+            return CombinedTrailPass(trail_config, glow_config)
+        except Exception as e:
+            logger.error(f"Failed to create combined trail pass: {e}")
+            return None
+    
     @staticmethod
     def _create_pass(pass_name: str, config: Dict[str, Any]) -> Optional[VisualPassBase]:
         """個別の可視化パスを作成"""
@@ -126,13 +164,42 @@ class VisualPassRegistry:
 
 
 class VisualPipeline:
-    """可視化パイプライン"""
+    """可視化パイプライン
+
+    parallel=True なら、連続する parallel_safe なパスを同じ入力フレームに対してスレッドで
+    同時に適用し、それぞれが変えた画素をパスの順に書き戻す（OpenCV の描画は GIL を解放する）。
+    描画領域が重ならない限り順次適用と同じ結果になり、重なった画素は後のパスの描画で上書きされる
+    （順次適用のように前のパスの描画の上にブレンドはされない）。
+
+    render_scale < 1 なら、高さが 720 を超えるフレームでは supports_downscale なパスを
+    render_scale 倍に縮小したフレーム（INTER_AREA）に描き、変わった画素だけを拡大（INTER_LINEAR）して
+    書き戻す。線の太さや半径などの画素単位の設定は縮小フレーム上の値になる。
+
+    適用するパスとその有効・無効はパイプライン作成時に決まる（作成後に passes や enabled を
+    変えても反映されない）。順次・並列・縮小のどのモードでも同じパスを適用する。
+    """
+    
+    DOWNSCALE_MIN_HEIGHT = 720  # これ以下の高さのフレームは縮小しない
     
-    def __init__(self, passes: List[VisualPassBase]):
+    def __init__(self, passes: List[VisualPassBase], parallel: bool = False,
+                 max_workers: Optional[int] = None, render_scale: float = 1.0):
         self.passes = passes
+        self.parallel = parallel
+        self.render_scale = render_scale
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="jva-visual") if parallel else None
+        # 作成時に有効なパスだけを1回選んでおき、すべてのモードでこれを使う
+        # （毎フレームの is_enabled() 呼び出しや属性の引き直しをしない）
+        self._active = [p for p in passes if getattr(p, "is_enabled", lambda: True)()]
+        # 順次適用で回す (apply, パス名) の表
+        self._table = [(p.apply, type(p).__name__) for p in self._active]
+        # 縮小描画用の作業バッファ（フレームサイズが変わったら作り直す）
+        self._small_in: Optional[np.ndarray] = None
+        self._small_work: Optional[np.ndarray] = None
+        self._up: Optional[np.ndarray] = None
     
     def apply_all(self, frame: np.ndarray, state: Dict[str, Any], 
-                  fps: float = 30.0, height_m: Optional[float] = None) -> np.ndarray:
+                  fps: float = 30.0, height_m: Optional[float] = None,
+                  out: Optional[np.ndarray] = None) -> np.ndarray:
         """
         すべての可視化パスを順次適用
         
@@ -141,23 +208,158 @@ class VisualPipeline:
             state: PoseAnalyzer状態
             fps: フレームレート
             height_m: 身長（メートル）
+            out: 出力バッファ（frame と同形状）。指定時はコピーせずここへ書き込む
+                 （out is frame ならインプレースで処理）
         
         Returns:
             np.ndarray: 可視化適用後のフレーム
         """
-        if not self.passes:
+        if not self._active:
             return frame  # パスがない場合はそのまま返す
         
         # 状態を標準形式に変換
         landmarks = adapt_state(state, fps, height_m, frame.shape[:2])
         
         # 各パスを順次適用
-        result = frame.copy()
-        for visual_pass in self.passes:
+        if out is None:
+            result = frame.copy()
+        else:
+            if out is not frame:
+                np.copyto(out, frame)
+            result = out
+        if self._downscale_active(result):
+            return self._apply_with_downscale(result, landmarks)
+        if self.parallel:
+            return self._apply_grouped(self._active, result, landmarks)
+        for apply, name in self._table:
             try:
-                result = visual_pass.apply(result, landmarks)
+                result = apply(result, landmarks)
             except Exception as e:
-                logger.error(f"Error in visual pass {type(visual_pass).__name__}: {e}")
+                logger.error(f"Error in visual pass {name}: {e}")
+        return result
+    
+    def _apply_run(self, passes: List[VisualPassBase], result: np.ndarray,
+                   landmarks: AdaptedLandmarks) -> np.ndarray:
+        if self.parallel:
+            return self._apply_grouped(passes, result, landmarks)
+        for visual_pass in passes:
+            result = self._apply_one(visual_pass, result, landmarks)
+        return result
+    
+    @staticmethod
+    def _apply_one(visual_pass: VisualPassBase, frame: np.ndarray, landmarks: AdaptedLandmarks) -> np.ndarray:
+        try:
+            return visual_pass.apply(frame, landmarks)
+        except Exception as e:
+            logger.error(f"Error in visual pass {type(visual_pass).__name__}: {e}")
+            return frame
+    
+    def _apply_grouped(self, passes: List[VisualPassBase], result: np.ndarray,
+                       landmarks: AdaptedLandmarks) -> np.ndarray:
+        """parallel_safe なパスの連続区間はまとめて並列に、それ以外は順に適用する"""
+        group: List[VisualPassBase] = []
+        for visual_pass in passes + [None]:
+            if visual_pass is not None and getattr(visual_pass, "parallel_safe", False):
+                group.append(visual_pass)
+                continue
+            if len(group) == 1:
+                result = self._apply_one(group[0], result, landmarks)
+            elif group:
+                result = self._apply_parallel(group, result, landmarks)
+            group = []
+            if visual_pass is not None:
+                result = self._apply_one(visual_pass, result, landmarks)
+        return result
+    
+    def _apply_parallel(self, group: List[VisualPassBase], result: np.ndarray,
+                        landmarks: AdaptedLandmarks) -> np.ndarray:
+        def render(visual_pass):
+            out = self._apply_one(visual_pass, result, landmarks)
+            if out is result:
+                return None
+            return out, np.any(out != result, axis=2)  # このパスが変えた画素
+        
+        # 差分はすべて書き戻す前の result と比べる（書き戻しはパスの順に行う）
+        rendered = list(self._executor.map(render, group))
+        for item in rendered:
+            if item is not None:
+                out, mask = item
+                np.copyto(result, out, where=mask[..., None])
+        return result
+    
+    def _downscale_active(self, frame: np.ndarray) -> bool:
+        return 0 < self.render_scale < 1 and frame.shape[0] > self.DOWNSCALE_MIN_HEIGHT
+    
+    def _apply_with_downscale(self, result: np.ndarray, landmarks: AdaptedLandmarks) -> np.ndarray:
+        """supports_downscale なパスの連続区間は縮小フレームにまとめて描き、それ以外は全解像度で適用する"""
+        small_landmarks = None
+        run: List[VisualPassBase] = []
+        group: List[VisualPassBase] = []
+        for visual_pass in self._active + [None]:
+            downscale = visual_pass is not None and getattr(visual_pass, "supports_downscale", False)
+            if downscale:
+                if run:
+                    result = self._apply_run(run, result, landmarks)
+                    run = []
+                group.append(visual_pass)
                 continue
+            if group:
+                if small_landmarks is None:
+                    small_landmarks = self._scale_landmarks(landmarks, result.shape)
+                result = self._apply_downscaled(group, result, small_landmarks)
+                group = []
+            if visual_pass is not None:
+                run.append(visual_pass)
+        if run:
+            result = self._apply_run(run, result, landmarks)
+        return result
+    
+    def _small_size(self, shape) -> tuple:
+        h, w = shape[:2]
+        return max(1, int(round(w * self.render_scale))), max(1, int(round(h * self.render_scale)))
+    
+    def _scale_landmarks(self, landmarks: AdaptedLandmarks, shape) -> AdaptedLandmarks:
+        """ランドマークを縮小フレームの画素座標に合わせる（px2m は縮小画素あたりの長さにする）"""
+        sw, sh = self._small_size(shape)
+        sx, sy = sw / shape[1], sh / shape[0]
+        points = landmarks.points.copy()
+        points[:, 0] *= sx
+        points[:, 1] *= sy
+        right_wrist = landmarks.right_wrist
+        if right_wrist is not None:
+            right_wrist = (right_wrist[0] * sx, right_wrist[1] * sy)
+        return replace(landmarks, points=points, right_wrist=right_wrist,
+                       px2m=landmarks.px2m / self.render_scale, frame_shape=(sh, sw))
+    
+    def _apply_downscaled(self, group: List[VisualPassBase], result: np.ndarray,
+                          landmarks: AdaptedLandmarks) -> np.ndarray:
+        sw, sh = self._small_size(result.shape)
+        small_shape = (sh, sw) + result.shape[2:]
+        if self._small_in is None or self._small_in.shape != small_shape or self._up.shape != result.shape:
+            self._small_in = np.empty(small_shape, np.uint8)
+            self._small_work = np.empty(small_shape, np.uint8)
+            self._up = np.empty_like(result)
+        cv2.resize(result, (sw, sh), dst=self._small_in, interpolation=cv2.INTER_AREA)
+        np.copyto(self._small_work, self._small_in)
+        
+        small = self._small_work
+        for visual_pass in group:
+            small = self._apply_one(visual_pass, small, landmarks)
         
-        return result
\ No newline at end of file
+        # 縮小フレーム上で変わった画素だけを拡大して書き戻す（描画のない背景は全解像度のまま）
+        mask = small != self._small_in
+        if small.ndim == 3:
+            mask = mask.any(axis=2)
+        if not mask.any():
+            return result
+        h, w = result.shape[:2]
+        mask_up = cv2.resize(mask.view(np.uint8), (w, h), interpolation=cv2.INTER_NEAREST)
+        cv2.resize(small, (w, h), dst=self._up, interpolation=cv2.INTER_LINEAR)
+        cv2.copyTo(self._up, mask_up, result)
+        return result
+    
+    def close(self):
+        """並列モードのスレッドプールを終了する"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
\ No newline at end of file
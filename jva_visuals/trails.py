@@ -4,11 +4,14 @@ trails.py - 軌跡描画モジュール
 右手首の軌跡を描画する機能を提供。
 - WristTrailPass: 通常の軌跡
 - GlowTrailPass: 光るエフェクト付き軌跡
+- CombinedTrailPass: 通常の軌跡と光軌跡を1パスで描く
 """
 
 import numpy as np
 import cv2
-from typing import Dict, Any, List, Tuple
+from collections import deque
+from itertools import islice
+from typing import Deque, Dict, Any, List, Optional, Tuple
 import logging
 
 from .registry import VisualPassBase
@@ -20,6 +23,9 @@ logger = logging.getLogger(__name__)
 class WristTrailPass(VisualPassBase):
     """右手首軌跡の描画"""
     
+    parallel_safe = True  # 入力フレームはコピーしてから描く
+    supports_downscale = True  # 整数座標の折れ線だけなので縮小フレームに描ける
+    
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.max_trail_length = config.get("max_length", 200)
@@ -33,14 +39,75 @@ class WristTrailPass(VisualPassBase):
         self._released = False
         self._prev_wrist: Optional[Tuple[int, int]] = None
         
-        # 軌跡バッファ
-        self.trail_points: List[Tuple[int, int]] = []
+        # 軌跡バッファ: (max_length, 2) int32 のリングバッファ（_head が最古の点、_count が点数）
+        self._buf = np.empty((max(1, self.max_trail_length), 2), np.int32)
+        self._head = 0
+        self._count = 0
+    
+    @property
+    def trail_points(self) -> List[Tuple[int, int]]:
+        """軌跡の点列（古い順）。呼ぶたびにリストを作るので、描画では _ordered() を使う"""
+        return [tuple(p) for p in self._ordered().tolist()]
+    
+    @trail_points.setter
+    def trail_points(self, points):
+        self._head = self._count = 0
+        for x, y in points:
+            self._append(x, y)
+    
+    def _append(self, x: int, y: int):
+        """点を追加する。満杯なら最古の点を上書きする"""
+        cap = len(self._buf)
+        if self._count < cap:
+            self._buf[(self._head + self._count) % cap] = (x, y)
+            self._count += 1
+        else:
+            self._buf[self._head] = (x, y)
+            self._head = (self._head + 1) % cap
+    
+    def _extend(self, pts: np.ndarray):
+        """(n, 2) の点列をまとめて追加する。満杯を超えた分は最古の点から上書きする"""
+        cap = len(self._buf)
+        n = len(pts)
+        if n >= cap:
+            self._buf[:] = pts[n - cap:]
+            self._head, self._count = 0, cap
+            return
+        self._buf[(self._head + self._count + np.arange(n)) % cap] = pts
+        overflow = max(0, self._count + n - cap)
+        self._head = (self._head + overflow) % cap
+        self._count += n - overflow
+    
+    def _drop_oldest(self, n: int):
+        n = min(n, self._count)
+        self._head = (self._head + n) % len(self._buf)
+        self._count -= n
+    
+    def _ordered(self) -> np.ndarray:
+        """古い順の (count, 2) int32 配列。折り返していなければコピーせずビューを返す"""
+        cap = len(self._buf)
+        end = self._head + self._count
+        if end <= cap:
+            return self._buf[self._head:end]
+        return np.concatenate((self._buf[self._head:], self._buf[:end - cap]))
     
     def apply(self, frame: np.ndarray, landmarks: AdaptedLandmarks) -> np.ndarray:
         """軌跡を描画"""
         if not self.enabled:
             return frame
         
+        self._update_trail(landmarks)
+        
+        # 軌跡を描画
+        if self._count >= 2:
+            result = frame.copy()
+            self._draw_trail(result)
+            return result
+        
+        return frame
+    
+    def _update_trail(self, landmarks: AdaptedLandmarks):
+        """右手首の位置を軌跡に追加し、リリース後は古い点から消していく"""
         # 右手首の位置を取得
         right_wrist = landmarks.right_wrist
         h, w = landmarks.frame_shape
@@ -59,64 +126,75 @@ class WristTrailPass(VisualPassBase):
                         self._released = True
                 
                 if not self._released:
-                    self.trail_points.append(wrist_pos)
+                    self._append(*wrist_pos)  # max_length を超えたら最古の点が上書きされる
                 self._prev_wrist = wrist_pos
         
         # リリース後: 古い点を急速に削除してフェードアウト
-        if self._released and self.trail_points:
+        if self._released and self._count:
             # 1フレームに少なくとも max(8, 全体の1/8) 点を削除 → 約 8フレームで消える
-            remove_n = max(8, len(self.trail_points) // self.fade_frames)
-            self.trail_points = self.trail_points[remove_n:]
-        
-        # バッファサイズ制限
-        if len(self.trail_points) > self.max_trail_length:
-            self.trail_points = self.trail_points[-self.max_trail_length:]
+            self._drop_oldest(max(8, self._count // self.fade_frames))
+    
+    def apply_batch(self, frame: np.ndarray, xs: np.ndarray, ys: np.ndarray,
+                    frame_shape: Optional[Tuple[int, int]] = None) -> np.ndarray:
+        """点列 (xs, ys) をまとめて軌跡に追加して描画する（合成した軌跡の入力用）
+
+        フレーム外の点はマスクで一度に除き、残りをリングバッファへ一括で書き込む。
+        1点ずつの apply と違い、リリース検知は行わない（リリース済みなら点は追加しない）。
+        """
+        if not self.enabled:
+            return frame
+        h, w = frame_shape if frame_shape is not None else frame.shape[:2]
+        xs = np.asarray(xs).astype(np.int32)
+        ys = np.asarray(ys).astype(np.int32)
+        mask = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+        if not self._released and mask.any():
+            pts = np.stack((xs[mask], ys[mask]), axis=1)
+            self._extend(pts)
+            self._prev_wrist = (int(pts[-1, 0]), int(pts[-1, 1]))
         
-        # 軌跡を描画
-        if len(self.trail_points) >= 2:
+        if self._count >= 2:
             result = frame.copy()
             self._draw_trail(result)
             return result
-        
         return frame
     
     def _draw_trail(self, frame: np.ndarray):
-        """軌跡線を描画"""
-        if len(self.trail_points) < 2:
+        """軌跡線を描画（線分ごとの cv2.line ではなく cv2.polylines でまとめて描く）"""
+        if self._count < 2:
             return
-        
-        if self.fade_alpha:
+        self._draw_polyline(frame, self._ordered(), self.color, self.line_thickness, self.fade_alpha)
+    
+    @staticmethod
+    def _draw_polyline(frame: np.ndarray, pts: np.ndarray, color: Tuple[int, int, int],
+                       line_thickness: int, fade_alpha: bool):
+        """古い順の点列 pts (n, 2) を折れ線で描く。fade_alpha なら古い線分ほど細くして半透明に合成する"""
+        if fade_alpha:
             # フェード効果付きで描画
             overlay = frame.copy()
             
-            for i in range(1, len(self.trail_points)):
-                # 透明度を線形に変化（古い点ほど薄く）
-                alpha = i / len(self.trail_points)
-                thickness = max(1, int(self.line_thickness * alpha))
-                
-                cv2.line(overlay, 
-                        self.trail_points[i-1], 
-                        self.trail_points[i],
-                        self.color, 
-                        thickness,
-                        cv2.LINE_AA)
+            # 線分 i（点 i-1 → i）の太さは古いほど細い: max(1, int(thickness * i / n))。
+            # 太さは i について単調なので、同じ太さの線分は連続した1本の折れ線にまとまる
+            n = len(pts)
+            alpha = np.arange(1, n) / n
+            thickness = np.maximum(1, (line_thickness * alpha).astype(np.int64))
+            bounds = np.concatenate(([0], np.flatnonzero(np.diff(thickness)) + 1, [n - 1]))
+            for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+                cv2.polylines(overlay, [pts[start:end + 1]], False, color,
+                              int(thickness[start]), cv2.LINE_AA)
             
             # 半透明合成
             cv2.addWeighted(overlay, 0.6, frame, 0.4, 0, dst=frame)
         else:
             # 均一な太さで描画
-            for i in range(1, len(self.trail_points)):
-                cv2.line(frame,
-                        self.trail_points[i-1],
-                        self.trail_points[i], 
-                        self.color,
-                        self.line_thickness,
-                        cv2.LINE_AA)
+            cv2.polylines(frame, [pts], False, color, line_thickness, cv2.LINE_AA)
 
 
 class GlowTrailPass(WristTrailPass):
     """光軌跡エフェクト付きの手首軌跡"""
     
+    supports_downscale = False  # 最前面のエフェクトは全解像度で描く
+    SPEED_HISTORY_LENGTH = 30  # 速度履歴の保持フレーム数
+    
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.glow_radius = config.get("glow_radius", 15)
@@ -126,7 +204,7 @@ class GlowTrailPass(WristTrailPass):
         self.min_speed_threshold = config.get("min_speed_threshold", 5.0)  # px/s
         
         # 速度履歴
-        self.speed_history: List[float] = []
+        self.speed_history: Deque[float] = deque(maxlen=self.SPEED_HISTORY_LENGTH)
     
     def apply(self, frame: np.ndarray, landmarks: AdaptedLandmarks) -> np.ndarray:
         """光軌跡を描画"""
@@ -140,54 +218,69 @@ class GlowTrailPass(WristTrailPass):
         result = super().apply(frame, landmarks)
         
         # グロー効果を追加
-        if len(self.trail_points) >= 2:
+        if self._count >= 2:
             self._add_glow_effect(result)
         
         return result
     
     def _update_speed_history(self, landmarks: AdaptedLandmarks):
         """速度履歴を更新"""
-        if landmarks.right_wrist is not None and len(self.trail_points) >= 2:
+        if landmarks.right_wrist is not None and self._count >= 2:
             # 直近2点から速度を推定
-            recent_points = self.trail_points[-2:]
+            recent_points = self._ordered()[-2:].tolist()
             dx = recent_points[1][0] - recent_points[0][0]
             dy = recent_points[1][1] - recent_points[0][1]
             distance = np.sqrt(dx*dx + dy*dy)
             
             # px/sに変換
             speed = distance * landmarks.fps
-            self.speed_history.append(speed)
-            
-            # 履歴長制限
-            if len(self.speed_history) > 30:  
-                self.speed_history = self.speed_history[-30:]
+            self.speed_history.append(speed)  # maxlen を超えた分は deque が古い方から捨てる
         else:
             self.speed_history.append(0.0)
     
     def _add_glow_effect(self, frame: np.ndarray):
         """グロー効果を追加"""
-        if len(self.trail_points) < 5:  # 最低限の点数が必要
+        if self._count < 5:  # 最低限の点数が必要
             return
         
         # 速度応答の計算
-        avg_speed = np.mean(self.speed_history[-10:]) if self.speed_history else 0.0
+        avg_speed = np.mean(list(islice(reversed(self.speed_history), 10))) if self.speed_history else 0.0
         
         if self.speed_responsive and avg_speed < self.min_speed_threshold:
             return  # 速度が低い場合はグロー効果なし
         
         # グロー強度を速度に応じて調整
         if self.speed_responsive and self.speed_history:
-            max_recent_speed = max(self.speed_history[-5:])
+            max_recent_speed = max(islice(reversed(self.speed_history), 5))
             intensity_factor = min(1.0, max_recent_speed / 50.0)  # 50px/sで最大
         else:
             intensity_factor = 1.0
         
-        # グロー用のマスクを作成
+        # ガウシアンブラーのカーネルサイズ
+        blur_size = int(self.glow_radius * 1.5)
+        if blur_size % 2 == 0:
+            blur_size += 1
+        
+        # 直近の点群（ROI 内の座標に直して描く）
+        recent = self._ordered()[-15:]
+        
+        # グローが届くのは直近の点の外接矩形 + 線の太さ + ブラー半径の範囲だけなので、
+        # マスク作成・ブラー・合成はその ROI に限る。余白をブラー半径以上とっているので、
+        # ROI の端での折り返しもフレーム全体でブラーした場合と同じ値になる
         h, w = frame.shape[:2]
-        glow_mask = np.zeros((h, w), dtype=np.uint8)
+        pad = max(2, self.glow_radius) + 2 + blur_size // 2
+        x0, y0 = (recent.min(axis=0) - pad).clip(0).tolist()
+        x1, y1 = (recent.max(axis=0) + pad + 1).tolist()
+        x1, y1 = min(x1, w), min(y1, h)
+        if x1 <= x0 or y1 <= y0:
+            return
+        roi = frame[y0:y1, x0:x1]
+        
+        # グロー用のマスクを作成
+        glow_mask = np.zeros(roi.shape[:2], dtype=np.uint8)
         
         # 直近の点群を太い線で描画
-        recent_points = self.trail_points[-min(15, len(self.trail_points)):]
+        recent_points = [tuple(p) for p in (recent - (x0, y0)).tolist()]
         
         for i in range(1, len(recent_points)):
             # 点の新しさに応じて太さを調整
@@ -203,14 +296,10 @@ class GlowTrailPass(WristTrailPass):
                     cv2.LINE_AA)
         
         # ガウシアンブラーでグロー効果を作成
-        blur_size = int(self.glow_radius * 1.5)
-        if blur_size % 2 == 0:
-            blur_size += 1
-        
         blurred_mask = cv2.GaussianBlur(glow_mask, (blur_size, blur_size), 0)
         
         # カラーマスクに変換
-        glow_colored = np.zeros_like(frame)
+        glow_colored = np.zeros_like(roi)
         glow_colored[:, :, 0] = (blurred_mask * self.glow_color[0] / 255).astype(np.uint8)
         glow_colored[:, :, 1] = (blurred_mask * self.glow_color[1] / 255).astype(np.uint8)
         glow_colored[:, :, 2] = (blurred_mask * self.glow_color[2] / 255).astype(np.uint8)
@@ -220,41 +309,80 @@ class GlowTrailPass(WristTrailPass):
         glow_normalized = (blurred_mask / 255.0 * alpha).astype(np.float32)
         
         for c in range(3):
-            frame_c = frame[:, :, c].astype(np.float32)
+            frame_c = roi[:, :, c].astype(np.float32)
             glow_c = glow_colored[:, :, c].astype(np.float32)
             
             # 加算合成（オーバーフロー制限）
             result_c = frame_c + glow_c * glow_normalized
-            frame[:, :, c] = np.clip(result_c, 0, 255).astype(np.uint8)
+            roi[:, :, c] = np.clip(result_c, 0, 255).astype(np.uint8)
+
+
+class CombinedTrailPass(GlowTrailPass):
+    """wrist_trail と glow_trail を1つのパスで描く
+
+    2つのパスに分けると、同じ手首の点列をそれぞれのバッファに積み、フレームのコピーと描画を
+    2回行うことになる。ここでは点列のリングバッファを1つにまとめ、1枚のコピーに
+    基本軌跡 → 光軌跡の線 → グローの順で描く。リリース検知とグローは glow_config に従う。
+    """
+    
+    def __init__(self, trail_config: Dict[str, Any], glow_config: Dict[str, Any]):
+        super().__init__(glow_config)
+        self.base_enabled = trail_config.get("enabled", True)
+        self.base_max_length = trail_config.get("max_length", 200)
+        self.base_thickness = trail_config.get("thickness", 2)
+        self.base_color = tuple(trail_config.get("color", (255, 255, 255)))
+        self.base_fade_alpha = trail_config.get("fade_alpha", True)
+        # 共有バッファは長い方の軌跡に合わせる（各軌跡は末尾から自分の長さ分だけ描く）
+        self._buf = np.empty((max(1, self.max_trail_length, self.base_max_length), 2), np.int32)
+    
+    def apply(self, frame: np.ndarray, landmarks: AdaptedLandmarks) -> np.ndarray:
+        """基本軌跡と光軌跡を描画"""
+        if not self.enabled:
+            return frame
+        
+        self._update_speed_history(landmarks)
+        self._update_trail(landmarks)
+        if self._count < 2:
+            return frame
+        
+        result = frame.copy()
+        pts = self._ordered()
+        base_pts = pts[-self.base_max_length:]
+        if self.base_enabled and len(base_pts) >= 2:
+            self._draw_polyline(result, base_pts, self.base_color, self.base_thickness, self.base_fade_alpha)
+        glow_pts = pts[-self.max_trail_length:]
+        if len(glow_pts) >= 2:
+            self._draw_polyline(result, glow_pts, self.color, self.line_thickness, self.fade_alpha)
+            self._add_glow_effect(result)
+        return result
 
 
 class TrailManager:
     """複数の軌跡を管理するユーティリティクラス"""
     
     def __init__(self):
-        self.trails: Dict[str, List[Tuple[int, int]]] = {}
+        # 軌跡ごとに maxlen 付きの deque を持つ（超えた分は左端から O(1) で落ちる）
+        self.trails: Dict[str, Deque[Tuple[int, int]]] = {}
         self.max_trail_length = 200
     
     def add_point(self, trail_name: str, point: Tuple[int, int]):
         """軌跡に点を追加"""
-        if trail_name not in self.trails:
-            self.trails[trail_name] = []
-        
-        self.trails[trail_name].append(point)
+        trail = self.trails.get(trail_name)
+        if trail is None or trail.maxlen != self.max_trail_length:
+            # 新しい軌跡、または max_trail_length が変更された（末尾の点を残して作り直す）
+            trail = self.trails[trail_name] = deque(trail or (), maxlen=self.max_trail_length)
         
-        # 長さ制限
-        if len(self.trails[trail_name]) > self.max_trail_length:
-            self.trails[trail_name] = self.trails[trail_name][-self.max_trail_length:]
+        trail.append(point)
     
     def get_trail(self, trail_name: str) -> List[Tuple[int, int]]:
         """軌跡を取得"""
-        return self.trails.get(trail_name, [])
+        return list(self.trails.get(trail_name, ()))
     
     def clear_trail(self, trail_name: str):
         """軌跡をクリア"""
         if trail_name in self.trails:
-            self.trails[trail_name] = []
+            self.trails[trail_name].clear()
     
     def clear_all(self):
         """すべての軌跡をクリア"""
-        self.trails.clear()
\ No newline at end of file
+        self.trails.clear()
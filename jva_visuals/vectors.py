@@ -19,6 +19,8 @@ logger = logging.getLogger(__name__)
 class VectorPass(VisualPassBase):
     """速度・加速度ベクトルの描画"""
     
+    parallel_safe = True  # 入力フレームはコピーしてから描く
+    
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         
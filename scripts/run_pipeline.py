@@ -1,7 +1,19 @@
 import os
 import glob
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import cv2
+import numpy as np
 from src.pipelines.pose_analysis import PoseAnalyzer
+from src.io.video_reader import open_video_capture
+from src.io.video_writer import open_video_writer
+
+# PNG 連番の非同期書き出し: 圧縮レベル 1（既定 3 より大幅に速い）と同時書き込み数の上限
+PNG_PARAMS = [cv2.IMWRITE_PNG_COMPRESSION, 1]
+PNG_MAX_IN_FLIGHT = 16
+
+cv2.setUseOptimized(True)
 
 def run_pipeline(input_video_path, output_stem, export_rgba_sequence=False):
     if not os.path.exists(input_video_path):
@@ -9,7 +21,7 @@ def run_pipeline(input_video_path, output_stem, export_rgba_sequence=False):
         return
 
     print(f"Processing: {input_video_path}")
-    cap = cv2.VideoCapture(input_video_path)
+    cap = open_video_capture(input_video_path)
     if not cap.isOpened():
         print(f"Error: Could not open video {input_video_path}")
         return
@@ -20,10 +32,17 @@ def run_pipeline(input_video_path, output_stem, export_rgba_sequence=False):
     if not fps or fps <= 0:
         fps = 30.0
 
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out_basic   = cv2.VideoWriter(f"{output_stem}_pose_basic.mp4",    fourcc, fps, (width, height))
-    out_heatmap = cv2.VideoWriter(f"{output_stem}_pose_heatmap.mp4",  fourcc, fps, (width, height))
-    out_stick   = cv2.VideoWriter(f"{output_stem}_pose_stickman_green.mp4", fourcc, fps, (width, height))
+    # ffmpeg があれば HW エンコーダへのパイプ、なければ cv2.VideoWriter
+    out_basic   = open_video_writer(f"{output_stem}_pose_basic.mp4",    width, height, fps)
+    out_heatmap = open_video_writer(f"{output_stem}_pose_heatmap.mp4",  width, height, fps)
+    out_stick   = open_video_writer(f"{output_stem}_pose_stickman_green.mp4", width, height, fps)
+    if out_basic is None or out_heatmap is None or out_stick is None:
+        print(f"Error: Could not create output videos for {output_stem}")
+        for w in (out_basic, out_heatmap, out_stick):
+            if w is not None:
+                w.release()
+        cap.release()
+        return
 
     rgba_dir = f"{output_stem}_pose_stickman_rgba"
     if export_rgba_sequence:
@@ -32,28 +51,52 @@ def run_pipeline(input_video_path, output_stem, export_rgba_sequence=False):
     analyzer = PoseAnalyzer()
     frame_count = 0
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        state = analyzer.process(frame, fps)
-
-        basic_frame   = analyzer.render_basic(frame, state)
-        heatmap_frame = analyzer.render_heatmap(frame, state)
-        stick_frame   = analyzer.render_stickman(frame.shape, state, background='green')
-
-        out_basic.write(basic_frame)
-        out_heatmap.write(heatmap_frame)
-        out_stick.write(stick_frame)
-
-        if export_rgba_sequence:
-            rgba = analyzer.render_stickman_rgba(frame.shape, state)
-            cv2.imwrite(os.path.join(rgba_dir, f"{frame_count:06d}.png"), rgba)
-
-        frame_count += 1
-        if frame_count % 30 == 0:
-            print(f"  Processed {frame_count} frames...")
+    def _render_and_write(writer, render, *args, **kwargs):
+        writer.write(render(*args, **kwargs))
+
+    # 描画先はストリームごとに1枚を使い回す（各フレームの書き出し完了を待ってから次を描くので上書きされない）
+    heatmap_buf = np.empty((height, width, 3), np.uint8)
+    stick_buf = np.empty((height, width, 3), np.uint8)
+
+    png_slots = threading.BoundedSemaphore(PNG_MAX_IN_FLIGHT)
+    png_failed = []
+
+    def _write_png(path, rgba):
+        try:
+            if not cv2.imwrite(path, rgba, PNG_PARAMS):
+                png_failed.append(path)
+        finally:
+            png_slots.release()
+
+    # 3種の描画は同じ state を読むだけなので並列に描画・書き出しする
+    # （OpenCV の描画・エンコードは GIL を解放する）。フレームごとに全完了を待つので順序は保たれる
+    # PNG は別プールで書き出し、zlib 圧縮をメインループから外す
+    with ThreadPoolExecutor(max_workers=3) as executor, ThreadPoolExecutor(max_workers=4) as png_pool:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            state = analyzer.process(frame, fps)
+
+            futures = [
+                executor.submit(_render_and_write, out_basic, analyzer.render_basic, frame, state),
+                executor.submit(_render_and_write, out_heatmap, analyzer.render_heatmap, frame, state, out=heatmap_buf),
+                executor.submit(_render_and_write, out_stick, analyzer.render_stickman, frame.shape, state, 'green',
+                                out=stick_buf),
+            ]
+
+            if export_rgba_sequence:
+                rgba = analyzer.render_stickman_rgba(frame.shape, state)
+                png_slots.acquire()  # 書き込み待ちが溜まりすぎたらここで待つ
+                png_pool.submit(_write_png, os.path.join(rgba_dir, f"{frame_count:06d}.png"), rgba)
+
+            for fut in futures:
+                fut.result()
+
+            frame_count += 1
+            if frame_count % 30 == 0:
+                print(f"  Processed {frame_count} frames...")
 
     cap.release()
     out_basic.release()
@@ -66,8 +109,20 @@ def run_pipeline(input_video_path, output_stem, export_rgba_sequence=False):
     print(f"Saved: {output_stem}_pose_stickman_green.mp4")
     if export_rgba_sequence:
         print(f"Saved RGBA PNG sequence: {rgba_dir}\\%06d.png")
+        if png_failed:
+            print(f"Warning: failed to write {len(png_failed)} PNG files (e.g. {png_failed[0]})")
+
+def _init_worker(cv2_threads):
+    # OpenCV は コア数 / ワーカー数 に絞って取り合いを防ぐ
+    # （OpenMP / OpenBLAS のスレッド数は起動前に親の環境変数で渡す。ここでは読み込み済みで効かない）
+    cv2.setUseOptimized(True)
+    cv2.setNumThreads(cv2_threads)
 
-def process_all_videos(input_dir, output_dir):
+def _run_pipeline_worker(input_video_path, output_stem):
+    run_pipeline(input_video_path, output_stem, export_rgba_sequence=False)  # TrueでPNG透過も出力
+    return input_video_path
+
+def process_all_videos(input_dir, output_dir, max_workers=None):
     os.makedirs(output_dir, exist_ok=True)
     video_files = glob.glob(os.path.join(input_dir, "*.mp4"))
     if not video_files:
@@ -78,12 +133,40 @@ def process_all_videos(input_dir, output_dir):
     for video_file in video_files:
         print(f"  - {os.path.basename(video_file)}")
 
-    for i, input_video_path in enumerate(video_files, 1):
-        filename = os.path.basename(input_video_path)
-        name, _ = os.path.splitext(filename)
-        output_stem = os.path.join(output_dir, name)
-        print(f"\n[{i}/{len(video_files)}] Processing: {filename}")
-        run_pipeline(input_video_path, output_stem, export_rgba_sequence=False)  # TrueでPNG透過も出力
+    output_stems = [
+        os.path.join(output_dir, os.path.splitext(os.path.basename(p))[0]) for p in video_files
+    ]
+    if max_workers is None:
+        max_workers = max(1, (os.cpu_count() or 2) // 2)
+    max_workers = min(max_workers, len(video_files))
+
+    if max_workers <= 1:
+        for i, (input_video_path, output_stem) in enumerate(zip(video_files, output_stems), 1):
+            print(f"\n[{i}/{len(video_files)}] Processing: {os.path.basename(input_video_path)}")
+            _run_pipeline_worker(input_video_path, output_stem)
+        return
+
+    # 動画単位でプロセス並列。MediaPipe は fork 安全でないので spawn で起動し、
+    # PoseAnalyzer は各ワーカーの run_pipeline 内で個別に生成される
+    print(f"Processing with {max_workers} worker processes")
+    ctx = multiprocessing.get_context("spawn")
+    cv2_threads = max(1, (os.cpu_count() or 1) // max_workers)
+    # spawn の子プロセスは initializer より前にメインモジュール（cv2 / numpy / MediaPipe）を読み込むので、
+    # ワーカー内の OpenMP（MediaPipe/TFLite）・OpenBLAS を 1 本にする設定は親の環境変数で継承させる
+    thread_env = {"OMP_NUM_THREADS": "1", "OPENBLAS_NUM_THREADS": "1"}
+    saved_env = {k: os.environ.get(k) for k in thread_env}
+    os.environ.update(thread_env)
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx, initializer=_init_worker,
+                                 initargs=(cv2_threads,)) as ex:
+            for i, done in enumerate(ex.map(_run_pipeline_worker, video_files, output_stems), 1):
+                print(f"[{i}/{len(video_files)}] Done: {os.path.basename(done)}")
+    finally:
+        for k, v in saved_env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
 
 if __name__ == "__main__":
     input_directory = "input"
@@ -7,8 +7,6 @@ server/app.py — Javelin Video Analysis: Minimal SaaS API (FastAPI + S3)
 環境変数:
     AWS_REGION      (default: ap-northeast-1)
     JVA_BUCKET      S3バケット名 (default: your-bucket-name)
-    JVA_RUN_PY      run.py への絶対パス (default: このファイルの親ディレクトリの run.py)
-    JVA_PYTHON      Python 実行ファイルのパス (default: sys.executable)
 """
 
 from __future__ import annotations
@@ -16,19 +14,25 @@ from __future__ import annotations
 import json
 import logging
 import os
+import queue
 import shutil
 import sys
 import tempfile
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from subprocess import CalledProcessError, run as subprocess_run
 from typing import Any, Dict, List, Optional
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, Response
 
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
 logger = logging.getLogger("jva.server")
 
 # ── 設定 ─────────────────────────────────────────────────────────────────────
@@ -36,14 +40,14 @@ logger = logging.getLogger("jva.server")
 APP_REGION: str = os.getenv("AWS_REGION", "ap-northeast-1")
 BUCKET: str = os.getenv("JVA_BUCKET", "your-bucket-name")
 _REPO_ROOT: Path = Path(__file__).resolve().parent.parent
-RUN_PY: str = os.getenv("JVA_RUN_PY", str(_REPO_ROOT / "run.py"))
-PYTHON_BIN: str = os.getenv("JVA_PYTHON", sys.executable)
+_UPLOAD_WORKERS: int = 8
 
 # ── S3 クライアント（AWS 認証情報なしの場合は None のまま起動を継続）────────
 
 try:
     import boto3
     import botocore.exceptions as _botocore_exc
+    from boto3.s3.transfer import S3Transfer, TransferConfig
 
     _s3_client = boto3.client("s3", region_name=APP_REGION)
 except ImportError:
@@ -144,7 +148,10 @@ def _presign_put(
 def _put_status(job_id: str, status: Dict[str, Any]) -> None:
     """status.json を S3 へアップロードする。失敗時はログのみ。"""
     try:
-        body = json.dumps(status, ensure_ascii=False).encode("utf-8")
+        if orjson is not None:
+            body = orjson.dumps(status)
+        else:
+            body = json.dumps(status, ensure_ascii=False).encode("utf-8")
         _s3().put_object(
             Bucket=BUCKET,
             Key=_status_key(job_id),
@@ -173,25 +180,40 @@ def _upload_results(job_id: str, local_out_dir: str) -> Dict[str, Any]:
     summary_key: Optional[str] = None
     zip_keys: List[str] = []
 
+    uploads: List[tuple] = []
     for root, _, files in os.walk(local_out_dir):
         for fname in files:
             local_path = os.path.join(root, fname)
             rel = os.path.relpath(local_path, local_out_dir).replace("\\", "/")
-            s3_key = prefix + rel
-            try:
-                _s3().upload_file(local_path, BUCKET, s3_key)
-                logger.debug("[%s] uploaded: %s", job_id, s3_key)
-            except Exception as exc:
-                logger.warning("[%s] アップロード失敗 %s: %s", job_id, s3_key, exc)
-                continue
-            # 主要ファイルの分類
-            lower = fname.lower()
-            if lower.endswith(".pdf"):
-                report_pdf_key = s3_key
-            elif lower == "analysis_summary.json":
-                summary_key = s3_key
-            elif lower.endswith(".zip"):
-                zip_keys.append(s3_key)
+            uploads.append((fname, local_path, prefix + rel))
+
+    # 動画・JSON・PDF を並列にアップロードする（大きい動画は S3Transfer がマルチパートで分割）
+    transfer = S3Transfer(_s3(), TransferConfig(max_concurrency=10, multipart_threshold=8 * 1024 * 1024))
+
+    def _upload(item: tuple) -> bool:
+        _, local_path, s3_key = item
+        try:
+            transfer.upload_file(local_path, BUCKET, s3_key)
+            logger.debug("[%s] uploaded: %s", job_id, s3_key)
+            return True
+        except Exception as exc:
+            logger.warning("[%s] アップロード失敗 %s: %s", job_id, s3_key, exc)
+            return False
+
+    with ThreadPoolExecutor(max_workers=_UPLOAD_WORKERS) as pool:
+        results = list(pool.map(_upload, uploads))
+
+    for (fname, _, s3_key), ok in zip(uploads, results):
+        if not ok:
+            continue
+        # 主要ファイルの分類
+        lower = fname.lower()
+        if lower.endswith(".pdf"):
+            report_pdf_key = s3_key
+        elif lower == "analysis_summary.json":
+            summary_key = s3_key
+        elif lower.endswith(".zip"):
+            zip_keys.append(s3_key)
 
     return {
         "result_prefix": prefix,
@@ -201,6 +223,31 @@ def _upload_results(job_id: str, local_out_dir: str) -> Dict[str, Any]:
     }
 
 
+# ── 解析エンジン（プロセス内呼び出し） ─────────────────────────────────────────
+
+_analysis_module: Any = None
+# 初期化済み PoseAnalyzer のプール。MediaPipe グラフの構築をジョブごとに繰り返さず、
+# 同時に走るジョブ同士では同じインスタンスを共有しない（状態を持つため）
+_analyzer_pool: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+
+
+def _analysis() -> Any:
+    """jva.run を初回ジョブ時に import して保持する。
+
+    ジョブごとに `python run.py` を起動すると MediaPipe / OpenCV / numpy の
+    import（数秒）を毎回払うため、サーバープロセス内で一度だけ読み込んで使い回す。
+    """
+    global _analysis_module
+    if _analysis_module is None:
+        src_path = str(_REPO_ROOT / "src")
+        if src_path not in sys.path:
+            sys.path.insert(0, src_path)
+        from jva import run as jva_run
+
+        _analysis_module = jva_run
+    return _analysis_module
+
+
 # ── バックグラウンドジョブ ─────────────────────────────────────────────────────
 
 def _run_job(job_id: str, input_key: str) -> None:
@@ -226,15 +273,21 @@ def _run_job(job_id: str, input_key: str) -> None:
         except Exception as dl_err:
             raise RuntimeError(f"入力動画のダウンロードに失敗: {dl_err}") from dl_err
 
-        # ── 解析実行（標準形式） ──────────────────────────────────────────────
-        cmd = [
-            PYTHON_BIN, RUN_PY,
-            "--input",      local_in,
-            "--output-dir", local_out_dir,
-            "--all-variants",
-        ]
-        logger.info("[%s] 解析開始: %s", job_id, " ".join(cmd))
-        subprocess_run(cmd, check=True)
+        # ── 解析実行（run.py --all-variants と同じ出力をプロセス内で生成） ─────
+        jva_run = _analysis()
+        config = jva_run.load_config(None)
+        output_path = os.path.join(local_out_dir, f"analysis_{os.path.basename(local_in)}")
+        logger.info("[%s] 解析開始: %s -> %s", job_id, local_in, local_out_dir)
+        try:
+            analyzer = _analyzer_pool.get_nowait()
+        except queue.Empty:
+            analyzer = jva_run.create_pose_analyzer(config)
+        try:
+            ok = jva_run.process_video_all_variants(local_in, output_path, config, analyzer=analyzer)
+        finally:
+            _analyzer_pool.put(analyzer)
+        if not ok:
+            raise RuntimeError("解析処理が失敗しました")
         logger.info("[%s] 解析完了", job_id)
 
         # ── 結果を S3 へアップロード ─────────────────────────────────────────
@@ -247,18 +300,6 @@ def _run_job(job_id: str, input_key: str) -> None:
             **keys,
         }
 
-    except CalledProcessError as cpe:
-        logger.error("[%s] 解析プロセスが非ゼロ終了: %s", job_id, cpe)
-        status = {
-            "status":    "failed",
-            "job_id":    job_id,
-            "updated_at": now_iso(),
-            "error":     f"CalledProcessError: returncode={cpe.returncode}",
-            "result_prefix":             _result_prefix(job_id),
-            "report_pdf_key":            None,
-            "analysis_summary_json_key": None,
-            "deliverable_zip_keys":      [],
-        }
     except Exception as exc:
         logger.exception("[%s] 解析中に予期しないエラー: %s", job_id, exc)
         status = {
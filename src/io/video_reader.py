@@ -1,18 +1,174 @@
+import collections
+import logging
+import os
+import threading
+
 import cv2
 
+try:
+    import av
+    PYAV_AVAILABLE = True
+except ImportError:
+    PYAV_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
 class VideoReader:
-    def __init__(self, video_path):
+    """cv2.VideoCapture の薄いラッパー
+
+    prefetch > 0 ならバックグラウンドスレッドが最大 prefetch 枚まで先にデコードしてリングバッファに溜め、
+    read_frame はそこから取り出す（満杯のあいだデコード側は待つ）。0 なら呼び出しごとに同期デコードする。
+    """
+
+    def __init__(self, video_path, prefetch=16):
         self.video_path = video_path
         self.cap = cv2.VideoCapture(video_path)
 
         if not self.cap.isOpened():
             raise ValueError(f"Cannot open video file: {video_path}")
 
+        self._thread = None
+        if prefetch > 0:
+            self._maxlen = prefetch
+            self._buf = collections.deque()
+            self._cond = threading.Condition()
+            self._eof = False
+            self._stop = False
+            self._error = None
+            self._thread = threading.Thread(target=self._decode_loop, name="video-reader", daemon=True)
+            self._thread.start()
+
+    def _decode_loop(self):
+        try:
+            while True:
+                with self._cond:
+                    while len(self._buf) >= self._maxlen and not self._stop:
+                        self._cond.wait()
+                    if self._stop:
+                        return
+                # read() は GIL を解放するのでロックの外でデコードする
+                ret, frame = self.cap.read()
+                if not ret:
+                    return
+                with self._cond:
+                    self._buf.append(frame)
+                    self._cond.notify_all()
+        except BaseException as e:
+            # 途中で壊れた動画を正常終了と区別するため、例外は read_frame で再送出する
+            logger.error(f"Decode error in {self.video_path}: {e}")
+            self._error = e
+        finally:
+            with self._cond:
+                self._eof = True
+                self._cond.notify_all()
+
+    def read_frame(self):
+        if self._thread is None:
+            ret, frame = self.cap.read()
+            if not ret:
+                return None
+            return frame
+        with self._cond:
+            while not self._buf and not self._eof:
+                self._cond.wait()
+            if not self._buf:
+                if self._error is not None:
+                    raise self._error
+                return None
+            frame = self._buf.popleft()
+            self._cond.notify_all()
+            return frame
+
+    def release(self):
+        if self._thread is not None:
+            with self._cond:
+                self._stop = True
+                self._cond.notify_all()
+            self._thread.join()
+            self._thread = None
+        self.cap.release()
+
+
+class PyAVReader:
+    """PyAV（libavcodec のフレームスレッド）でデコードする cv2.VideoCapture 互換リーダー
+
+    read / get / isOpened / release を持ち、process_video 側はそのまま差し替えられる。
+    回転メタデータ付きの動画は cv2 の自動回転と結果が変わるため ValueError で拒否する。
+    """
+
+    def __init__(self, video_path):
+        if not PYAV_AVAILABLE:
+            raise ImportError("PyAV is not installed")
+        self.video_path = video_path
+        self.container = av.open(video_path)
+        try:
+            self.stream = self.container.streams.video[0]
+            self.stream.thread_type = "AUTO"
+            self.stream.thread_count = max(1, (os.cpu_count() or 2) // 2)
+            self._frames = self.container.decode(self.stream)
+            self._peek = next(self._frames, None)
+            rotate = int(self.stream.metadata.get("rotate", 0) or 0)
+            if self._peek is not None:
+                rotate = rotate or int(getattr(self._peek, "rotation", 0) or 0)
+            if rotate % 360:
+                raise ValueError(f"rotated video ({rotate} deg) is not supported by PyAVReader")
+        except Exception:
+            self.container.close()
+            raise
+        self._opened = True
+
+    def isOpened(self):
+        return self._opened
+
+    def get(self, prop_id):
+        ctx = self.stream.codec_context
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(ctx.width)
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(ctx.height)
+        if prop_id == cv2.CAP_PROP_FPS:
+            rate = self.stream.average_rate or self.stream.guessed_rate
+            return float(rate) if rate else 0.0
+        if prop_id == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.stream.frames or 0)
+        return 0.0
+
+    def read(self):
+        if not self._opened:
+            return False, None
+        frame = self._peek if self._peek is not None else next(self._frames, None)
+        self._peek = None
+        if frame is None:
+            return False, None
+        return True, frame.to_ndarray(format="bgr24")
+
     def read_frame(self):
-        ret, frame = self.cap.read()
-        if not ret:
-            return None
-        return frame
+        ret, frame = self.read()
+        return frame if ret else None
 
     def release(self):
-        self.cap.release()
\ No newline at end of file
+        if self._opened:
+            self.container.close()
+            self._opened = False
+
+
+def open_video_capture(video_path, cuda=False):
+    """PyAV が使えれば PyAVReader、使えなければ（または開けなければ）cv2.VideoCapture を返す
+
+    cuda=True かつ torchcodec + CUDA が使える場合は NVDEC でデコードする TorchCodecCudaReader を優先する。
+    """
+    if cuda:
+        from src.io.video_reader_cuda import TorchCodecCudaReader, cuda_decode_available
+
+        if cuda_decode_available():
+            try:
+                return TorchCodecCudaReader(video_path)
+            except Exception as e:
+                logger.info(f"CUDA decode unavailable for {video_path}, falling back: {e}")
+    if PYAV_AVAILABLE:
+        try:
+            return PyAVReader(video_path)
+        except Exception as e:
+            logger.info(f"PyAV decode unavailable for {video_path}, using OpenCV: {e}")
+    return cv2.VideoCapture(video_path)
@@ -0,0 +1,86 @@
+import importlib.util
+import logging
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_BATCH_SIZE = 32
+
+
+def cuda_decode_available():
+    """torchcodec と CUDA デバイスが使えるか（torch は重いので呼ばれたときだけ import する）"""
+    if importlib.util.find_spec("torchcodec") is None:
+        return False
+    try:
+        import torch
+    except ImportError:
+        return False
+    return bool(torch.cuda.is_available())
+
+
+class TorchCodecCudaReader:
+    """torchcodec の CUDA デコーダ（NVDEC）で読む cv2.VideoCapture 互換リーダー
+
+    batch_size フレームずつ GPU 上でデコードし、RGB→BGR の並べ替えも GPU 上で済ませてから
+    1回の転送でホストへ降ろす。描画パイプラインは CPU（numpy）なので read() は ndarray を返す。
+    """
+
+    def __init__(self, video_path, batch_size=_BATCH_SIZE, device="cuda"):
+        from torchcodec.decoders import VideoDecoder
+
+        self.video_path = video_path
+        self.batch_size = batch_size
+        self.decoder = VideoDecoder(video_path, device=device)
+        meta = self.decoder.metadata
+        self._num_frames = int(meta.num_frames or len(self.decoder))
+        self._width = int(meta.width)
+        self._height = int(meta.height)
+        self._fps = float(meta.average_fps or 0.0)
+        self._next = 0
+        self._batch = None
+        self._batch_pos = 0
+        self._opened = True
+
+    def isOpened(self):
+        return self._opened
+
+    def get(self, prop_id):
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self._width)
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self._height)
+        if prop_id == cv2.CAP_PROP_FPS:
+            return self._fps
+        if prop_id == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self._num_frames)
+        return 0.0
+
+    def _load_batch(self):
+        stop = min(self._next + self.batch_size, self._num_frames)
+        # (N, C, H, W) RGB → (N, H, W, C) BGR を GPU 上で作ってからまとめて転送
+        data = self.decoder.get_frames_in_range(self._next, stop).data
+        self._batch = data.permute(0, 2, 3, 1).flip(-1).contiguous().cpu().numpy()
+        self._batch_pos = 0
+        self._next = stop
+
+    def read(self):
+        if not self._opened:
+            return False, None
+        if self._batch is None or self._batch_pos >= len(self._batch):
+            if self._next >= self._num_frames:
+                return False, None
+            self._load_batch()
+        frame = self._batch[self._batch_pos]
+        self._batch_pos += 1
+        return True, np.ascontiguousarray(frame)
+
+    def read_frame(self):
+        ret, frame = self.read()
+        return frame if ret else None
+
+    def release(self):
+        self._opened = False
+        self._batch = None
+        self.decoder = None
@@ -1,13 +1,40 @@
+import logging
+import os
+import subprocess
+import tempfile
+
 import cv2
+import numpy as np
+
+from src.jva.ffmpeg_io import FFMPEG, have_ffmpeg, select_encoder
+
+logger = logging.getLogger(__name__)
+
+# 入力 bgr24 から変換する画素形式（ブラウザ再生互換）。VAAPI は hwupload フィルタ側で変換する
+_PIX_FMT = {"h264_qsv": "nv12", "h264_vaapi": None}
+
 
 class VideoWriter:
-    def __init__(self, output_path, frame_width, frame_height, fps=30):
+    """codec（FourCC 文字列）未指定なら拡張子で選ぶ
+
+    .avi は従来どおり XVID、それ以外（.mp4 など）は open_video_writer で
+    H.264（ffmpeg パイプの HW エンコーダ、なければ cv2 の avc1 → mp4v）にする。
+    """
+
+    def __init__(self, output_path, frame_width, frame_height, fps=30, codec=None):
         self.output_path = output_path
         self.frame_width = frame_width
         self.frame_height = frame_height
         self.fps = fps
-        self.fourcc = cv2.VideoWriter_fourcc(*'XVID')
-        self.writer = cv2.VideoWriter(self.output_path, self.fourcc, self.fps, (self.frame_width, self.frame_height))
+        if codec is None and os.path.splitext(output_path)[1].lower() != ".avi":
+            self.fourcc = None
+            self.writer = open_video_writer(output_path, frame_width, frame_height, fps)
+        else:
+            self.fourcc = cv2.VideoWriter_fourcc(*(codec or 'XVID'))
+            self.writer = cv2.VideoWriter(self.output_path, self.fourcc, self.fps, (self.frame_width, self.frame_height))
+
+    def isOpened(self):
+        return self.writer is not None and self.writer.isOpened()
 
     def write_frame(self, frame):
         if self.writer is not None:
@@ -16,4 +43,103 @@ class VideoWriter:
     def release(self):
         if self.writer is not None:
             self.writer.release()
-            self.writer = None
\ No newline at end of file
+            self.writer = None
+
+
+class FFmpegPipeWriter:
+    """生の BGR フレームを常駐 ffmpeg プロセスへパイプで流してエンコードする
+
+    コーデックは ffmpeg_io.select_encoder() で選ぶ（NVENC > QSV > VAAPI > libx264）。
+    libx264 のときは veryfast / -threads 0 で全コアを使い、エンコードが律速にならないようにする。
+    cv2.VideoWriter と同じ write / isOpened / release を持つ。
+    """
+
+    def __init__(self, output_path, frame_width, frame_height, fps=30, codec=None, extra_args=None):
+        self.output_path = output_path
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        self.fps = fps
+        if codec is None:
+            codec, extra_args = select_encoder(realtime=True)
+        self.codec = codec
+        extra_args = list(extra_args or [])
+        pix_fmt = _PIX_FMT.get(codec, "yuv420p")
+        cmd = [
+            FFMPEG, "-y", "-hide_banner", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24",
+            "-s", f"{frame_width}x{frame_height}", "-r", str(fps),
+            "-i", "pipe:0",
+            "-c:v", codec, *extra_args,
+            *(["-pix_fmt", pix_fmt] if pix_fmt else []),
+            "-movflags", "+faststart",
+            output_path,
+        ]
+        # stderr はパイプにすると誰も読まない間に詰まって ffmpeg が止まるため、一時ファイルへ逃がす
+        self._stderr = tempfile.TemporaryFile()
+        try:
+            self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                         stderr=self._stderr, bufsize=0)
+        except BaseException:
+            self._stderr.close()
+            raise
+
+    def _read_stderr(self):
+        """ffmpeg がこれまでに stderr へ書いた内容を返す"""
+        if self._stderr is None or self._stderr.closed:
+            return ""
+        self._stderr.seek(0)
+        return self._stderr.read().decode(errors="replace").strip()
+
+    def isOpened(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def write(self, frame):
+        if frame.shape[1] != self.frame_width or frame.shape[0] != self.frame_height:
+            raise ValueError(f"Frame size {frame.shape[1]}x{frame.shape[0]} does not match "
+                             f"{self.frame_width}x{self.frame_height}")
+        try:
+            self.proc.stdin.write(np.ascontiguousarray(frame).data)
+        except (BrokenPipeError, OSError) as e:
+            self.proc.wait()
+            err = self._read_stderr()
+            raise IOError(f"ffmpeg ({self.codec}) terminated: {err or e}") from e
+
+    write_frame = write
+
+    def release(self):
+        if self.proc is None:
+            return
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        self.proc.wait()
+        if self.proc.returncode != 0:
+            logger.error(f"ffmpeg exited with {self.proc.returncode}: {self._read_stderr()}")
+        self._stderr.close()
+        self.proc = None
+
+
+def open_video_writer(output_path, frame_width, frame_height, fps=30):
+    """ffmpeg があればパイプ書き出し、なければ cv2.VideoWriter（avc1 → mp4v）を返す。失敗時は None
+
+    yuv420p は幅・高さが偶数でないとエンコーダが受け付けないため、奇数サイズは cv2 で書き出す。
+    """
+    if have_ffmpeg() and frame_width % 2 == 0 and frame_height % 2 == 0:
+        try:
+            writer = FFmpegPipeWriter(output_path, frame_width, frame_height, fps)
+            if writer.isOpened():
+                logger.info(f"VideoWriter: ffmpeg pipe ({writer.codec})")
+                return writer
+            writer.release()
+        except OSError as e:
+            logger.warning(f"ffmpeg pipe writer unavailable: {e}")
+    # avc1 (H.264) はブラウザ再生可能。失敗時は mp4v にフォールバック
+    for fourcc_str in ('avc1', 'mp4v'):
+        fourcc = cv2.VideoWriter_fourcc(*fourcc_str)
+        writer = cv2.VideoWriter(output_path, fourcc, fps, (frame_width, frame_height))
+        if writer.isOpened():
+            logger.info(f"VideoWriter codec: {fourcc_str}")
+            return writer
+        writer.release()
+    return None
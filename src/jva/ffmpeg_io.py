@@ -1,10 +1,15 @@
 import os
 import shutil
 import subprocess
+from functools import lru_cache
 from typing import Optional
 
 FFMPEG = shutil.which("ffmpeg")
 
+# CPU fallback presets: file-to-file encodes favour size, live pipe encodes favour throughput
+_X264_ARGS = ["-preset", "medium"]
+_X264_REALTIME_ARGS = ["-preset", "veryfast", "-threads", "0"]
+
 
 def have_ffmpeg() -> bool:
     return FFMPEG is not None
@@ -33,7 +38,38 @@ def _detect_hw_encoder() -> tuple[str, list[str]]:
         return "h264_vaapi", ["-vaapi_device", "/dev/dri/renderD128", "-vf", "format=nv12,hwupload"]
 
     # Fallback CPU
-    return "libx264", ["-preset", "medium"]
+    return "libx264", list(_X264_ARGS)
+
+
+@lru_cache(maxsize=None)
+def _probe_encoder(codec: str, extra: tuple[str, ...]) -> bool:
+    """Encode a single tiny frame to check the encoder actually works here."""
+    if not have_ffmpeg():
+        return False
+    cmd = [
+        FFMPEG, "-hide_banner", "-loglevel", "error",
+        "-f", "lavfi", "-i", "color=c=black:s=64x64:d=0.1",
+        "-frames:v", "1", "-c:v", codec, *extra, "-f", "null", "-",
+    ]
+    try:
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=15)
+        return True
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError):
+        return False
+
+
+def select_encoder(realtime: bool = False) -> tuple[str, list[str]]:
+    """Like _detect_hw_encoder, but falls back to libx264 if the HW encoder fails a probe.
+
+    realtime=True picks a faster libx264 preset using all cores, for encoders fed frame by
+    frame while the pipeline is still running (FFmpegPipeWriter).
+    """
+    codec, extra = _detect_hw_encoder()
+    if codec != "libx264" and not _probe_encoder(codec, tuple(extra)):
+        codec = "libx264"
+    if codec == "libx264":
+        return codec, list(_X264_REALTIME_ARGS if realtime else _X264_ARGS)
+    return codec, extra
 
 
 def encode_hw(in_path: str, out_path: str, crf_or_bitrate: str = "6M") -> bool:
@@ -0,0 +1,132 @@
+"""
+jva.frame_pipeline - デコード／エンコードを別スレッドに逃がすためのヘルパー
+
+reader スレッド → メインスレッド（姿勢推定）→ render スレッド（描画）→ writer スレッド の
+パイプラインを構成する。PoseAnalyzer の推定状態はメインスレッドのみで更新し、各段は
+キューで順に受け渡すのでフレーム順は保たれる（OpenCV・MediaPipe は処理中 GIL を解放する）。
+"""
+
+import queue
+import threading
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+import numpy as np
+
+_SENTINEL = None
+
+
+class FrameReaderThread:
+    """cap.read() をバックグラウンドで回し、(idx, frame) を順に返すイテレータ
+
+    cap.read() の例外は読み込み済みのフレームをすべて返したあとでイテレータ側に再送出する
+    （ファイル末尾と区別できるようにする）。
+    """
+
+    def __init__(self, cap: Any, prefetch: int = 8):
+        self._cap = cap
+        self._q: "queue.Queue[Optional[Tuple[int, np.ndarray]]]" = queue.Queue(maxsize=prefetch)
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="jva-reader", daemon=True)
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        idx = 0
+        try:
+            while not self._stop.is_set():
+                ret, frame = self._cap.read()
+                if not ret:
+                    break
+                idx += 1
+                if not self._put((idx, frame)):
+                    return
+        except BaseException as e:  # noqa: BLE001 - 消費側で再送出する
+            self._error = e
+        finally:
+            self._put(_SENTINEL)
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        while True:
+            item = self._q.get()
+            if item is _SENTINEL:
+                if self._error is not None:
+                    raise self._error
+                return
+            yield item
+
+    def close(self):
+        """読み込みを打ち切ってスレッドを終了させる（cap.release() より前に呼ぶ）"""
+        self._stop.set()
+        self._thread.join(timeout=5.0)
+
+
+class StageThread:
+    """fn(item) をバックグラウンドスレッドで投入順に実行するパイプライン段
+
+    キューは maxsize で上限を設け、満杯なら put() 側が待つ（背圧）。
+    fn の例外は次の put() / close() でメインスレッドに再送出する。
+    """
+
+    def __init__(self, fn: Callable[[Any], Any], maxsize: int = 8, name: str = "jva-stage"):
+        self._fn = fn
+        self.maxsize = maxsize
+        self._q: "queue.Queue[Any]" = queue.Queue(maxsize=maxsize)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._q.get()
+            if item is _SENTINEL:
+                return
+            if self._error is not None:
+                continue  # エラー後はキューを空にするだけ
+            try:
+                self._fn(item)
+            except BaseException as e:  # noqa: BLE001 - メインスレッドで再送出する
+                self._error = e
+
+    def put(self, item: Any):
+        if self._error is not None:
+            raise self._error
+        self._q.put(item)
+
+    def close(self):
+        """キューに残った項目をすべて処理してからスレッドを終了する"""
+        self._q.put(_SENTINEL)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+
+class FrameWriterThread(StageThread):
+    """writer.write(frame) をバックグラウンドで順に実行する"""
+
+    def __init__(self, writer: Any, maxsize: int = 8):
+        self._writer = writer
+        super().__init__(writer.write, maxsize, name="jva-writer")
+
+    def write(self, frame: np.ndarray):
+        self.put(frame)
+
+
+def render_buffers(writer: FrameWriterThread, shape: Tuple[int, ...], n_outputs: int = 0) -> np.ndarray:
+    """writer のキューに入っている間は上書きされない本数の描画バッファを確保する
+
+    キュー内 maxsize 枚 + 書き込み中 1 枚 + 描画中 1 枚を1つの配列にまとめて確保する。
+    n_outputs > 0 なら出力ごとのリングをまとめた (n_outputs, ring, *shape) のタイルを返す。
+    """
+    ring = writer.maxsize + 2
+    if n_outputs:
+        return np.empty((n_outputs, ring, *shape), np.uint8)
+    return np.empty((ring, *shape), np.uint8)
@@ -0,0 +1,218 @@
+"""
+jva.landmarks_io - ランドマーク JSON のストリーミング書き出し
+
+フレームごとに JSON 断片（1フレーム1行）をファイルへ直接書き込み、全フレーム分のリストを
+メモリに溜めない。出力形式は export_landmarks_json と互換
+（format / version / landmarks / frame_count）で、Blender 側の
+import_landmarks.py からそのまま読み込める。
+
+layout="columnar" では点ごとの dict を作らず、全フレームを (N, K) の配列にまとめて
+"x" / "y" / "visibility" の並列配列として1回で書き出す（version 1.1）。
+"""
+
+import json
+from typing import Any, Dict, List
+
+import numpy as np
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_json(obj: Any) -> bytes:
+    """インデントなしの JSON バイト列（numpy 配列・スカラーもそのまま渡せる）"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=_json_default).encode("utf-8")
+
+
+class LandmarksJsonWriter:
+    """フレーム単位でランドマークを追記する JSON ライター
+
+    write_arrays() は正規化済み座標を numpy のチャンクバッファに貯め、
+    chunk_size フレームごとにまとめて .tolist() → JSON 化する。
+    """
+
+    def __init__(self, path: str, num_landmarks: int = 33, chunk_size: int = 256):
+        self.path = path
+        self.frame_count = 0
+        self._fh = open(path, "wb")
+        self._fh.write(b'{"format":"mediapipe_pose_landmarks","version":"1.0","landmarks":[')
+        self._xy = np.zeros((chunk_size, num_landmarks, 2), np.float32)
+        self._vis = np.zeros((chunk_size, num_landmarks), np.float32)
+        self._frames = np.zeros(chunk_size, np.int64)
+        self._timestamps = np.zeros(chunk_size, np.float64)
+        self._pending = 0
+
+    def _write_item(self, data: bytes):
+        # 1フレーム1行にしておくと、途中で止まったファイルも行単位で読み出せる
+        self._fh.write(b",\n" if self.frame_count else b"\n")
+        self._fh.write(data)
+        self.frame_count += 1
+
+    def write_frame(self, frame: int, timestamp: float, landmarks: List[Dict[str, Any]]):
+        self._flush()
+        self._write_item(dumps_json({"frame": frame, "timestamp": timestamp, "landmarks": landmarks}))
+
+    def write_arrays(self, frame: int, timestamp: float, xy: np.ndarray, visibility: np.ndarray):
+        """xy: (K, 2) 正規化座標, visibility: (K,)"""
+        n = self._pending
+        self._xy[n] = xy
+        self._vis[n] = visibility
+        self._frames[n] = frame
+        self._timestamps[n] = timestamp
+        self._pending = n + 1
+        if self._pending == len(self._frames):
+            self._flush()
+
+    def _flush(self):
+        n = self._pending
+        if not n:
+            return
+        self._pending = 0
+        ids = range(self._xy.shape[1])
+        for frame, ts, pts, vis in zip(self._frames[:n].tolist(), self._timestamps[:n].tolist(),
+                                       self._xy[:n].tolist(), self._vis[:n].tolist()):
+            self._write_item(dumps_json({
+                "frame": frame,
+                "timestamp": ts,
+                "landmarks": [
+                    {"id": i, "x": p[0], "y": p[1], "visibility": v}
+                    for i, p, v in zip(ids, pts, vis)
+                ],
+            }))
+
+    def close(self):
+        if self._fh is None:
+            return
+        self._flush()
+        # frame_count はフレーム数が確定してから末尾に書く（キー順は読み込みに影響しない）
+        self._fh.write(b'\n],"frame_count":' + str(self.frame_count).encode("ascii") + b"}")
+        self._fh.close()
+        self._fh = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ColumnarLandmarksWriter:
+    """ランドマークを並列配列（x / y / visibility: N×K）の JSON として書き出すライター
+
+    write_arrays() の入力を numpy のチャンクに溜め、close() で連結して1回だけシリアライズする。
+    点ごとの dict を作らないので、フレーム数×点数の Python オブジェクト生成がなくなる。
+    """
+
+    def __init__(self, path: str, num_landmarks: int = 33, chunk_size: int = 1024):
+        self.path = path
+        self.num_landmarks = num_landmarks
+        self.frame_count = 0
+        self._chunk_size = chunk_size
+        self._chunks: List[tuple] = []
+        self._new_chunk()
+        self._closed = False
+
+    def _new_chunk(self):
+        n, k = self._chunk_size, self.num_landmarks
+        self._xy = np.zeros((n, k, 2), np.float32)
+        self._vis = np.zeros((n, k), np.float32)
+        self._frames = np.zeros(n, np.int64)
+        self._timestamps = np.zeros(n, np.float64)
+        self._pending = 0
+
+    def _seal(self):
+        n = self._pending
+        if n:
+            self._chunks.append((self._frames[:n], self._timestamps[:n], self._xy[:n], self._vis[:n]))
+            self._new_chunk()
+
+    def write_arrays(self, frame: int, timestamp: float, xy: np.ndarray, visibility: np.ndarray):
+        """xy: (K, 2) 正規化座標, visibility: (K,)"""
+        n = self._pending
+        self._xy[n] = xy
+        self._vis[n] = visibility
+        self._frames[n] = frame
+        self._timestamps[n] = timestamp
+        self._pending = n + 1
+        self.frame_count += 1
+        if self._pending == self._chunk_size:
+            self._seal()
+
+    def write_frame(self, frame: int, timestamp: float, landmarks: List[Dict[str, Any]]):
+        xy = np.zeros((self.num_landmarks, 2), np.float32)
+        vis = np.zeros(self.num_landmarks, np.float32)
+        for i, lm in enumerate(landmarks):
+            idx = lm.get("id", i)
+            if idx < self.num_landmarks:
+                xy[idx] = (lm.get("x", 0.0), lm.get("y", 0.0))
+                vis[idx] = lm.get("visibility", 0.0)
+        self.write_arrays(frame, timestamp, xy, vis)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._seal()
+        k = self.num_landmarks
+        if self._chunks:
+            frames, timestamps, xy, vis = (np.concatenate(parts) for parts in zip(*self._chunks))
+        else:
+            frames, timestamps = np.zeros(0, np.int64), np.zeros(0, np.float64)
+            xy, vis = np.zeros((0, k, 2), np.float32), np.zeros((0, k), np.float32)
+        self._chunks = []
+        with open(self.path, "wb") as fh:
+            fh.write(dumps_json({
+                "format": "mediapipe_pose_landmarks",
+                "version": "1.1",
+                "layout": "columnar",
+                "frame_count": self.frame_count,
+                "frames": frames,
+                "timestamps": timestamps,
+                "x": np.ascontiguousarray(xy[:, :, 0]),
+                "y": np.ascontiguousarray(xy[:, :, 1]),
+                "visibility": vis,
+            }))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_landmarks_writer(path: str, layout: str = "frames", num_landmarks: int = 33):
+    """layout に応じたランドマークライターを返す（"frames": フレームごとの dict / "columnar": 並列配列）"""
+    if layout == "columnar":
+        return ColumnarLandmarksWriter(path, num_landmarks)
+    return LandmarksJsonWriter(path, num_landmarks)
+
+
+def expand_columnar(data: Dict[str, Any]) -> Dict[str, Any]:
+    """columnar 形式の dict をフレームごとの "landmarks" リスト形式（version 1.0 互換）に展開する"""
+    if data.get("layout") != "columnar":
+        return data
+    landmarks = [
+        {
+            "frame": frame,
+            "timestamp": ts,
+            "landmarks": [
+                {"id": i, "x": x, "y": y, "visibility": v}
+                for i, (x, y, v) in enumerate(zip(xs, ys, vs))
+            ],
+        }
+        for frame, ts, xs, ys, vs in zip(data["frames"], data["timestamps"], data["x"], data["y"], data["visibility"])
+    ]
+    return {"format": data.get("format"), "version": "1.0", "frame_count": len(landmarks), "landmarks": landmarks}
@@ -1,7 +1,13 @@
 from __future__ import annotations
 import argparse
+import logging
+import threading
+import time
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Sequence
+
+import cv2
+import numpy as np
 
 # 既存のPoseAnalyzerを流用するための型整合だけ行う
 try:
@@ -9,10 +15,128 @@ try:
 except Exception:
     mp = None  # type: ignore
 
+logger = logging.getLogger(__name__)
+
+# detect_batch(hold_dropped=False) で LIVE_STREAM に間引かれたフレームの位置に入る目印
+DROPPED = object()
+
+
+class _TasksLandmarks:
+    """Tasks の NormalizedLandmark 列を Solutions の pose_landmarks と同じ .landmark で引けるようにする"""
+    __slots__ = ("landmark",)
+
+    def __init__(self, landmark):
+        self.landmark = landmark
+
+
+class TasksBatchLandmarker:
+    """PoseLandmarker（RunningMode.LIVE_STREAM）にフレームをまとめて非同期投入し、結果を待ち合わせる
+
+    detect_async は投入後すぐ戻るので、バッチ内のフレームは推論グラフ上で連続して処理される。
+    結果はコールバックで timestamp_ms をキーに受け取る。LIVE_STREAM はグラフが詰まると
+    フレームを間引くことがあり（間引かれたフレームにはコールバックが来ない）、その場合は
+    直前に得られた結果で埋めるか、hold_dropped=False なら DROPPED を返して呼び出し側に補間させる。
+    間引かれた枚数は dropped_frames に累計する。
+
+    待ち合わせは、バッチの最初の結果を最大 timeout_s 待ったあと、結果が届き続けている間だけ続け、
+    idle_timeout_s のあいだ新しい結果が来なければ残りは間引かれたものとみなす
+    （バッチ末尾のフレームが間引かれても timeout_s まで止まらない）。
+    """
+
+    def __init__(self, model_asset_path: str, timeout_s: float = 5.0, delegate: str = "gpu",
+                 idle_timeout_s: float = 0.25):
+        self.timeout_s = timeout_s
+        self.idle_timeout_s = idle_timeout_s
+        self._results: Dict[int, Any] = {}
+        self._latest_ts = -1
+        self._done_ts = -1  # これ以下のタイムスタンプのバッチは返却済み（遅れて届いた結果は捨てる）
+        self._last_submitted = -1
+        self._last_landmarks = None
+        self.dropped_frames = 0
+        self._cond = threading.Condition()
+        self.delegate = "cpu"
+        self._landmarker = None
+        # GPU デリゲートを優先し、GPU/OpenGL が使えない環境では CPU で作り直す
+        Delegate = getattr(mp.tasks.BaseOptions, "Delegate", None)
+        if delegate == "gpu" and Delegate is not None:
+            try:
+                self._landmarker = self._create(model_asset_path, Delegate.GPU)
+                self.delegate = "gpu"
+            except Exception as e:
+                logger.warning(f"PoseLandmarker GPU delegate unavailable, using CPU: {e}")
+        if self._landmarker is None:
+            self._landmarker = self._create(model_asset_path, Delegate.CPU if Delegate is not None else None)
+
+    def _create(self, model_asset_path: str, delegate):
+        vision = mp.tasks.vision
+        base_kwargs = {"model_asset_path": model_asset_path}
+        if delegate is not None:
+            base_kwargs["delegate"] = delegate
+        options = vision.PoseLandmarkerOptions(
+            base_options=mp.tasks.BaseOptions(**base_kwargs),
+            running_mode=vision.RunningMode.LIVE_STREAM,
+            num_poses=1,
+            result_callback=self._on_result,
+        )
+        return vision.PoseLandmarker.create_from_options(options)
+
+    def _on_result(self, result, image, timestamp_ms: int):
+        lms = _TasksLandmarks(result.pose_landmarks[0]) if result.pose_landmarks else None
+        with self._cond:
+            if timestamp_ms > self._done_ts:
+                self._results[timestamp_ms] = lms
+            self._latest_ts = max(self._latest_ts, timestamp_ms)
+            self._cond.notify_all()
+
+    def detect_batch(self, frames_bgr: Sequence[np.ndarray], timestamps_ms: Sequence[int],
+                     hold_dropped: bool = True) -> List[Any]:
+        """BGR フレーム列を投入し、各フレームの pose_landmarks（未検出は None）を投入順に返す
+
+        間引かれたフレームは hold_dropped なら直前の結果、そうでなければ DROPPED になる。
+        """
+        submitted = []
+        for frame, ts in zip(frames_bgr, timestamps_ms):
+            ts = max(int(ts), self._last_submitted + 1)  # LIVE_STREAM は単調増加のタイムスタンプが必須
+            self._last_submitted = ts
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)  # 出力は新規の C 連続配列
+            self._landmarker.detect_async(mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb), ts)
+            submitted.append(ts)
+        if not submitted:
+            return []
+        with self._cond:
+            # 結果はタイムスタンプ順に届くので、最後のフレーム分が届けば（間引かれた分を除き）揃っている。
+            # 最後のフレームが間引かれると届かないので、結果が止まったら待つのをやめる
+            self._cond.wait_for(lambda: self._latest_ts >= submitted[0], timeout=self.timeout_s)
+            deadline = time.monotonic() + self.timeout_s
+            while self._latest_ts < submitted[-1]:
+                seen = self._latest_ts
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait_for(
+                        lambda: self._latest_ts > seen, timeout=min(self.idle_timeout_s, remaining)):
+                    break
+            out = []
+            for ts in submitted:
+                if ts in self._results:
+                    self._last_landmarks = self._results[ts]
+                    out.append(self._last_landmarks)
+                else:
+                    self.dropped_frames += 1
+                    out.append(self._last_landmarks if hold_dropped else DROPPED)
+            # 返却済みのバッチの結果は残さない（間に合わなかった結果も後から溜まらないようにする）
+            self._done_ts = submitted[-1]
+            for ts in [t for t in self._results if t <= self._done_ts]:
+                del self._results[ts]
+            return out
+
+    def close(self):
+        self._landmarker.close()
+
 
 @dataclass
 class PoseBackend:
     use_tasks: bool = False
+    model_asset_path: Optional[str] = None
+    delegate: str = "gpu"  # Tasks の推論デバイス（"gpu" は使えなければ CPU にフォールバック）
 
     def add_backend_flags(self, ap: argparse.ArgumentParser) -> None:
         ap.add_argument("--use-tasks", action="store_true", help="MediaPipe Tasksを使用（既定はSolutions）")
@@ -28,7 +152,7 @@ class PoseBackend:
         return None
 
     def _init_tasks(self, fps: float):
-        # 将来の実装ポイント（mediapipe-tasks-python）
-        # ひとまずダミーオブジェクトを返し、呼び出し側の切替起点のみ提供
-        return {"backend": "tasks", "fps": fps}
-
+        # モデル（pose_landmarker_*.task）が指定されていなければ Solutions 側にフォールバックさせる
+        if not self.model_asset_path or not hasattr(mp, "tasks"):
+            return None
+        return TasksBatchLandmarker(self.model_asset_path, delegate=self.delegate)
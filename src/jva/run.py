@@ -4,41 +4,76 @@ jva.run - javelin-video-analysis メインエントリーポイント（パッ
 """
 
 import argparse
+import copy
 import os
 import sys
+import time
 import logging
-import yaml
 import json
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
 
 # リポジトリルートを推定して src を import パスへ
 repo_root = Path(__file__).resolve().parents[2]
-sys.path.insert(0, str(repo_root / "src"))
-
-import cv2  # type: ignore
-import numpy as np  # type: ignore
-
-from src.pipelines.pose_analysis import PoseAnalyzer
-from src.data_exporter import export_pose_landmarks_csv
-from src.frame_extractor import extract_representative_frames, extract_smart_frames
-from src.valid_segment_detector import detect_valid_pose_segment, save_valid_segment
-from src.graph_generator import generate_graphs_for_job
-from src.pdf_report_generator import generate_pdf_report_for_job
-from src.analysis_summary import generate_analysis_summary_for_job
-
-try:
-    from jva_visuals.registry import VisualPipeline, VisualPassRegistry
-    from jva_visuals.adapters import adapt_state  # noqa: F401
-    VISUALS_AVAILABLE = True
-except Exception as e:
-    print(f"Warning: Visual enhancements not available: {e}")
-    VISUALS_AVAILABLE = False
+if str(repo_root / "src") not in sys.path:
+    sys.path.insert(0, str(repo_root / "src"))
+
+# cv2 / numpy / MediaPipe / 可視化パスの import は重いので、--help や設定解析だけの起動では
+# 読み込まず、動画処理の関数内で初めて import する
+if TYPE_CHECKING:
+    from src.pipelines.pose_analysis import PoseAnalyzer
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=None)
+def _cv2():
+    """cv2 を import し、初回だけ SIMD 最適化とスレッド数を設定して返す
+
+    内部スレッドは同時に走るジョブ数（JVA_PARALLEL_JOBS）でコアを分け合う。
+    """
+    import cv2  # type: ignore
+    cv2.setUseOptimized(True)
+    cv2.setNumThreads(max(1, (os.cpu_count() or 1) // max(1, int(os.getenv("JVA_PARALLEL_JOBS", "1") or 1))))
+    return cv2
+
+
+@lru_cache(maxsize=None)
+def _visuals():
+    """jva_visuals の (VisualPipeline, VisualPassRegistry) を返す。使えなければ None"""
+    try:
+        from jva_visuals.registry import VisualPipeline, VisualPassRegistry
+        from jva_visuals.adapters import adapt_state  # noqa: F401
+    except Exception as e:
+        print(f"Warning: Visual enhancements not available: {e}")
+        return None
+    return VisualPipeline, VisualPassRegistry
+
+
+def deep_merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """base に override を再帰的に重ねた新しい dict を返す（どちらも変更しない）
+
+    ネストした dict はキー単位でマージし、それ以外の値は override 側で置き換える。
+    """
+    out = copy.deepcopy(base)
+    for k, v in override.items():
+        if isinstance(v, dict) and isinstance(out.get(k), dict):
+            out[k] = deep_merge(out[k], v)
+        else:
+            out[k] = copy.deepcopy(v)
+    return out
+
+
+@lru_cache(maxsize=4)
+def _read_config_file(config_path: str, mtime: float) -> Dict[str, Any]:
+    """YAML を読み込んで解析する（mtime をキーに含めるので、ファイルが更新されれば読み直す）"""
+    import yaml
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f) or {}
+
+
 def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
     default_config = {
         "height_m": None,
@@ -49,10 +84,9 @@ def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
     }
     if config_path and os.path.exists(config_path):
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                file_config = yaml.safe_load(f) or {}
-            cfg = {**default_config}
-            cfg.update(file_config)
+            # 解析結果はキャッシュを共有するので、deep_merge のコピーを返して呼び出し側の変更から守る
+            file_config = _read_config_file(config_path, os.path.getmtime(config_path))
+            cfg = deep_merge(default_config, file_config)
             logger.info(f"Loaded config from: {config_path}")
             return cfg
         except Exception as e:
@@ -82,6 +116,8 @@ def override_config_with_args(config: Dict[str, Any], args: argparse.Namespace)
     if args.export_landmarks:
         output["export_landmarks"] = True
         output["landmarks_filename"] = args.export_landmarks
+    if getattr(args, "pose_stride", None):
+        config["performance"] = {**(config.get("performance") or {}), "pose_stride": args.pose_stride}
     blender = config.get("blender", {})
     if args.blender_overlay:
         blender["enabled"] = True
@@ -93,14 +129,17 @@ def override_config_with_args(config: Dict[str, Any], args: argparse.Namespace)
 
 
 def export_landmarks_json(landmarks_data: list, output_path: str):
+    from jva.landmarks_io import dumps_json
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump({
+        # orjson（なければ json）でインデントなしに書き出す。indent=2 の半分程度のサイズになる
+        with open(output_path, 'wb') as f:
+            f.write(dumps_json({
                 "format": "mediapipe_pose_landmarks",
                 "version": "1.0",
                 "frame_count": len(landmarks_data),
                 "landmarks": landmarks_data
-            }, f, indent=2)
+            }))
+            f.write(b"\n")
         logger.info(f"Exported landmarks to: {output_path}")
     except Exception as e:
         logger.error(f"Failed to export landmarks: {e}")
@@ -142,6 +181,7 @@ def _write_handout_html(output_dir: Path, base_name: str,
     _font_face_css = ""  # CID フォントは @font-face 不要（pdfmetrics 登録済み）
 
     # 動画情報
+    cv2 = _cv2()
     cap      = cv2.VideoCapture(input_path)
     fps_v    = cap.get(cv2.CAP_PROP_FPS) or 30.0
     frames_v = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
@@ -572,7 +612,8 @@ def _write_handout_html(output_dir: Path, base_name: str,
 </body>
 </html>"""
 
-def process_video_all_variants(input_path: str, base_output_path: str, config: Dict[str, Any]) -> bool:
+def process_video_all_variants(input_path: str, base_output_path: str, config: Dict[str, Any],
+                               analyzer: Optional["PoseAnalyzer"] = None) -> bool:
     logger.info("6つの可視化バリエーションを同時出力します...")
     base_name = Path(base_output_path).stem
     output_dir = Path(base_output_path).parent
@@ -648,15 +689,23 @@ def process_video_all_variants(input_path: str, base_output_path: str, config: D
             }
         },
     ]
+    # 入力確認と出力ディレクトリ作成はバリアントごとではなく1回だけ行う
+    if not os.path.exists(input_path):
+        logger.error(f"Input video not found: {input_path}")
+        return False
+    output_dir.mkdir(parents=True, exist_ok=True)
     success_count = 0
     total_variants = len(variants)
     variants_results = []
-    for i, variant in enumerate(variants, 1):
-        print(f"\n[{i}/{total_variants}] {variant['name']}を処理中...")
-        variant_config = config.copy()
-        variant_config.update(variant["config_override"])
-        output_path = output_dir / variant["filename"]
-        ok = process_video(input_path, str(output_path), variant_config)
+    # デコードと姿勢推定は1回だけ行い、結果を全バリアントの可視化へ振り分ける
+    outputs = []
+    for variant in variants:
+        # 浅いコピー＋update だと "output" などのサブ dict が丸ごと置き換わるので再帰的にマージする
+        variant_config = deep_merge(config, variant["config_override"])
+        outputs.append((str(output_dir / variant["filename"]), variant_config))
+    print(f"\n{total_variants}バリエーションを1パスで処理中: {', '.join(v['name'] for v in variants)}")
+    results = process_video_multi(input_path, outputs, config, skip_setup=True, analyzer=analyzer)
+    for variant, (output_path, _), ok in zip(variants, outputs, results):
         if ok:
             success_count += 1
             logger.info(f"{variant['name']}: {output_path}")
@@ -675,18 +724,73 @@ def process_video_all_variants(input_path: str, base_output_path: str, config: D
     return success_count == total_variants
 
 
-def process_video(input_path: str, output_path: str, config: Dict[str, Any]) -> bool:
+def process_video(input_path: str, output_path: str, config: Dict[str, Any],
+                  skip_setup: bool = False, analyzer: Optional["PoseAnalyzer"] = None) -> bool:
+    """skip_setup=True のときは入力存在確認・出力ディレクトリ作成を呼び出し側で済ませている前提"""
+    return process_video_multi(input_path, [(output_path, config)], config, skip_setup=skip_setup,
+                               analyzer=analyzer)[0]
+
+
+def create_pose_analyzer(config: Dict[str, Any]) -> "PoseAnalyzer":
+    """config["performance"] の設定で PoseAnalyzer を作る（ジョブ間で使い回す場合もこれで生成する）"""
+    from src.pipelines.pose_analysis import PoseAnalyzer
+    perf_cfg = config.get("performance", {}) or {}
+    return PoseAnalyzer(
+        frame_cache_size=64 if perf_cfg.get("frame_cache", False) else 0,
+        frame_cache_max_distance=perf_cfg.get("frame_cache_max_distance", 3),
+        inference_width=perf_cfg.get("pose_input_width", 640),
+    )
+
+
+def _build_visual_pipeline(visuals: Dict[str, Any], fps: float, height_m: Optional[float]):
+    visuals_mod = _visuals() if visuals else None
+    if visuals_mod is None:
+        return None
+    VisualPipeline, VisualPassRegistry = visuals_mod
+    visual_passes = VisualPassRegistry.build_from_config(visuals, fps, height_m)
+    if not visual_passes:
+        return None
+    logger.info(f"Initialized {len(visual_passes)} visual passes")
+    return VisualPipeline(visual_passes, render_scale=float(visuals.get("render_scale", 1.0)))
+
+
+def process_video_multi(input_path: str, outputs: List[Tuple[str, Dict[str, Any]]],
+                        config: Dict[str, Any], skip_setup: bool = False,
+                        analyzer: Optional["PoseAnalyzer"] = None) -> List[bool]:
+    """1回のデコード・姿勢推定から複数の出力動画を生成する
+
+    outputs は (出力動画パス, バリアント設定) のリスト。デコード・姿勢推定・CSV・
+    ランドマーク出力は共通設定 config に従って1回だけ行い、可視化パスの適用と
+    書き出し・report.json だけを出力ごとに行う。戻り値は出力ごとの成否。
+    analyzer を渡すとその PoseAnalyzer を reset() して使い、close() は呼び出し側に任せる
+    （MediaPipe グラフの初期化をジョブ間で1回にできる）。
+    """
+    cv2 = _cv2()
+    import numpy as np  # type: ignore
+    from src.pipelines.pose_analysis import interpolate_landmarks
+    from jva.landmarks_io import open_landmarks_writer
+    from jva.pose_backend import DROPPED, PoseBackend
+    from jva.smart_skip import SmartSkipper
+    from jva.frame_pipeline import FrameReaderThread, FrameWriterThread, StageThread, render_buffers
+    from src.io.video_reader import open_video_capture
+    from src.io.video_writer import open_video_writer
+
+    n_outputs = len(outputs)
     logger.info(f"Processing video: {input_path}")
-    if not os.path.exists(input_path):
-        logger.error(f"Input video not found: {input_path}")
-        return False
-    output_dir = os.path.dirname(output_path)
-    if output_dir:
-        os.makedirs(output_dir, exist_ok=True)
-    cap = cv2.VideoCapture(input_path)
+    output_dir = os.path.dirname(outputs[0][0])
+    if not skip_setup:
+        if not os.path.exists(input_path):
+            logger.error(f"Input video not found: {input_path}")
+            return [False] * n_outputs
+        for output_path, _ in outputs:
+            if os.path.dirname(output_path):
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    # performance.cuda_decode なら NVDEC、次に PyAV（フレームスレッド）、最後に cv2.VideoCapture
+    perf_cfg = config.get("performance", {}) or {}
+    cap = open_video_capture(input_path, cuda=perf_cfg.get("cuda_decode", False))
     if not cap.isOpened():
         logger.error(f"Failed to open video: {input_path}")
-        return False
+        return [False] * n_outputs
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     fps = cap.get(cv2.CAP_PROP_FPS)
@@ -694,136 +798,354 @@ def process_video(input_path: str, output_path: str, config: Dict[str, Any]) ->
         fps = 30.0
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     logger.info(f"Video: {width}x{height}, {fps} fps, {total_frames} frames")
-    # avc1 (H.264) はブラウザ再生可能。失敗時は mp4v にフォールバック
-    for fourcc_str in ('avc1', 'mp4v'):
-        fourcc = cv2.VideoWriter_fourcc(*fourcc_str)
-        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-        if out.isOpened():
-            logger.info(f"VideoWriter codec: {fourcc_str}")
-            break
-        out.release()
-    if not out.isOpened():
-        logger.error(f"Failed to create output video: {output_path}")
-        cap.release()
-        return False
-    pose_analyzer = PoseAnalyzer()
+    # ffmpeg があれば HW エンコーダへのパイプ、なければ cv2.VideoWriter（avc1 → mp4v）
+    writers = []
+    for output_path, _ in outputs:
+        out = open_video_writer(output_path, width, height, fps)
+        if out is None:
+            logger.error(f"Failed to create output video: {output_path}")
+            for w in writers:
+                w.release()
+            cap.release()
+            return [False] * n_outputs
+        writers.append(out)
+    owns_analyzer = analyzer is None
+    if owns_analyzer:
+        pose_analyzer = create_pose_analyzer(config)
+    else:
+        pose_analyzer = analyzer
+        pose_analyzer.reset()
     if config.get("height_m"):
         pose_analyzer.set_scale_from_reference(height * 0.8, config["height_m"] * 0.8)
-    visual_pipeline = None
-    if VISUALS_AVAILABLE and config.get("visuals"):
-        visual_passes = VisualPassRegistry.build_from_config(
-            config["visuals"], fps, config.get("height_m")
-        )
-        if visual_passes:
-            visual_pipeline = VisualPipeline(visual_passes)
-            logger.info(f"Initialized {len(visual_passes)} visual passes")
-    landmarks_data = []
+    visual_pipelines = [
+        _build_visual_pipeline(vcfg.get("visuals"), fps, vcfg.get("height_m")) for _, vcfg in outputs
+    ]
     export_landmarks = config.get("output", {}).get("export_landmarks", False)
+    landmarks_path = None
+    landmarks_writer = None
+    if export_landmarks:
+        landmarks_filename = config.get("output", {}).get("landmarks_filename", "landmarks.json")
+        if os.path.isabs(landmarks_filename) or os.path.dirname(landmarks_filename):
+            landmarks_path = landmarks_filename
+        else:
+            landmarks_path = os.path.join(output_dir, landmarks_filename) if output_dir else landmarks_filename
+        try:
+            # 全フレーム分をリストに溜めず、フレームごとにファイルへ追記する
+            landmarks_writer = open_landmarks_writer(
+                landmarks_path, config.get("output", {}).get("landmarks_layout", "frames"))
+        except Exception as e:
+            logger.error(f"Failed to export landmarks: {e}")
+            export_landmarks = False
     frame_count = 0
+    # デコード（reader）とエンコード（writer）を別スレッドで先行・後行させる
+    prefetch = int(perf_cfg.get("prefetch", 8))
+    reader = FrameReaderThread(cap, prefetch)
+    # 出力が複数のときは writer キュー（＝描画バッファのリング）を浅くしてメモリを抑える
+    writer_depth = max(2, prefetch // n_outputs)
+    frame_writers = [FrameWriterThread(out, writer_depth) for out in writers]
+    # 描画用の出力バッファを全出力分まとめて先に確保して使い回す
+    # （各出力 writer キューにある間は上書きしない本数のリング）
+    scratch = render_buffers(frame_writers[0], (height, width, 3), n_outputs=n_outputs)
+    ring = scratch.shape[1]
+    # 出力が複数のときは基本描画を base_ring に1回だけ行い、可視化パスの適用は出力ごとのスレッドで並行させる。
+    # base_ring は「出力段キュー + 処理中 + 描画中」の本数あれば、どの出力段も使い終えた枠だけを上書きする
+    variant_depth = 2
+    base_ring = np.empty((variant_depth + 2, height, width, 3), np.uint8) if n_outputs > 1 else None
+    # ランドマーク正規化用の逆数（width, height）
+    inv_wh = np.array([1.0 / max(width, 1), 1.0 / max(height, 1)], np.float32)
+    # ループ内で使う定数をローカルに束縛しておく（毎フレームの除算・dict 参照を避ける）
+    inv_fps = 1.0 / fps  # fps は上で 0 以下を 30.0 に補正済み
+    progress_scale = 100.0 / total_frames if total_frames > 0 else 0.0
+    ref_len_m = config["height_m"] * 0.8 if config.get("height_m") else None
+    variant_height_m = [vcfg.get("height_m") for _, vcfg in outputs]
 
     # report.json 用の集計変数
     _pose_detected_frames = 0
     _wrist_speeds_ms: list = []   # キャリブ済みフレームの右手首速度 (m/s)
     _px2m_samples:   list = []   # 有効な px2m サンプル
     _landmarks_rows: list = []   # CSV出力用ランドマーク行
+    _prev_wrist = None
+    ok = [True] * n_outputs
+
+    def _emit(frame_count, frame, state):
+        """1フレーム分の集計・ランドマーク出力を行い、描画を render スレッドへ渡す（フレーム順に呼ぶ）"""
+        nonlocal _pose_detected_frames, _prev_wrist
+        time_sec = frame_count * inv_fps
+
+        # CSV用ランドマーク行を収集（全出力共通）
+        _landmarks_rows.append({
+            "frame":         frame_count,
+            "time_sec":      time_sec,
+            "raw_landmarks": state.get("raw_landmarks"),
+        })
+
+        # report.json 用データ収集（検出有無は points_xy の NaN マスク1回で判定し、ランドマーク出力と共有する）
+        points = state["points"]
+        pts = state["points_xy"]  # (33, 2)、未検出は NaN
+        valid = ~np.isnan(pts[:, 0])
+        if valid.any():
+            _pose_detected_frames += 1
+            # adapters.py と同ロジックで px2m を計算
+            _px2m = None
+            if ref_len_m and len(points) > 28:
+                sh  = points[11] or points[12]
+                ank = [p for p in (points[27], points[28]) if p is not None]
+                if sh is not None and ank:
+                    sh_y  = sh[1]
+                    ank_y = max(p[1] for p in ank)
+                    h_px  = abs(ank_y - sh_y)
+                    if h_px > 20:
+                        _px2m = ref_len_m / h_px
+            if _px2m and _px2m < 0.5:
+                _px2m_samples.append(_px2m)
+                # 右手首 (idx=16) 速度: 前フレームとの差分
+                p16 = points[16] if len(points) > 16 else None
+                if p16 is not None and _prev_wrist is not None:
+                    dx = (p16[0] - _prev_wrist[0]) * _px2m * fps
+                    dy = (p16[1] - _prev_wrist[1]) * _px2m * fps
+                    spd_ms = float(np.hypot(dx, dy))
+                    if spd_ms < 35.0:
+                        _wrist_speeds_ms.append(spd_ms)
+                _prev_wrist = p16
+        if landmarks_writer is not None:
+            # 1回の乗算で正規化し、NaN（未検出）は 0 にする
+            xy = np.nan_to_num(pts * inv_wh, nan=0.0)
+            landmarks_writer.write_arrays(frame_count, time_sec, xy, valid)
+
+        render_stage.put((frame_count, frame, state))
+
+    def _render_output(i, frame_count, base, state):
+        """出力 i の可視化パス適用と書き出し（出力ごとにフレーム順に実行）"""
+        if not ok[i]:
+            return
+        slot = frame_count % ring
+        if base_ring is None:
+            result = pose_analyzer.render_basic(base, state, out=scratch[i, slot])
+        else:
+            result = scratch[i, slot]
+            np.copyto(result, base)
+        if visual_pipelines[i]:
+            try:
+                result = visual_pipelines[i].apply_all(
+                    result, state, fps, variant_height_m[i], out=result
+                )
+            except Exception as e:
+                logger.error(f"Visual pipeline error at frame {frame_count}: {e}")
+        try:
+            frame_writers[i].write(result)
+        except Exception as e:
+            logger.error(f"Failed to write output video {outputs[i][0]}: {e}")
+            ok[i] = False
+
+    def _render(item):
+        """基本描画と出力への振り分け（render スレッドでフレーム順に実行）"""
+        frame_count, frame, state = item
+        if frame.shape[:2] != (height, width):
+            frame = cv2.resize(frame, (width, height))
+        if base_ring is None:
+            _render_output(0, frame_count, frame, state)
+            return
+        # 同じ基本描画と state を各出力の可視化パイプラインへ振り分ける
+        base = pose_analyzer.render_basic(frame, state, out=base_ring[frame_count % len(base_ring)])
+        for stage in output_stages:
+            stage.put((frame_count, base, state))
+
+    # 姿勢推定（メインスレッド）と描画（render スレッド）を重ねる。描画段は1本なのでフレーム順は保たれ、
+    # 描画バッファのリングは「writer キュー + 書き込み中 + 描画中」の本数のままで足りる
+    render_stage = StageThread(_render, maxsize=4, name="jva-render")
+    # 出力ごとの段は各自の可視化パイプライン・描画バッファ・writer だけを触るので互いに独立して進められる
+    output_stages = [
+        StageThread(lambda item, i=i: _render_output(i, *item), maxsize=variant_depth, name=f"jva-render-{i}")
+        for i in range(n_outputs)
+    ] if base_ring is not None else []
+    # pose_stride > 1 なら N フレームに1回だけ推論し、間のフレームはキーフレーム間の線形補間で埋める
+    # （補間には次のキーフレームが必要なので、間のフレームは pending に溜めてから順に出力する）
+    pose_stride = max(1, int(perf_cfg.get("pose_stride", 1) or 1))
+    pending: List[Tuple[int, np.ndarray]] = []
+    prev_landmarks = None
+    # performance.pose_backend: tasks なら PoseLandmarker（LIVE_STREAM）へ batch_size 枚ずつ非同期投入する
+    batch_landmarker = None
+    if perf_cfg.get("pose_backend") == "tasks":
+        batch_landmarker = PoseBackend(use_tasks=True, model_asset_path=perf_cfg.get("pose_model_path"),
+                                       delegate=perf_cfg.get("pose_delegate", "gpu")).init(fps)
+        if batch_landmarker is None:
+            logger.warning("MediaPipe Tasks backend unavailable (mediapipe.tasks or pose_model_path missing); using Solutions")
+        elif pose_stride > 1:
+            logger.warning("pose_stride is ignored with the Tasks batch backend")
+    batch_size = max(1, int(perf_cfg.get("pose_batch_size", 8) or 1))
+    # performance.smart_skip: 固定間隔の代わりに動きの小さい区間だけ推論を間引く（間は同じく線形補間）。
+    # 直近2キーフレームから等速で外挿した位置を SmartSkipper に渡し、1フレームあたりの移動量で判定する
+    skipper = None
+    if perf_cfg.get("smart_skip") and batch_landmarker is None:
+        skipper = SmartSkipper(pos_thresh=float(perf_cfg.get("smart_skip_thresh", 6.0)),
+                               max_skip=int(perf_cfg.get("smart_skip_max", 4)))
+        if pose_stride > 1:
+            logger.warning("pose_stride is ignored when smart_skip is enabled")
+            pose_stride = 1
+    key_idx = 0
+    key_xy = None   # 直近キーフレームのランドマーク（元解像度 px、未検出は NaN）
+    key_vel = None  # 直近2キーフレーム間の1フレームあたりの移動量
+
+    # 進捗は1秒に1回だけ出す。端末なら \r で同じ行を書き換え、ログには流さない
+    progress_tty = sys.stderr.isatty()
+    next_progress = time.monotonic() + 1.0
+
+    def _report_progress(frame_count):
+        msg = (f"Processing frame {frame_count}/{total_frames} ({frame_count * progress_scale:.1f}%)"
+               f" - Elapsed: {frame_count * inv_fps:.1f}s")
+        if progress_tty:
+            sys.stderr.write("\r" + msg)
+            sys.stderr.flush()
+        else:
+            logger.info(msg)
+
+    # Tasks バックエンドで間引かれたフレームは、pose_stride と同じく前後の結果の線形補間で埋める
+    # （次の結果がバッチをまたぐこともあるので dropped に溜めておく）
+    dropped: List[Tuple[int, np.ndarray]] = []
+
+    def _flush_batch():
+        nonlocal prev_landmarks
+        frames = [pose_analyzer.inference_input(f) for _, f in pending]
+        stamps = [int(idx * 1000 * inv_fps) for idx, _ in pending]
+        for (idx, pframe), lms in zip(pending, batch_landmarker.detect_batch(frames, stamps, hold_dropped=False)):
+            if lms is DROPPED:
+                dropped.append((idx, pframe))
+                continue
+            n_dropped = len(dropped)
+            for j, (didx, dframe) in enumerate(dropped, 1):
+                interp = interpolate_landmarks(prev_landmarks, lms, j / (n_dropped + 1))
+                _emit(didx, dframe, pose_analyzer.process_landmarks(dframe.shape, interp, fps))
+            dropped.clear()
+            _emit(idx, pframe, pose_analyzer.process_landmarks(pframe.shape, lms, fps))
+            prev_landmarks = lms
+        pending.clear()
+
     try:
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            frame_count += 1
-            if frame_count % 30 == 0:
-                progress = (frame_count / total_frames) * 100 if total_frames > 0 else 0
-                elapsed_time = (frame_count / fps) if fps > 0 else 0
-                logger.info(f"Processing frame {frame_count}/{total_frames} ({progress:.1f}%) - Elapsed: {elapsed_time:.1f}s")
-            state = pose_analyzer.process(frame, fps)
-            result = pose_analyzer.render_basic(frame, state)
-
-            # CSV用ランドマーク行を収集（全バリアント共通: 1回目フレームのみ記録）
-            _landmarks_rows.append({
-                "frame":         frame_count,
-                "time_sec":      (frame_count / fps) if fps > 0 else None,
-                "raw_landmarks": state.get("raw_landmarks"),
-            })
-
-            # report.json 用データ収集
-            points = state.get("points", [])
-            if points and any(p is not None for p in points):
-                _pose_detected_frames += 1
-                # adapters.py と同ロジックで px2m を計算
-                _px2m = None
-                if config.get("height_m") and len(points) > 28:
-                    sh  = points[11] or points[12]
-                    ank = [p for p in (points[27], points[28]) if p is not None]
-                    if sh is not None and ank:
-                        sh_y  = sh[1]
-                        ank_y = max(p[1] for p in ank)
-                        h_px  = abs(ank_y - sh_y)
-                        if h_px > 20:
-                            _px2m = (config["height_m"] * 0.8) / h_px
-                if _px2m and _px2m < 0.5:
-                    _px2m_samples.append(_px2m)
-                    # 右手首 (idx=16) 速度: 前フレームとの差分
-                    p16 = points[16] if len(points) > 16 else None
-                    if p16 is not None and hasattr(process_video, "_prev_wrist") and process_video._prev_wrist is not None:
-                        prev = process_video._prev_wrist
-                        dx = (p16[0] - prev[0]) * _px2m * fps
-                        dy = (p16[1] - prev[1]) * _px2m * fps
-                        spd_ms = float(np.hypot(dx, dy))
-                        if spd_ms < 35.0:
-                            _wrist_speeds_ms.append(spd_ms)
-                    process_video._prev_wrist = points[16] if len(points) > 16 else None
-                else:
-                    if not hasattr(process_video, "_prev_wrist"):
-                        process_video._prev_wrist = None
-            if visual_pipeline:
-                try:
-                    result = visual_pipeline.apply_all(
-                        result, state, fps, config.get("height_m")
-                    )
-                except Exception as e:
-                    logger.error(f"Visual pipeline error at frame {frame_count}: {e}")
-            if export_landmarks and state.get("points"):
-                frame_landmarks = []
-                for i, point in enumerate(state["points"]):
-                    if point is not None:
-                        frame_landmarks.append({
-                            "id": i,
-                            "x": float(point[0]) / width,
-                            "y": float(point[1]) / height,
-                            "visibility": 1.0
-                        })
-                    else:
-                        frame_landmarks.append({
-                            "id": i,
-                            "x": 0.0,
-                            "y": 0.0,
-                            "visibility": 0.0
-                        })
-                landmarks_data.append({
-                    "frame": frame_count,
-                    "timestamp": frame_count / fps,
-                    "landmarks": frame_landmarks
-                })
-            out.write(result)
+        for frame_count, frame in reader:
+            now = time.monotonic()
+            if now >= next_progress:
+                next_progress = now + 1.0
+                _report_progress(frame_count)
+            if batch_landmarker is not None:
+                pending.append((frame_count, frame))
+                if len(pending) >= batch_size:
+                    _flush_batch()
+                continue
+            if skipper is not None:
+                if key_xy is not None and not skipper.should_infer(key_xy + key_vel * (frame_count - key_idx)):
+                    pending.append((frame_count, frame))
+                    continue
+            elif pose_stride == 1:
+                _emit(frame_count, frame, pose_analyzer.process(frame, fps))
+                continue
+            elif (frame_count - 1) % pose_stride:
+                pending.append((frame_count, frame))
+                continue
+            landmarks = pose_analyzer.detect(frame)
+            n_pending = len(pending)
+            for j, (idx, pframe) in enumerate(pending, 1):
+                interp = interpolate_landmarks(prev_landmarks, landmarks, j / (n_pending + 1))
+                _emit(idx, pframe, pose_analyzer.process_landmarks(pframe.shape, interp, fps))
+            pending.clear()
+            state = pose_analyzer.process_landmarks(frame.shape, landmarks, fps)
+            _emit(frame_count, frame, state)
+            prev_landmarks = landmarks
+            if skipper is not None:
+                xy = state["points_xy"]
+                key_vel = np.zeros_like(xy) if key_xy is None else (xy - key_xy) / (frame_count - key_idx)
+                key_xy, key_idx = xy, frame_count
+        if batch_landmarker is not None:
+            _flush_batch()
+            pending.extend(dropped)
+            if batch_landmarker.dropped_frames:
+                logger.warning(f"{batch_landmarker.dropped_frames} frame(s) dropped by the Tasks backend "
+                               "were interpolated from neighbouring poses")
+        # 最後のキーフレーム以降は次がないので直前のキーフレームを保持する
+        for idx, pframe in pending:
+            _emit(idx, pframe, pose_analyzer.process_landmarks(pframe.shape, prev_landmarks, fps))
     except KeyboardInterrupt:
         logger.info("Processing interrupted by user")
     except Exception as e:
         logger.error(f"Error during processing: {e}")
-        return False
+        ok = [False] * n_outputs
     finally:
+        if progress_tty:
+            sys.stderr.write("\n")
+        reader.close()
         cap.release()
-        out.release()
-        pose_analyzer.close()
+        try:
+            render_stage.close()
+        except Exception as e:
+            logger.error(f"Error during rendering: {e}")
+            ok = [False] * n_outputs
+        for i, stage in enumerate(output_stages):
+            try:
+                stage.close()
+            except Exception as e:
+                logger.error(f"Error during rendering {outputs[i][0]}: {e}")
+                ok[i] = False
+        for i, (fw, out) in enumerate(zip(frame_writers, writers)):
+            try:
+                fw.close()
+            except Exception as e:
+                if ok[i]:
+                    logger.error(f"Failed to write output video {outputs[i][0]}: {e}")
+                ok[i] = False
+            out.release()
+        if owns_analyzer:
+            pose_analyzer.close()
+        if batch_landmarker is not None:
+            batch_landmarker.close()
+        if landmarks_writer is not None:
+            landmarks_writer.close()
+    if not any(ok):
+        return ok
     processing_time = frame_count / fps if fps > 0 else 0
-    logger.info(f"Video processing completed: {output_path}")
     logger.info(f"Processed {frame_count} frames in {processing_time:.2f}s of video content")
 
-    # ── report.json 出力 ──────────────────────────────────────────────────────
+    report_paths = []
+    for i, (output_path, vcfg) in enumerate(outputs):
+        if not ok[i]:
+            continue
+        logger.info(f"Video processing completed: {output_path}")
+        report_path = _write_report(
+            input_path, output_path, vcfg,
+            width=width, height=height, fps=fps, total_frames=total_frames, frame_count=frame_count,
+            pose_detected_frames=_pose_detected_frames, wrist_speeds_ms=_wrist_speeds_ms,
+            px2m_samples=_px2m_samples, landmarks_rows=_landmarks_rows,
+        )
+        if report_path:
+            report_paths.append(report_path)
+    # PDF・サマリーはジョブ全体で1つなので、全出力の report.json が揃ってから1回だけ作る
+    try:
+        _write_job_reports(report_paths)
+    except Exception as e:
+        logger.warning(f"Failed to generate job reports: {e}")
+    if landmarks_writer is not None and landmarks_writer.frame_count:
+        logger.info(f"Exported landmarks to: {landmarks_path}")
+        if config.get("blender", {}).get("enabled", False):
+            output_path = outputs[0][0]
+            blender_output = output_path.replace(".mp4", "_blender_overlay.mp4")
+            print_blender_commands(output_path, landmarks_path, blender_output)
+    return ok
+
+
+def _write_report(input_path: str, output_path: str, config: Dict[str, Any], *,
+                  width: int, height: int, fps: float, total_frames: int, frame_count: int,
+                  pose_detected_frames: int, wrist_speeds_ms: list, px2m_samples: list,
+                  landmarks_rows: list) -> Optional[str]:
+    """report.json と付随データ（CSV・代表フレーム・グラフ）を出力し、report.json のパスを返す"""
     try:
         import datetime
-        px2m_mean = float(np.mean(_px2m_samples)) if _px2m_samples else None
-        spd_arr   = np.array(_wrist_speeds_ms) if _wrist_speeds_ms else np.array([])
+        # レポート系モジュールは matplotlib / pandas を読み込むため、
+        # --help や設定解析だけの起動で払わないよう使用時に import する
+        from src.data_exporter import export_pose_landmarks_csv
+        from src.frame_extractor import extract_smart_frames
+        from src.valid_segment_detector import detect_valid_pose_segment, save_valid_segment
+        from src.graph_generator import generate_graphs_for_job
+        import numpy as np  # type: ignore
+        px2m_mean = float(np.mean(px2m_samples)) if px2m_samples else None
+        spd_arr   = np.array(wrist_speeds_ms) if wrist_speeds_ms else np.array([])
         max_spd_ms   = float(np.max(spd_arr))  if len(spd_arr) else None
         mean_spd_ms  = float(np.mean(spd_arr)) if len(spd_arr) else None
 
@@ -849,8 +1171,8 @@ def process_video(input_path: str, output_path: str, config: Dict[str, Any]) ->
                 "height_m": config.get("height_m"),
                 "px2m_mean": round(px2m_mean, 6) if px2m_mean else None,
                 "calibrated": px2m_mean is not None,
-                "pose_detected_frames": _pose_detected_frames,
-                "pose_detection_rate": round(_pose_detected_frames / frame_count, 3) if frame_count else 0,
+                "pose_detected_frames": pose_detected_frames,
+                "pose_detection_rate": round(pose_detected_frames / frame_count, 3) if frame_count else 0,
                 "wrist_max_speed_kmh":  round(max_spd_ms  * 3.6, 1) if max_spd_ms  else None,
                 "wrist_mean_speed_kmh": round(mean_spd_ms * 3.6, 1) if mean_spd_ms else None,
                 "release_speed_kmh": release_kmh,
@@ -871,7 +1193,7 @@ def process_video(input_path: str, output_path: str, config: Dict[str, Any]) ->
                 csv_rel_path = "pose_landmarks.csv"
             # all_variants 等で複数回呼ばれる場合は既存ファイルを上書きしない
             if not _csv_path.exists():
-                export_pose_landmarks_csv(_landmarks_rows, _csv_path)
+                export_pose_landmarks_csv(landmarks_rows, _csv_path)
         except Exception as csv_err:
             logger.warning(f"Failed to write pose_landmarks.csv: {csv_err}")
             csv_rel_path = None
@@ -930,11 +1252,6 @@ def process_video(input_path: str, output_path: str, config: Dict[str, Any]) ->
         except Exception as frame_err:
             logger.warning(f"Failed to extract representative frames: {frame_err}")
 
-        report_path = output_path.replace(".mp4", "_report.json")
-        with open(report_path, "w", encoding="utf-8") as f:
-            json.dump(report, f, ensure_ascii=False, indent=2)
-        logger.info(f"Report saved: {report_path}")
-
         # ── グラフ画像生成（CSV 出力後に実行、all_variants では1回目のみ）──
         try:
             _job_dir = Path(output_path).parent.parent
@@ -943,58 +1260,70 @@ def process_video(input_path: str, output_path: str, config: Dict[str, Any]) ->
                 _graph_paths = generate_graphs_for_job(_job_dir)
                 if _graph_paths:
                     _graph_rels = [f"report/graphs/{Path(p).name}" for p in _graph_paths]
-                    # report.json を再読み込みして visual_files.graphs を追記
-                    with open(report_path, "r", encoding="utf-8") as _f:
-                        _rep = json.load(_f)
-                    _vf = _rep.setdefault("visual_files", {})
-                    _vf["graphs"] = _graph_rels
-                    with open(report_path, "w", encoding="utf-8") as _f:
-                        json.dump(_rep, _f, ensure_ascii=False, indent=2)
+                    # 書き出し前の report に追記するので report.json の読み直し・書き直しは不要
+                    report.setdefault("visual_files", {})["graphs"] = _graph_rels
                     logger.info(f"Graph paths added to report.json: {_graph_rels}")
         except Exception as _graph_err:
             logger.warning(f"Failed to generate graphs: {_graph_err}")
 
-        # ── PDFレポート生成（グラフ生成後に実行）────────────────────────────────
-        try:
-            _pdf_path = generate_pdf_report_for_job(_job_dir)
-            # report.json に report_files.pdf を追記
-            with open(report_path, "r", encoding="utf-8") as _f:
-                _rep = json.load(_f)
-            _rep.setdefault("report_files", {})["pdf"] = "report/report.pdf"
-            with open(report_path, "w", encoding="utf-8") as _f:
-                json.dump(_rep, _f, ensure_ascii=False, indent=2)
-            logger.info(f"PDF report path added to report.json: report/report.pdf")
-        except Exception as _pdf_err:
-            logger.warning(f"Failed to generate PDF report: {_pdf_err}")
+        report_path = output_path.replace(".mp4", "_report.json")
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        logger.info(f"Report saved: {report_path}")
+
+        return report_path
+    except Exception as e:
+        logger.warning(f"Failed to write report.json: {e}")
+        return None
+
 
-        # ── 解析サマリー JSON 生成（PDF 生成後に実行）────────────────────────────
+def _write_job_reports(report_paths: List[str]) -> None:
+    """ジョブ単位の PDF レポート・解析サマリーを1回だけ生成し、各 report.json に追記する
+
+    どちらもジョブディレクトリ全体から作るので、マルチ出力でも出力ごとに作り直さない。
+    """
+    if not report_paths:
+        return
+    from src.pdf_report_generator import generate_pdf_report_for_job
+    from src.analysis_summary import generate_analysis_summary_for_job
+    _job_dir = Path(report_paths[0]).parent.parent
+    report_files = {}
+
+    # ── PDFレポート生成（グラフ生成後に実行）────────────────────────────────
+    try:
+        generate_pdf_report_for_job(_job_dir)
+        report_files["pdf"] = "report/report.pdf"
+        logger.info("PDF report path added to report.json: report/report.pdf")
+    except Exception as _pdf_err:
+        logger.warning(f"Failed to generate PDF report: {_pdf_err}")
+
+    # ── 解析サマリー JSON 生成（PDF 生成後に実行）────────────────────────────
+    try:
+        _summary_path = generate_analysis_summary_for_job(_job_dir)
+        report_files["analysis_summary"] = "report/analysis_summary.json"
+        logger.info(f"Analysis summary saved: {_summary_path}")
+    except Exception as _summary_err:
+        logger.warning(f"Failed to generate analysis summary: {_summary_err}")
+
+    if not report_files:
+        return
+    for report_path in report_paths:
         try:
-            _summary_path = generate_analysis_summary_for_job(_job_dir)
             with open(report_path, "r", encoding="utf-8") as _f:
                 _rep = json.load(_f)
-            _rep.setdefault("report_files", {})["analysis_summary"] = "report/analysis_summary.json"
+            _rep.setdefault("report_files", {}).update(report_files)
             with open(report_path, "w", encoding="utf-8") as _f:
                 json.dump(_rep, _f, ensure_ascii=False, indent=2)
-            logger.info(f"Analysis summary saved: {_summary_path}")
-        except Exception as _summary_err:
-            logger.warning(f"Failed to generate analysis summary: {_summary_err}")
-
-    except Exception as e:
-        logger.warning(f"Failed to write report.json: {e}")
-    if export_landmarks and landmarks_data:
-        landmarks_filename = config.get("output", {}).get("landmarks_filename", "landmarks.json")
-        if os.path.isabs(landmarks_filename) or os.path.dirname(landmarks_filename):
-            landmarks_path = landmarks_filename
-        else:
-            landmarks_path = os.path.join(output_dir, landmarks_filename) if output_dir else landmarks_filename
-        export_landmarks_json(landmarks_data, landmarks_path)
-        if config.get("blender", {}).get("enabled", False):
-            blender_output = output_path.replace(".mp4", "_blender_overlay.mp4")
-            print_blender_commands(output_path, landmarks_path, blender_output)
-    return True
+        except Exception as e:
+            logger.warning(f"Failed to update {report_path}: {e}")
 
 
 def main():
+    # BLAS のスレッドは OpenCV / MediaPipe のスレッドと取り合うので、numpy を読み込む前に 1 本に絞る
+    # （環境変数で明示されていればそちらを優先）。import 時に設定するとサーバーなど
+    # jva.run を読み込むだけのプロセスまで巻き込むので、CLI の入口でだけ行う
+    os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
+
     # Windows cp932 コンソールで絵文字が UnicodeEncodeError になるのを防ぐ
     if sys.stdout.encoding and sys.stdout.encoding.lower() in ("cp932", "cp936", "cp949", "cp950", "mbcs"):
         sys.stdout = open(sys.stdout.fileno(), mode="w", encoding="utf-8", buffering=1, closefd=False)
@@ -1057,6 +1386,8 @@ def main():
     # ── Blender / Landmarks ───────────────────────────────────────────────────
     parser.add_argument("--export-landmarks", metavar="LANDMARKS_JSON", help="ランドマークをJSONで出力（ファイルパスを指定）")
     parser.add_argument("--blender-overlay",  action="store_true",      help="Blender実行コマンドを表示（要 --export-landmarks）")
+    # ── 高速化 ───────────────────────────────────────────────────────────────
+    parser.add_argument("--pose-stride", type=int, metavar="N", help="N フレームに1回だけ姿勢推定し、間のフレームは線形補間する（既定: 1 = 全フレーム）")
     # ── その他 ───────────────────────────────────────────────────────────────
     parser.add_argument("--verbose", action="store_true", help="詳細ログを出力")
     args = parser.parse_args()
@@ -1099,7 +1430,7 @@ def main():
     args.output = str(Path(args.output).resolve())
     config = load_config(args.config)
     config = override_config_with_args(config, args)
-    if not VISUALS_AVAILABLE and any([args.vectors, args.heatmap, args.hud, args.stickman, args.analysis, args.wrist_trail, args.glow_trail, args.all_variants]):
+    if _visuals() is None and any([args.vectors, args.heatmap, args.hud, args.stickman, args.analysis, args.wrist_trail, args.glow_trail, args.all_variants]):
         logger.warning("可視化機能が利用できません。基本機能のみで実行します。")
     if args.all_variants:
         success = process_video_all_variants(args.video, args.output, config)
@@ -1,6 +1,61 @@
 from typing import Optional, Sequence
 import math
 
+import numpy as np
+
+from src.utils._jit import NUMBA_AVAILABLE, njit
+from src.utils.arrays import as_c
+
+# sample subset (every 3rd point) to reduce cost
+_SAMPLE_STRIDE = 3
+
+
+@njit(cache=True)
+def _score_nb(curr, prev, stride):
+    """Mean squared displacement over every stride-th joint visible in both (NaN = missing).
+
+    Returns 0.0 when no sampled joint is visible in both frames. fastmath is left off
+    because it lets the compiler assume no NaNs, which would break the visibility test.
+    """
+    n = min(curr.shape[0], prev.shape[0])
+    total = 0.0
+    count = 0
+    for i in range(0, n, stride):
+        cx = curr[i, 0]
+        px = prev[i, 0]
+        if cx != cx or px != px:  # NaN check that numba compiles to a plain compare
+            continue
+        dx = cx - px
+        dy = curr[i, 1] - prev[i, 1]
+        total += dx * dx + dy * dy
+        count += 1
+    if count == 0:
+        return 0.0
+    return total / count
+
+
+def _score_np(curr, prev, stride):
+    """NumPy version of _score_nb, used when numba is not installed (the loop would run in Python)."""
+    n = min(curr.shape[0], prev.shape[0])
+    diff = curr[:n:stride] - prev[:n:stride]
+    # row-wise dx^2 + dy^2 without materializing the squared array; NaN rows stay NaN
+    sq = np.einsum("ij,ij->i", diff, diff)
+    visible = sq[~np.isnan(sq)]
+    if visible.size == 0:
+        return 0.0
+    return float(visible.mean())
+
+
+_score_kernel = _score_nb if NUMBA_AVAILABLE else _score_np
+
+
+def _as_xy(landmarks) -> np.ndarray:
+    """Landmarks as a C-contiguous float32 (N, 2) array with NaN rows for missing points."""
+    if isinstance(landmarks, np.ndarray):
+        return as_c(landmarks.astype(np.float32, copy=False))
+    return np.array([p if p is not None else (np.nan, np.nan) for p in landmarks], dtype=np.float32).reshape(-1, 2)
+
+
 class SmartSkipper:
     """Simple motion-based frame skipper.
     - pos_thresh: squared pixel distance threshold across key landmarks
@@ -13,44 +68,35 @@ class SmartSkipper:
         self.max_skip = max_skip
         self._cooldown = 0
         self._skipped = 0
-        self._prev: Optional[Sequence[Optional[tuple[float, float]]]] = None
+        # previous landmarks as a (N, 2) float32 array, NaN for missing points
+        self._prev: Optional[np.ndarray] = None
 
     def _score(self, landmarks: Optional[Sequence[Optional[tuple[float, float]]]]) -> float:
-        if not landmarks or all(p is None for p in landmarks):
+        if landmarks is None or len(landmarks) == 0:
             return math.inf  # force infer if nothing
-        if self._prev is None:
+        cur = _as_xy(landmarks)
+        if np.isnan(cur[:, 0]).all() or self._prev is None:
             return math.inf
-        total = 0.0
-        count = 0
-        # sample subset (every 3rd point) to reduce cost
-        for i, p in enumerate(landmarks):
-            if i % 3 != 0:
-                continue
-            q = self._prev[i] if i < len(self._prev) else None
-            if p is None or q is None:
-                continue
-            dx = (p[0] - q[0])
-            dy = (p[1] - q[1])
-            total += dx * dx + dy * dy
-            count += 1
-        return total / max(count, 1)
+        return float(_score_kernel(cur, _as_xy(self._prev), _SAMPLE_STRIDE))
 
     def should_infer(self, landmarks: Optional[Sequence[Optional[tuple[float, float]]]]) -> bool:
+        # convert once; _score and _prev reuse the same array
+        cur = None if landmarks is None else _as_xy(landmarks)
         # cooldown period forces keeping frames
         if self._cooldown > 0:
             self._cooldown -= 1
-            self._prev = landmarks
+            self._prev = cur
             return True
 
-        score = self._score(landmarks)
+        score = self._score(cur)
         if score >= self.pos_thresh or self._skipped >= self.max_skip:
             # infer now, start cooldown
             self._cooldown = self.min_keep
             self._skipped = 0
-            self._prev = landmarks
+            self._prev = cur
             return True
         else:
             # skip
             self._skipped += 1
-            self._prev = landmarks
+            self._prev = cur
             return False
@@ -1,7 +1,6 @@
 import numpy as np
 import cv2
 from src.utils.filters import apply_median_filter
-from src.utils.visualization import overlay_heatmap
 
 
 def calculate_acceleration_heatmap(speed_series: np.ndarray) -> np.ndarray:
@@ -24,27 +23,29 @@ def calculate_acceleration_heatmap(speed_series: np.ndarray) -> np.ndarray:
     if n == 0:
         return np.zeros((0, 0), dtype=np.float32)
 
-    # Pairwise absolute differences
-    a = speed_series.reshape(n, 1)
-    b = speed_series.reshape(1, n)
-    diff = np.abs(a - b).astype(np.float32)
-    # Normalize to [0, 1]
-    maxv = float(diff.max()) if diff.size > 0 else 0.0
+    # Pairwise absolute differences, computed in place in a single N x N float32 buffer
+    diff = np.empty((n, n), dtype=np.float32)
+    np.subtract.outer(speed_series, speed_series, out=diff)
+    np.abs(diff, out=diff)
+    # Normalize to [0, 1]; the largest pairwise difference is max - min, no extra pass needed
+    maxv = float(speed_series.max() - speed_series.min())
     if maxv > 0:
-        diff /= maxv
-    return diff.astype(np.float32)
+        np.divide(diff, np.float32(maxv), out=diff)
+    return diff
 
 def calculate_acceleration(velocity, time_intervals):
-    # time_intervalsの長さをvelocityに合わせる
-    if len(time_intervals) != len(velocity) - 1:
-        # フレーム間の時間間隔を計算（velocityの長さ-1）
-        time_intervals = time_intervals[:len(velocity)-1] if len(time_intervals) > len(velocity)-1 else time_intervals * ((len(velocity)-1) // len(time_intervals) + 1)
-        time_intervals = time_intervals[:len(velocity)-1]
-    
-    acceleration = np.diff(velocity) / np.array(time_intervals)
-    return np.concatenate(([0], acceleration))  # Prepend 0 for the first frame
-
-def generate_acceleration_heatmap(video_path, output_path, time_intervals=None):
+    velocity = np.asarray(velocity, dtype=np.float32)
+    n = max(len(velocity) - 1, 0)
+    # time_intervalsの長さをvelocity-1に合わせる（短ければ先頭から繰り返す）
+    time_intervals = np.asarray(time_intervals, dtype=np.float32)
+    if len(time_intervals) != n:
+        time_intervals = np.resize(time_intervals, n)
+
+    acceleration = np.zeros(n + 1, dtype=np.float32)  # 先頭フレームは 0
+    np.divide(np.diff(velocity), time_intervals, out=acceleration[1:])
+    return acceleration
+
+def generate_acceleration_heatmap(video_path, output_path, time_intervals=None, velocity=None, use_opencl=False):
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         print("Error: Could not open video.")
@@ -53,26 +54,16 @@ def generate_acceleration_heatmap(video_path, output_path, time_intervals=None):
     frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     fps = cap.get(cv2.CAP_PROP_FPS)
     
-    # time_intervalsがNoneまたは不適切な場合は、FPSから計算
-    if time_intervals is None or len(time_intervals) == 0:
-        frame_interval = 1.0 / fps if fps > 0 else 1.0/30.0
-        time_intervals = [frame_interval] * (frame_count - 1)
-    elif len(time_intervals) != frame_count - 1:
-        # time_intervalsをframe_count-1の長さに調整
+    # time_intervalsがNoneまたはframe_count-1の長さでない場合は、FPSから計算
+    if time_intervals is None or len(time_intervals) != frame_count - 1:
         frame_interval = 1.0 / fps if fps > 0 else 1.0/30.0
-        time_intervals = [frame_interval] * (frame_count - 1)
-    
-    velocity = np.zeros(frame_count)
-    acceleration = np.zeros(frame_count)
+        time_intervals = np.full(max(frame_count - 1, 0), frame_interval, dtype=np.float32)
 
-    # Placeholder for velocity calculation
-    for i in range(frame_count):
-        ret, frame = cap.read()
-        if not ret:
-            break
-        # Here you would calculate velocity based on your specific logic
-        # For demonstration, we will use a dummy velocity
-        velocity[i] = np.random.rand() * 10  # Replace with actual velocity calculation
+    # 速度系列が渡されなければダミー値を使う（速度算出のためだけに動画を先読みしない）
+    if velocity is None:
+        velocity = np.random.rand(frame_count).astype(np.float32) * 10
+    else:
+        velocity = np.resize(np.asarray(velocity, dtype=np.float32), frame_count)
 
     # Calculate acceleration
     acceleration = calculate_acceleration(velocity, time_intervals)
@@ -80,16 +71,18 @@ def generate_acceleration_heatmap(video_path, output_path, time_intervals=None):
     # Apply smoothing filter to acceleration
     smoothed_acceleration = apply_median_filter(acceleration)
 
-    # Create a heatmap based on smoothed acceleration - 正しいデータ型に変換
-    heatmap = np.zeros(frame_count, dtype=np.float32)
-    for i in range(frame_count):
-        heatmap[i] = smoothed_acceleration[i]
+    # Create a heatmap based on smoothed acceleration - medfilt は float32 入力なら float32 の連続配列を返すのでコピーしない
+    heatmap = np.ascontiguousarray(smoothed_acceleration, dtype=np.float32)
     
-    # heatmapを0-255の範囲に正規化してCV_8UC1形式に変換
-    heatmap_normalized = ((heatmap - heatmap.min()) / (heatmap.max() - heatmap.min() + 1e-8) * 255).astype(np.uint8)
+    # heatmapを0-255の範囲に正規化してCV_8UC1形式に変換（中間配列は1本だけ確保して in-place で計算）
+    lo = heatmap.min()
+    denom = heatmap.max() - lo + 1e-8
+    scaled = np.subtract(heatmap, lo)
+    np.divide(scaled, denom, out=scaled)
+    np.multiply(scaled, 255, out=scaled)
+    heatmap_normalized = scaled.astype(np.uint8)
 
     # Overlay heatmap on video frames
-    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     
@@ -97,13 +90,39 @@ def generate_acceleration_heatmap(video_path, output_path, time_intervals=None):
     fourcc = cv2.VideoWriter_fourcc(*'mp4v')
     out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
 
+    # JET 色は 0-255 の 256 色 LUT として先に求めておき、ループ内は単色タイルとのブレンドだけにする
+    jet_lut = cv2.applyColorMap(np.arange(256, dtype=np.uint8).reshape(-1, 1), cv2.COLORMAP_JET).reshape(-1, 3)
+    levels = heatmap_normalized.tolist()
+    tile = np.empty((height, width, 3), dtype=np.uint8)
+    tile_level = None
+    out_buf = np.empty_like(tile)
+    # use_opencl なら UMat（OpenCL デバイス）上でブレンドする。単色タイルを転送しないよう
+    # 0.7 * frame + 0.3 * color を 3x4 のアフィン変換1回で計算する（丸めの差で ±1 になる画素がある）
+    use_opencl = use_opencl and cv2.ocl.haveOpenCL()
+    if use_opencl:
+        cv2.ocl.setUseOpenCL(True)
+        blend = np.zeros((3, 4), dtype=np.float64)
+        blend[:, :3] = np.eye(3) * 0.7
     for i in range(frame_count):
         ret, frame = cap.read()
         if not ret:
             break
-        # 正規化されたheatmap値を使用
-        overlay_frame = overlay_heatmap(frame, heatmap_normalized[i])
-        out.write(overlay_frame)
+        level = levels[i]
+        if use_opencl:
+            blend[:, 3] = jet_lut[level] * 0.3
+            out.write(cv2.transform(cv2.UMat(frame), blend).get())
+            continue
+        if frame.shape != tile.shape:
+            tile = np.empty(frame.shape, dtype=np.uint8)
+            out_buf = np.empty_like(tile)
+            tile_level = None
+        # 平滑化後の系列は同じ値が続きやすいので、色が変わったときだけタイルを塗り直す
+        if level != tile_level:
+            tile[:] = jet_lut[level]
+            tile_level = level
+        # overlay_heatmap と同じ 0.7 / 0.3 のブレンドを使い回しのバッファへ
+        cv2.addWeighted(frame, 0.7, tile, 0.3, 0, dst=out_buf)
+        out.write(out_buf)
 
     cap.release()
     out.release()
@@ -1,3 +1,6 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+
 import cv2
 import numpy as np
 
@@ -18,11 +21,115 @@ except Exception as first_err:
         from src.utils.mock_mediapipe import mp
         MEDIAPIPE_AVAILABLE = False
 
+from src.jva.frame_pipeline import FrameReaderThread
+from src.utils.arrays import as_c
+from src.utils.frame_cache import DHashCache, dhash
+
 RIGHT_WRIST_IDX = 16
 VIS_THRESH = 0.5
 
+
+@lru_cache(maxsize=None)
+def _colormap_lut(colormap):
+    """OpenCV カラーマップの 256 色 BGR テーブル (256, 3) uint8（カラーマップごとに1回だけ作る）"""
+    lut = cv2.applyColorMap(np.arange(256, dtype=np.uint8).reshape(256, 1), colormap).reshape(256, 3)
+    lut.setflags(write=False)
+    return lut
+
+
+def resize_for_inference(frame, width):
+    """推論入力用に幅 width まで縮小する（width 以下・None ならそのまま、C 連続を保証）"""
+    h, w = frame.shape[:2]
+    if not width or w <= width:
+        return as_c(frame)
+    new_h = max(1, int(round(h * width / w)))
+    return cv2.resize(frame, (width, new_h), interpolation=cv2.INTER_AREA)
+
+
+@dataclass
+class FrameContext:
+    """1フレーム分の BGR 画像と、推論入力（縮小・RGB 変換済み）のキャッシュ
+
+    同じフレームを PoseAnalyzer と PoseVisualizer の両方に通すときに、縮小と BGR→RGB 変換を
+    1回で済ませる。process / detect / visualize_pose は ndarray を渡されたら内部で包む。
+    """
+    bgr: np.ndarray
+    _inputs: dict = field(default_factory=dict, repr=False)
+
+    @property
+    def shape(self):
+        return self.bgr.shape
+
+    def inference_input(self, width=None):
+        """幅 width に縮小した BGR 画像（幅ごとに1回だけ作る）"""
+        key = ("bgr", width)
+        img = self._inputs.get(key)
+        if img is None:
+            img = self._inputs[key] = resize_for_inference(self.bgr, width)
+        return img
+
+    def rgb(self, width=None, buf=None):
+        """幅 width に縮小した RGB 画像（幅ごとに1回だけ変換する）
+
+        buf を渡すと変換先として使う（形が合わなければ新しく確保する）。
+        """
+        key = ("rgb", width)
+        img = self._inputs.get(key)
+        if img is None:
+            small = self.inference_input(width)
+            if buf is None or buf.shape != small.shape:
+                buf = np.empty(small.shape, np.uint8)
+            img = self._inputs[key] = cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=buf)
+        return img
+
+
+def as_frame_context(frame):
+    return frame if isinstance(frame, FrameContext) else FrameContext(frame)
+
+
+class _Landmark:
+    __slots__ = ("x", "y", "z", "visibility")
+
+    def __init__(self, x, y, z, visibility):
+        self.x = x; self.y = y; self.z = z; self.visibility = visibility
+
+
+class _Landmarks:
+    """MediaPipe の pose_landmarks と同じく .landmark で各点を引ける補間結果"""
+    __slots__ = ("landmark", "_arr")
+
+    def __init__(self, landmark, arr=None):
+        self.landmark = landmark
+        self._arr = arr  # 補間に使った (33, 4) 配列（as_array() でそのまま返す）
+
+    def as_array(self):
+        if self._arr is None:
+            self._arr = np.array([(lm.x, lm.y, lm.z, lm.visibility or 0.0) for lm in self.landmark], np.float64)
+        return self._arr
+
+
+def _landmarks_array(landmarks):
+    """(33, 4) [x, y, z, visibility] float64。as_array() を持つ結果（モック・補間結果）は属性ループを省く"""
+    as_array = getattr(landmarks, "as_array", None)
+    if as_array is not None:
+        return np.asarray(as_array(), np.float64)
+    return np.array([(lm.x, lm.y, lm.z, lm.visibility or 0.0) for lm in landmarks.landmark], np.float64)
+
+
+def interpolate_landmarks(a, b, alpha):
+    """2つのキーフレームの pose_landmarks を alpha (0..1) で線形補間する
+
+    どちらかが未検出（None）なら近い方のキーフレームをそのまま返す。
+    """
+    if a is None or b is None:
+        return a if alpha < 0.5 else b
+    arr_a = _landmarks_array(a)
+    arr = arr_a + (_landmarks_array(b) - arr_a) * alpha
+    return _Landmarks([_Landmark(*row) for row in arr.tolist()], arr)
+
 class PoseAnalyzer:
-    def __init__(self, model_complexity=1, min_det_conf=0.5, min_track_conf=0.5, max_path_len=300, meters_per_pixel=None):
+    def __init__(self, model_complexity=1, min_det_conf=0.5, min_track_conf=0.5, max_path_len=300, meters_per_pixel=None,
+                 frame_cache_size=0, frame_cache_max_distance=3, inference_width=None):
         self.mediapipe_available = MEDIAPIPE_AVAILABLE
         self.mp_pose = mp.solutions.pose
         
@@ -38,17 +145,53 @@ class PoseAnalyzer:
             self.pose = self.mp_pose.Pose()
             
         self.connections = list(self.mp_pose.POSE_CONNECTIONS)
-        self.prev_points = None
-        self.velocities = None
-        self.right_wrist_path = []
+        # 骨格の辺 (E, 2)。可視な両端を持つ辺だけを cv2.polylines へまとめて渡す
+        self._conn_arr = np.array(self.connections, dtype=np.intp).reshape(-1, 2)
         self.max_path_len = max_path_len
-        self.max_speed = 1.0     # カラーマップのダイナミックレンジ
-        self.m_per_px = meters_per_pixel  # 実寸換算スケール（m/px） 未指定ならpx/s
+        self.initial_m_per_px = meters_per_pixel
+        # 静止・重複フレームの推論結果キャッシュ（dHash キー）。0 で無効
+        self.frame_cache = DHashCache(frame_cache_size, frame_cache_max_distance) if frame_cache_size > 0 else None
+        self.reset()
+        # 推論用の縮小幅（px、None で縮小しない）。BlazePose は内部で 256px 程度に縮めるので
+        # 大きな入力は前処理の無駄になる。ランドマークは正規化座標なので描画は元解像度のまま
+        self.inference_width = inference_width
+        # BGR→RGB 変換先（推論入力サイズが変わったときだけ確保し直す）
+        self._rgb_buf = None
+        # 描画用の作業バッファ（render_* ごとに別名で持つ。サイズが変わったときだけ確保し直す）
+        self._render_bufs = {}
+        # _draw_axes のグリッド画素（(h, w, ox, oy, step) ごと）
+        self._grid_cache = {}
+        # _draw_colorbar のグラデーション（(bar_h, bar_w) ごと）
+        self._colorbar_cache = {}
         
         if not self.mediapipe_available:
             print("WARNING: MediaPipe not available. Pose detection will not work.")
 
+    def reset(self):
+        """動画ごとの状態（前フレーム・速度・軌跡・スケール・キャッシュ）を初期化する
+
+        MediaPipe のグラフは保持したままなので、1つのインスタンスを複数動画で使い回せる。
+        """
+        self.prev_xy = None      # 前フレームの points_xy（速度計算用）
+        self.velocities = None
+        # 右手首の軌跡（max_path_len 点のリングバッファ）
+        self._rw_buf = np.zeros((self.max_path_len, 2), np.int32)
+        self._rw_head = 0
+        self._rw_len = 0
+        self.max_speed = 1.0     # カラーマップのダイナミックレンジ
+        self.m_per_px = self.initial_m_per_px  # 実寸換算スケール（m/px） 未指定ならpx/s
+        if self.frame_cache is not None:
+            self.frame_cache.clear()
+
     # スケール設定
+    @property
+    def right_wrist_path(self):
+        """右手首の軌跡を古い順に並べた (N, 2) int32 配列（リングバッファのコピー）"""
+        n, head = self._rw_len, self._rw_head
+        if n < self.max_path_len:
+            return self._rw_buf[:n].copy()
+        return np.concatenate((self._rw_buf[head:], self._rw_buf[:head]))
+
     def set_scale(self, meters_per_pixel: float):
         if meters_per_pixel and meters_per_pixel > 0:
             self.m_per_px = float(meters_per_pixel)
@@ -61,50 +204,68 @@ class PoseAnalyzer:
         self.pose.close()
 
     # 内部ユーティリティ
-    def _landmarks_to_points(self, frame_shape, landmarks):
+    def _landmarks_to_xy(self, frame_shape, landmarks):
+        """ランドマークをピクセル座標 (33, 2) float32 に変換する。不可視・画面外は NaN"""
         h, w = frame_shape[:2]
-        pts = [None] * 33
-        for i, lm in enumerate(landmarks.landmark):
-            if lm.visibility is None or lm.visibility < VIS_THRESH:
-                pts[i] = None
-            else:
-                x = int(lm.x * w); y = int(lm.y * h)
-                pts[i] = (x, y) if (0 <= x < w and 0 <= y < h) else None
-        return pts
-
-    def _compute_com(self, points):
-        xs, ys = [], []
-        for p in points:
-            if p is not None:
-                xs.append(p[0]); ys.append(p[1])
-        if not xs:
+        as_array = getattr(landmarks, "as_array", None)
+        if as_array is not None:
+            arr = np.asarray(as_array(), np.float64)[:, (0, 1, 3)]
+        else:
+            arr = np.array([(lm.x, lm.y, np.nan if lm.visibility is None else lm.visibility)
+                            for lm in landmarks.landmark], np.float64)
+        xy = np.trunc(arr[:, :2] * (w, h))  # int() と同じく 0 方向へ切り捨て
+        valid = (arr[:, 2] >= VIS_THRESH) & (xy[:, 0] >= 0) & (xy[:, 0] < w) & (xy[:, 1] >= 0) & (xy[:, 1] < h)
+        out = np.full((len(arr), 2), np.nan, np.float32)
+        out[valid] = xy[valid]
+        return out
+
+    def _landmarks_to_points(self, frame_shape, landmarks):
+        return self._points_from_xy(*self._soa_from_xy(self._landmarks_to_xy(frame_shape, landmarks)))
+
+    @staticmethod
+    def _soa_from_xy(points_xy):
+        """NaN 入りの points_xy を (xy: int16 (33, 2), valid: bool (33,)) に分ける。不可視点の xy は 0"""
+        valid = ~np.isnan(points_xy[:, 0])
+        return np.nan_to_num(points_xy).astype(np.int16), valid
+
+    @staticmethod
+    def _points_from_xy(xy, valid):
+        return [(x, y) if v else None for (x, y), v in zip(xy.tolist(), valid.tolist())]
+
+    @staticmethod
+    def _compute_com(points_xy):
+        """可視点の重心（int 座標）。可視点がなければ None"""
+        pts = points_xy[~np.isnan(points_xy[:, 0])]
+        if not len(pts):
             return None
-        return (int(np.mean(xs)), int(np.mean(ys)))
+        cx, cy = pts.mean(axis=0, dtype=np.float64).tolist()
+        return (int(cx), int(cy))
 
-    def _compute_velocities(self, points, fps):
-        if self.prev_points is None:
-            self.velocities = np.zeros(33, dtype=np.float32)
+    def _compute_velocities(self, points_xy, fps):
+        if self.prev_xy is None or fps <= 0:
+            self.velocities = np.zeros(len(points_xy), dtype=np.float32)
+            self.prev_xy = points_xy
             return
-        v = np.zeros(33, dtype=np.float32)
-        for i in range(33):
-            p0 = self.prev_points[i]; p1 = points[i]
-            if p0 is not None and p1 is not None and fps > 0:
-                dist_px = float(np.hypot(p1[0]-p0[0], p1[1]-p0[1]))
-                dist = dist_px * self.m_per_px if self.m_per_px else dist_px  # m or px
-                v[i] = dist * fps  # m/s or px/s
-            else:
-                v[i] = 0.0
-        self.velocities = v
-        max_v = float(np.max(v))
+        # 前フレームとの距離を全点まとめて計算（どちらかが未検出なら NaN → 0）
+        # 関節間の距離（四肢長の安定性など）を足すときも Python の二重ループにせず、
+        # scipy.spatial.distance.cdist(xy, xy) か xy[:, None] - xy[None, :] のブロードキャストで求める
+        d = np.subtract(points_xy, self.prev_xy, dtype=np.float64)
+        v = np.hypot(d[:, 0], d[:, 1])
+        if self.m_per_px:
+            v *= self.m_per_px  # m
+        v *= fps  # m/s or px/s
+        self.velocities = np.nan_to_num(v, nan=0.0).astype(np.float32)
+        self.prev_xy = points_xy
+        max_v = float(self.velocities.max())
         if max_v > self.max_speed:
             self.max_speed = max_v
 
     def _speed_to_bgr(self, speed):
         # 0..max_speed -> 0..255 に正規化して RAINBOW（赤橙黄緑青藍紫）
-        denom = max(self.max_speed, 1e-6)
-        val = int(np.clip(speed / denom, 0.0, 1.0) * 255)
-        cm = cv2.applyColorMap(np.array([[val]], dtype=np.uint8), cv2.COLORMAP_RAINBOW)
-        return (int(cm[0,0,0]), int(cm[0,0,1]), int(cm[0,0,2]))  # BGR
+        # スカラー1つなので np.clip を通さず Python の比較でクランプして LUT を引くだけにする
+        norm = min(max(speed / max(self.max_speed, 1e-6), 0.0), 1.0)
+        b, g, r = _colormap_lut(cv2.COLORMAP_RAINBOW)[int(norm * 255)].tolist()
+        return (b, g, r)  # BGR
 
     def _draw_colorbar(self, img, max_speed, unit='px/s', width=26, margin=8):
         h, w = img.shape[:2]
@@ -113,15 +274,16 @@ class PoseAnalyzer:
         x0 = w - bar_w - margin
         y0 = int((h - bar_h) / 2)
 
-        # 縦グラデーション 0..255
-        grad = np.linspace(255, 0, bar_h, dtype=np.uint8).reshape(bar_h, 1)
-        grad = np.repeat(grad, bar_w, axis=1)
-        grad_color = cv2.applyColorMap(grad, cv2.COLORMAP_RAINBOW)
+        # 縦グラデーション 0..255（サイズごとに1回だけ作る）
+        grad_color = self._colorbar_cache.get((bar_h, bar_w))
+        if grad_color is None:
+            grad = np.linspace(255, 0, bar_h, dtype=np.uint8).reshape(bar_h, 1)
+            grad = np.repeat(grad, bar_w, axis=1)
+            grad_color = self._colorbar_cache[(bar_h, bar_w)] = _colormap_lut(cv2.COLORMAP_RAINBOW)[grad]
 
         # 右端に貼り付け
-        img[y0:y0+bar_h, x0:x0+bar_w] = cv2.addWeighted(
-            img[y0:y0+bar_h, x0:x0+bar_w], 0.3, grad_color, 0.7, 0
-        )
+        roi = img[y0:y0+bar_h, x0:x0+bar_w]
+        cv2.addWeighted(roi, 0.3, grad_color, 0.7, 0, dst=roi)
 
         # 枠
         cv2.rectangle(img, (x0, y0), (x0+bar_w, y0+bar_h), (255, 255, 255), 1)
@@ -145,29 +307,82 @@ class PoseAnalyzer:
         # Y軸（上向き）
         cv2.arrowedLine(img, (ox, oy), (ox, oy-axis_len), color, thickness, tipLength=0.05)
         cv2.putText(img, 'Y', (ox-12, oy-axis_len-8), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2, cv2.LINE_AA)
-        # 薄いグリッド
-        overlay = img.copy()
-        step = 50
-        grid_color = (0, 0, 0)
-        for x in range(ox, w, step):
-            cv2.line(overlay, (x, 0), (x, h), grid_color, 1)
-        for x in range(ox, 0, -step):
-            cv2.line(overlay, (x, 0), (x, h), grid_color, 1)
-        for y in range(oy, h, step):
-            cv2.line(overlay, (0, y), (w, y), grid_color, 1)
-        for y in range(oy, 0, -step):
-            cv2.line(overlay, (0, y), (w, y), grid_color, 1)
-        cv2.addWeighted(overlay, 0.15, img, 0.85, 0, dst=img)
+        # 薄いグリッド（黒線を 15% で重ねる = グリッド上の画素だけ 0.85 倍）
+        ys, xs = self._grid_pixels(h, w, ox, oy, 50)
+        grid = img[ys, xs]
+        img[ys, xs] = cv2.addWeighted(np.zeros_like(grid), 0.15, grid, 0.85, 0)
+
+    def _grid_pixels(self, h, w, ox, oy, step):
+        """グリッド線が通る画素の (行, 列) インデックス。フレームサイズと原点ごとに1回だけ描いてキャッシュする"""
+        key = (h, w, ox, oy, step)
+        cached = self._grid_cache.get(key)
+        if cached is None:
+            mask = np.zeros((h, w), np.uint8)
+            for x in range(ox, w, step):
+                cv2.line(mask, (x, 0), (x, h), 255, 1)
+            for x in range(ox, 0, -step):
+                cv2.line(mask, (x, 0), (x, h), 255, 1)
+            for y in range(oy, h, step):
+                cv2.line(mask, (0, y), (w, y), 255, 1)
+            for y in range(oy, 0, -step):
+                cv2.line(mask, (0, y), (w, y), 255, 1)
+            cached = self._grid_cache[key] = np.nonzero(mask)
+        return cached
 
     # メイン処理
-    def process(self, frame, fps):
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        res = self.pose.process(rgb)
+    def inference_input(self, frame):
+        """推論に渡す縮小済みの BGR 画像（inference_width が None なら frame のまま）"""
+        return resize_for_inference(frame, self.inference_width)
 
+    def process(self, frame, fps):
+        """frame は BGR の ndarray か FrameContext"""
+        ctx = as_frame_context(frame)
+        return self.process_landmarks(ctx.shape, self.detect(ctx), fps)
+
+    def process_stream(self, cap, fps, prefetch=2):
+        """cap を読み切るまで (frame, state) を順に返すジェネレータ
+
+        デコード（cap.read()）は別スレッドで先読みし、推論と重ねる。推定状態の更新は
+        呼び出し側のスレッドだけで行う。途中で止めても読み込みスレッドは閉じる（cap.release() は呼び出し側）。
+        """
+        reader = FrameReaderThread(cap, prefetch)
+        try:
+            for _, frame in reader:
+                yield frame, self.process(frame, fps)
+        finally:
+            reader.close()
+
+    def detect(self, frame):
+        """姿勢推定だけを行い pose_landmarks（未検出なら None）を返す。状態は更新しない"""
+        ctx = as_frame_context(frame)
+        small = ctx.inference_input(self.inference_width)
+        res = None
+        key = None
+        if self.frame_cache is not None:
+            # ほぼ同一のフレームなら推論をスキップしてキャッシュ済みの検出結果を使う
+            key = dhash(small)
+            res = self.frame_cache.get(key)
+        if res is None:
+            # MediaPipe は C 連続の RGB 配列を要求するので、[..., ::-1] のビューではなく
+            # 使い回しのバッファへ変換する（毎フレームの確保をなくす）。同じ ctx で変換済みならそれを使う
+            if self._rgb_buf is None or self._rgb_buf.shape != small.shape:
+                self._rgb_buf = np.empty_like(small)
+            rgb = ctx.rgb(self.inference_width, buf=self._rgb_buf)
+            res = self.pose.process(rgb)
+            if key is not None:
+                self.frame_cache.put(key, res)
+        return res.pose_landmarks
+
+    def process_landmarks(self, frame_shape, landmarks, fps):
+        """pose_landmarks から点・速度・軌跡・重心を更新して state を返す（補間フレームにも使う）"""
         points = [None] * 33
+        points_xy = np.full((33, 2), np.nan, np.float32)
+        xy, valid = np.zeros((33, 2), np.int16), np.zeros(33, bool)
         raw_landmarks = None
-        if res.pose_landmarks:
-            points = self._landmarks_to_points(frame.shape, res.pose_landmarks)
+        if landmarks:
+            points_xy = self._landmarks_to_xy(frame_shape, landmarks)
+            xy, valid = self._soa_from_xy(points_xy)
+            points = self._points_from_xy(xy, valid)
             # 生ランドマーク（正規化座標 0-1, z, visibility）を保存
             raw_landmarks = [
                 {
@@ -176,111 +391,138 @@ class PoseAnalyzer:
                     "z": float(lm.z),
                     "visibility": float(lm.visibility),
                 }
-                for lm in res.pose_landmarks.landmark
+                for lm in landmarks.landmark
             ]
 
-        self._compute_velocities(points, fps)
+        self._compute_velocities(points_xy, fps)
 
         # 右手首の軌跡更新
-        rw = points[RIGHT_WRIST_IDX] if RIGHT_WRIST_IDX < len(points) else None
-        if rw is not None:
-            self.right_wrist_path.append(rw)
-            if len(self.right_wrist_path) > self.max_path_len:
-                self.right_wrist_path = self.right_wrist_path[-self.max_path_len:]
+        if RIGHT_WRIST_IDX < len(valid) and valid[RIGHT_WRIST_IDX]:
+            self._rw_buf[self._rw_head] = xy[RIGHT_WRIST_IDX]
+            self._rw_head = (self._rw_head + 1) % self.max_path_len
+            self._rw_len = min(self._rw_len + 1, self.max_path_len)
 
-        com = self._compute_com(points)
-        self.prev_points = points
+        com = self._compute_com(points_xy)
 
-        return {"points": points, "com": com, "velocities": self.velocities, "raw_landmarks": raw_landmarks}
+        # points_xy: points と同じ座標の (33, 2) 配列（None は NaN）。ベクトル演算用
+        # xy / valid: 同じ座標の int16 (33, 2) と可視マスク (33,)。描画はこちらを使い、None の判定をしない
+        # right_wrist_path はこの時点のスナップショット（描画を別スレッドで行っても次フレームの更新と競合しない）
+        return {"points": points, "points_xy": points_xy, "xy": xy, "valid": valid, "com": com,
+                "velocities": self.velocities, "raw_landmarks": raw_landmarks,
+                "right_wrist_path": self.right_wrist_path}
 
     # 可視化
-    def render_basic(self, frame, state):
-        img = frame.copy()
+    def _skeleton(self, state):
+        """描画用に (可視な辺の 2 点線分リスト, 可視点の座標リスト) を返す
+
+        線分は cv2.polylines に1回で渡せる (2, 2) int32 配列のリスト。
+        """
+        valid = state["valid"]
+        pts = state["xy"].astype(np.int32)  # cv2.polylines は int32 の点列しか受け付けない
+        ok = valid[self._conn_arr[:, 0]] & valid[self._conn_arr[:, 1]]
+        return list(pts[self._conn_arr[ok]]), [tuple(p) for p in pts[valid].tolist()]
+
+    def _render_buf(self, name, shape):
+        """name ごとに使い回す uint8 作業バッファ。render_* は別スレッドから並行に呼ばれうるので共有しない"""
+        buf = self._render_bufs.get(name)
+        if buf is None or buf.shape != shape:
+            buf = self._render_bufs[name] = np.empty(shape, np.uint8)
+        return buf
+
+    def render_basic(self, frame, state, out=None):
+        # out を渡すと毎フレームの frame.copy() を避けてそのバッファへ描画する
+        if out is None:
+            img = frame.copy()
+        else:
+            np.copyto(out, frame)
+            img = out
         # 細い白線（変更なし）
-        for a, b in self.connections:
-            pa = state["points"][a] if a < len(state["points"]) else None
-            pb = state["points"][b] if b < len(state["points"]) else None
-            if pa is not None and pb is not None:
-                cv2.line(img, pa, pb, (255, 255, 255), 1)
+        segs, pts = self._skeleton(state)
+        if segs:
+            cv2.polylines(img, segs, False, (255, 255, 255), 1)
         # 白点のみ（黒枠なし／サイズ半分程度）
-        for p in state["points"]:
-            if p is not None:
-                cv2.circle(img, p, 3, (255, 255, 255), -1)
+        for p in pts:
+            cv2.circle(img, p, 3, (255, 255, 255), -1)
         # 重心（赤）
         if state["com"] is not None:
             cv2.circle(img, state["com"], 8, (0,0,255), -1)
 
         # 右手首の軌跡（白・半透明）
-        if len(self.right_wrist_path) >= 2:
-            overlay = img.copy()
-            for i in range(1, len(self.right_wrist_path)):
-                cv2.line(overlay, self.right_wrist_path[i-1], self.right_wrist_path[i], (255,255,255), 2)
+        path = state.get("right_wrist_path")
+        if path is None:
+            path = self.right_wrist_path
+        if len(path) >= 2:
+            overlay = self._render_buf("basic_overlay", img.shape)
+            np.copyto(overlay, img)
+            cv2.polylines(overlay, [np.asarray(path, np.int32)], False, (255,255,255), 2)
             cv2.addWeighted(overlay, 0.45, img, 0.55, 0, dst=img)
 
         return img
 
-    def render_heatmap(self, frame, state):
-        base = frame.copy()
+    def render_heatmap(self, frame, state, out=None):
+        """速度カラーの点を重ねた画像を返す（out を渡すとそのバッファへ描画し、なければ新しく確保する）"""
         v = state["velocities"] if state["velocities"] is not None else np.zeros(33, dtype=np.float32)
 
         # まず白線をそのまま描画（線は変化なし）
-        result = base.copy()
-        for a, b in self.connections:
-            pa = state["points"][a] if a < len(state["points"]) else None
-            pb = state["points"][b] if b < len(state["points"]) else None
-            if pa is not None and pb is not None:
-                cv2.line(result, pa, pb, (255, 255, 255), 1)
+        if out is None:
+            result = frame.copy()
+        else:
+            np.copyto(out, frame)
+            result = out
+        segs, pts = self._skeleton(state)
+        if segs:
+            cv2.polylines(result, segs, False, (255, 255, 255), 1)
 
         # 点だけ速度カラーでオーバーレイ（控えめにブレンド）
-        overlay = np.zeros_like(base)
-        for i, p in enumerate(state["points"]):
-            if p is not None:
-                color = self._speed_to_bgr(float(v[i]))  # RAINBOW
-                cv2.circle(overlay, p, 3, color, -1)
+        # 全点の色を LUT から1回で引く（_speed_to_bgr と同じ正規化・切り捨て）
+        overlay = self._render_buf("heatmap_overlay", frame.shape)
+        overlay.fill(0)
+        norm = np.clip(np.asarray(v, dtype=np.float64) / max(self.max_speed, 1e-6), 0.0, 1.0)
+        colors = _colormap_lut(cv2.COLORMAP_RAINBOW)[(norm * 255).astype(np.intp)]  # RAINBOW
+        colors = colors[state["valid"]].tolist()
+        for p, color in zip(pts, colors):
+            cv2.circle(overlay, p, 3, color, -1)
 
         # 光量控えめに合成
-        img = cv2.addWeighted(result, 0.8, overlay, 0.2, 0)
+        img = cv2.addWeighted(result, 0.8, overlay, 0.2, 0, dst=result)
 
         # カラーバー（右側）
         unit = "m/s" if self.m_per_px else "px/s"
         self._draw_colorbar(img, max_speed=self.max_speed, unit=unit)
         return img
 
-    def render_stickman(self, frame_shape, state, background='black'):
+    def render_stickman(self, frame_shape, state, background='black', out=None):
+        """スティックマン画像を返す（out を渡すとそのバッファへ描画し、なければ新しく確保する）"""
         h, w = frame_shape[:2]
-        if background == 'green':
-            img = np.zeros((h, w, 3), dtype=np.uint8); img[:] = (0, 255, 0)
-        else:
-            img = np.zeros((h, w, 3), dtype=np.uint8)
+        img = np.empty((h, w, 3), np.uint8) if out is None else out
+        img[:] = (0, 255, 0) if background == 'green' else 0
 
         # 座標軸（緑背景上で黒）
         self._draw_axes(img, color=(0,0,0))
 
         # 骨格（白）
-        for a, b in self.connections:
-            pa = state["points"][a] if a < len(state["points"]) else None
-            pb = state["points"][b] if b < len(state["points"]) else None
-            if pa is not None and pb is not None:
-                cv2.line(img, pa, pb, (255, 255, 255), 3)
-        for p in state["points"]:
-            if p is not None:
-                cv2.circle(img, p, 5, (255, 255, 255), -1)
+        segs, pts = self._skeleton(state)
+        if segs:
+            cv2.polylines(img, segs, False, (255, 255, 255), 3)
+        for p in pts:
+            cv2.circle(img, p, 5, (255, 255, 255), -1)
         # 重心
         if state["com"] is not None:
             cv2.circle(img, state["com"], 8, (0, 0, 255), -1)
         return img
 
-    def render_stickman_rgba(self, frame_shape, state):
+    def render_stickman_rgba(self, frame_shape, state, out=None):
         h, w = frame_shape[:2]
-        img = np.zeros((h, w, 4), dtype=np.uint8)  # BGRA
-        for a, b in self.connections:
-            pa = state["points"][a] if a < len(state["points"]) else None
-            pb = state["points"][b] if b < len(state["points"]) else None
-            if pa is not None and pb is not None:
-                cv2.line(img, pa, pb, (255, 255, 255, 255), 3)
-        for p in state["points"]:
-            if p is not None:
-                cv2.circle(img, p, 5, (255, 255, 255, 255), -1)
+        if out is None:
+            img = np.zeros((h, w, 4), dtype=np.uint8)  # BGRA
+        else:
+            img = out
+            img.fill(0)
+        segs, pts = self._skeleton(state)
+        if segs:
+            cv2.polylines(img, segs, False, (255, 255, 255, 255), 3)
+        for p in pts:
+            cv2.circle(img, p, 5, (255, 255, 255, 255), -1)
         if state["com"] is not None:
             cv2.circle(img, state["com"], 8, (0, 0, 255, 255), -1)
         return img
\ No newline at end of file
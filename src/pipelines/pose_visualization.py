@@ -2,8 +2,18 @@ import cv2
 import numpy as np
 import mediapipe as mp
 
+from src.pipelines.pose_analysis import as_frame_context
+
+# やり投げに重要な点のインデックス（MediaPipe Pose 基準）
+# 肩・肘・手首（11-16）、腰・膝・足首（23-28）
+KEY_POINT_INDICES = np.array([11, 12, 13, 14, 15, 16, 23, 24, 25, 26, 27, 28], dtype=np.intp)
+
 class PoseVisualizer:
-    def __init__(self):
+    def __init__(self, inference_width=None):
+        # 推論用の縮小幅（px、None で縮小しない）。ランドマークは正規化座標なので描画は元解像度のまま
+        self.inference_width = inference_width
+        # BGR→RGB 変換先（推論入力サイズが変わったときだけ確保し直す）
+        self._rgb_buf = None
         self.mp_pose = mp.solutions.pose
         self.pose = self.mp_pose.Pose(
             static_image_mode=False,
@@ -14,19 +24,26 @@ class PoseVisualizer:
         )
         self.mp_drawing = mp.solutions.drawing_utils
         self.mp_drawing_styles = mp.solutions.drawing_styles
+        # 描画スタイルは毎フレーム作り直さずに使い回す
+        self._landmark_style = self.mp_drawing_styles.get_default_pose_landmarks_style()
 
     def visualize_pose(self, frame):
         """
-        フレームに骨格点を描画する
+        フレームに骨格点を描画する（frame は BGR の ndarray か FrameContext）
         """
-        # BGRからRGBに変換
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        ctx = as_frame_context(frame)
+        # 推論だけ縮小した画像で行う。BGRからRGBへの変換は使い回しのバッファへ
+        # （MediaPipe は C 連続の配列を要求する）。同じ ctx で変換済みならそれを使う
+        small = ctx.inference_input(self.inference_width)
+        if self._rgb_buf is None or self._rgb_buf.shape != small.shape:
+            self._rgb_buf = np.empty(small.shape, np.uint8)
+        rgb_frame = ctx.rgb(self.inference_width, buf=self._rgb_buf)
         
         # ポーズ検出
         results = self.pose.process(rgb_frame)
         
         # 描画用のフレームをコピー
-        annotated_frame = frame.copy()
+        annotated_frame = ctx.bgr.copy()
         
         if results.pose_landmarks:
             # 骨格点と接続線を描画
@@ -34,7 +51,7 @@ class PoseVisualizer:
                 annotated_frame,
                 results.pose_landmarks,
                 self.mp_pose.POSE_CONNECTIONS,
-                landmark_drawing_spec=self.mp_drawing_styles.get_default_pose_landmarks_style()
+                landmark_drawing_spec=self._landmark_style
             )
             
             # やり投げに重要な点を強調表示
@@ -47,32 +64,16 @@ class PoseVisualizer:
         やり投げに重要な骨格点を強調表示
         """
         height, width = frame.shape[:2]
-        
-        # 重要な点のインデックス（MediaPose基準）
-        key_points = {
-            'LEFT_SHOULDER': 11,
-            'RIGHT_SHOULDER': 12,
-            'LEFT_ELBOW': 13,
-            'RIGHT_ELBOW': 14,
-            'LEFT_WRIST': 15,
-            'RIGHT_WRIST': 16,
-            'LEFT_HIP': 23,
-            'RIGHT_HIP': 24,
-            'LEFT_KNEE': 25,
-            'RIGHT_KNEE': 26,
-            'LEFT_ANKLE': 27,
-            'RIGHT_ANKLE': 28
-        }
-        
-        for name, idx in key_points.items():
-            if idx < len(landmarks.landmark):
-                landmark = landmarks.landmark[idx]
-                x = int(landmark.x * width)
-                y = int(landmark.y * height)
-                
-                # 重要な点を大きな円で強調
-                cv2.circle(frame, (x, y), 8, (0, 255, 255), -1)  # 黄色の円
-                cv2.circle(frame, (x, y), 10, (0, 0, 255), 2)    # 赤い枠
+
+        idx = KEY_POINT_INDICES[KEY_POINT_INDICES < len(landmarks.landmark)]
+        lms = landmarks.landmark
+        xy = np.array([(lms[i].x, lms[i].y) for i in idx.tolist()], np.float64).reshape(-1, 2)
+        pts = np.trunc(xy * (width, height)).astype(np.int64)  # int() と同じく 0 方向へ切り捨て
+
+        for x, y in pts.tolist():
+            # 重要な点を大きな円で強調
+            cv2.circle(frame, (x, y), 8, (0, 255, 255), -1)  # 黄色の円
+            cv2.circle(frame, (x, y), 10, (0, 0, 255), 2)    # 赤い枠
     
     def release(self):
         """
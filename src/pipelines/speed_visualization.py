@@ -7,48 +7,68 @@ def load_color_ranges(config_path):
         color_ranges = yaml.safe_load(file)
     return color_ranges
 
+# Upper speed bound per label for visualize_speed (lower bound 0; a boundary value belongs to the lower label)
+_SPEED_LABELS = ('low', 'medium', 'high')
+_SPEED_UPPER = np.array([10.0, 30.0, np.inf])
+
+
 def visualize_speed(frame, speed, color_ranges):
     # Work on a copy to ensure output differs from input when color is drawn
     frame = frame.copy()
-    color = (0, 0, 0)  # Default color
+    # speed could be scalar or array; pick scalar for label
+    s_val = float(np.mean(speed)) if hasattr(speed, '__len__') else float(speed)
     # color_ranges: dict with keys like 'low','medium','high' and BGR tuples
-    thresholds = {
-        'low': (0, 10),
-        'medium': (10, 30),
-        'high': (30, float('inf'))
-    }
-    for key, color_value in color_ranges.items():
-        rng = thresholds.get(key)
-        if rng is None:
-            continue
-        min_speed, max_speed = rng
-        # speed could be scalar or array; pick scalar for label
-        s = float(np.mean(speed)) if hasattr(speed, '__len__') else float(speed)
-        if min_speed <= s <= max_speed:
-            color = tuple(color_value)
-            break
+    color = (0, 0, 0)  # Default color
+    i = int(np.searchsorted(_SPEED_UPPER, s_val, side='left'))
+    if s_val >= 0 and i < len(_SPEED_LABELS):
+        label = _SPEED_LABELS[i]
+        if label not in color_ranges and s_val == _SPEED_UPPER[i] and i + 1 < len(_SPEED_LABELS):
+            label = _SPEED_LABELS[i + 1]  # boundary values also fall in the next range
+        if label in color_ranges:
+            color = tuple(color_ranges[label])
 
-    s_val = float(np.mean(speed)) if hasattr(speed, '__len__') else float(speed)
     cv2.putText(frame, f'Speed: {s_val:.2f} m/s', (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
     # Draw a small color swatch to guarantee pixel differences for tests
     cv2.rectangle(frame, (10, 40), (60, 60), color, thickness=-1)
     return frame
 
 
+_SPEED_THRESHOLDS = {
+    'low': (0, 10),
+    'medium': (10, 30),
+    'high': (30, float('inf'))
+}
+
+
+def _speed_color_index(speeds, color_ranges):
+    """Index into list(color_ranges) of the first range containing each speed (-1: none).
+
+    Ranges are inclusive at both ends and checked in color_ranges order, so a boundary
+    speed takes the earlier key; unknown keys cover [0, inf).
+    """
+    speeds = np.asarray(speeds, dtype=np.float64)
+    idx = np.full(speeds.shape, -1, dtype=np.intp)
+    for i, key in enumerate(color_ranges):
+        min_speed, max_speed = _SPEED_THRESHOLDS.get(key, (0, float('inf')))
+        idx[(idx < 0) & (speeds >= min_speed) & (speeds <= max_speed)] = i
+    return idx
+
+
+def map_speed_to_color_vec(speeds, color_ranges):
+    """Vectorised map_speed_to_color: (..., 3) uint8 BGR for an array of speeds (black if unmatched)."""
+    lut = np.array([tuple(c) for c in color_ranges.values()] + [(0, 0, 0)], dtype=np.uint8).reshape(-1, 3)
+    return lut[_speed_color_index(speeds, color_ranges)]  # -1 picks the trailing black row
+
+
 def _map_speed_to_color(speed, color_ranges):
-    thresholds = {
-        'low': (0, 10),
-        'medium': (10, 30),
-        'high': (30, float('inf'))
-    }
-    for key, color in color_ranges.items():
-        min_speed, max_speed = thresholds.get(key, (0, float('inf')))
-        if min_speed <= speed <= max_speed:
-            return tuple(color)
-    return (0, 0, 0)
+    i = int(_speed_color_index(speed, color_ranges))
+    if i < 0:
+        return (0, 0, 0)
+    return tuple(list(color_ranges.values())[i])
 
 # Assign as attribute for tests: visualize_speed.map_speed_to_color
 visualize_speed.map_speed_to_color = _map_speed_to_color
+visualize_speed.map_speed_to_color_vec = map_speed_to_color_vec
 
 def process_video(video_path, color_ranges):
     cap = cv2.VideoCapture(video_path)
@@ -1,21 +1,35 @@
 import cv2
 import numpy as np
 
-def track_javelin_tip(frame, lower_color, upper_color):
+def track_javelin_tip(frame, lower_color, upper_color, draw_bbox=True, min_area=0):
+    """Locate the marker in frame and return (frame, position or None).
+
+    With draw_bbox=True (default) the position is the centre of the largest blob's bounding
+    box, which is also drawn on frame. With draw_bbox=False the position is the centroid of
+    all mask pixels from cv2.moments, skipping contour extraction; min_area is the minimum
+    number of mask pixels for a detection.
+    """
     # Convert the frame to HSV color space
     hsv_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
 
     # Create a mask for the specified color range
     mask = cv2.inRange(hsv_frame, lower_color, upper_color)
 
-    # Find contours in the mask
-    contours, _ = cv2.findContours(mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+    if not draw_bbox:
+        m = cv2.moments(mask, binaryImage=True)
+        if m['m00'] > min_area:
+            return frame, (int(m['m10'] / m['m00']), int(m['m01'] / m['m00']))
+        return frame, None
+
+    # Find outer contours in the mask (holes never win the largest-area pick, so no hierarchy needed)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
     javelin_tip_position = None
 
     if contours:
         # Find the largest contour
-        largest_contour = max(contours, key=cv2.contourArea)
+        areas = np.fromiter((cv2.contourArea(c) for c in contours), dtype=np.float64, count=len(contours))
+        largest_contour = contours[int(areas.argmax())]
 
         # Get the coordinates of the bounding box around the largest contour
         x, y, w, h = cv2.boundingRect(largest_contour)
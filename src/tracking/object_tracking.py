@@ -1,4 +1,17 @@
+import logging
+
 import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# CSRT / KCF live in opencv-contrib; plain opencv-python only ships MIL
+_TRACKER_FACTORIES = {
+    'CSRT': 'TrackerCSRT_create',
+    'KCF': 'TrackerKCF_create',
+    'MIL': 'TrackerMIL_create',
+}
+
 
 class ObjectTracker:
     def __init__(self, tracker_type='CSRT'):
@@ -6,14 +19,16 @@ class ObjectTracker:
         self.tracker = self.create_tracker()
 
     def create_tracker(self):
-        if self.tracker_type == 'CSRT':
-            return cv2.TrackerCSRT_create()
-        elif self.tracker_type == 'KCF':
-            return cv2.TrackerKCF_create()
-        elif self.tracker_type == 'MIL':
-            return cv2.TrackerMIL_create()
-        else:
+        """Create the requested tracker, falling back to MIL when this OpenCV build lacks it."""
+        factory_name = _TRACKER_FACTORIES.get(self.tracker_type)
+        if factory_name is None:
             raise ValueError("Unsupported tracker type. Choose 'CSRT', 'KCF', or 'MIL'.")
+        factory = getattr(cv2, factory_name, None)
+        if factory is None:
+            logger.warning(f"{self.tracker_type} tracker needs opencv-contrib-python; falling back to MIL")
+            self.tracker_type = 'MIL'
+            factory = cv2.TrackerMIL_create
+        return factory()
 
     def initialize(self, frame, bbox):
         self.tracker.init(frame, bbox)
@@ -27,32 +42,39 @@ class ObjectTracker:
         cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2, 1)
 
 
-def object_tracking(video_path: str):
-    """Minimal object tracking routine returning list of bounding boxes.
+def object_tracking(video_path: str, tracker_type='CSRT'):
+    """Minimal object tracking routine returning bounding boxes.
 
     Initializes the tracker on the first frame with a center box and updates per frame.
-    Returns a list of (x, y, w, h) or None when update fails.
+    Returns an (N, 4) int32 array of (x, y, w, h) per frame; rows where the update
+    failed are -1.
     """
     cap = cv2.VideoCapture(video_path)
-    boxes = []
     if not cap.isOpened():
         # Minimal placeholder bbox
-        return [(0, 0, 1, 1)]
+        return np.array([[0, 0, 1, 1]], dtype=np.int32)
     ret, frame = cap.read()
     if not ret:
         cap.release()
-    return boxes if boxes else [(0, 0, 1, 1)]
+        return np.array([[0, 0, 1, 1]], dtype=np.int32)
     h, w = frame.shape[:2]
     # A small central box as a placeholder ROI
     bbox = (int(w*0.4), int(h*0.4), int(w*0.2), int(h*0.2))
-    tracker = ObjectTracker('CSRT')
+    tracker = ObjectTracker(tracker_type)
     tracker.initialize(frame, bbox)
-    boxes.append(bbox)
+    # CAP_PROP_FRAME_COUNT is only an estimate for some containers: grow if needed, trim at the end
+    boxes = np.full((max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 1), 4), -1, dtype=np.int32)
+    boxes[0] = bbox
+    n = 1
     while True:
         ret, frame = cap.read()
         if not ret:
             break
+        if n == len(boxes):
+            boxes = np.concatenate((boxes, np.full_like(boxes, -1)))
         ok, bb = tracker.update(frame)
-        boxes.append(bb if ok else None)
+        if ok:
+            boxes[n] = bb
+        n += 1
     cap.release()
-    return boxes
\ No newline at end of file
+    return boxes[:n]
@@ -0,0 +1,33 @@
+"""Optional numba JIT helpers.
+
+numba is not a hard dependency: when it is missing, ``njit`` is a no-op decorator and
+NUMBA_AVAILABLE is False, so callers can pick a NumPy path instead of running the
+kernels as plain Python loops.
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # optional: fall back to plain Python
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
+
+
+@njit(cache=True)
+def ema(data, alpha):
+    """EMA of a 1-D float64 array: out[i] = alpha * data[i] + (1 - alpha) * out[i-1].
+
+    fastmath is left off so NaNs propagate the same way as the Python loop.
+    """
+    out = np.empty_like(data)
+    if data.size == 0:
+        return out
+    out[0] = data[0]
+    for i in range(1, data.size):
+        out[i] = alpha * data[i] + (1 - alpha) * out[i - 1]
+    return out
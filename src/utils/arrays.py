@@ -0,0 +1,11 @@
+import numpy as np
+
+
+def as_c(arr):
+    """Return arr unchanged if it is C-contiguous, otherwise a contiguous copy.
+
+    Frames from OpenCV are already C-contiguous, but slices such as
+    frame[y0:y1, x0:x1] or landmark column views are not; numba kernels reject
+    them and OpenCV silently copies them on every call.
+    """
+    return arr if arr.flags['C_CONTIGUOUS'] else np.ascontiguousarray(arr)
@@ -1,14 +1,29 @@
+import numpy as np
+from scipy.ndimage import median_filter
+from scipy.signal import lfilter
+
+from src.utils._jit import NUMBA_AVAILABLE, ema
+
+
 def apply_ema(data, alpha=0.1):
     """Apply Exponential Moving Average (EMA) filter to smooth data."""
-    ema_data = []
-    for i, value in enumerate(data):
-        if i == 0:
-            ema_data.append(value)
-        else:
-            ema_data.append(alpha * value + (1 - alpha) * ema_data[-1])
-    return ema_data
+    arr = np.asarray(data)
+    if NUMBA_AVAILABLE and arr.ndim == 1 and arr.dtype.kind == 'f':
+        # compiled loop; lists keep getting a list back
+        out = ema(np.ascontiguousarray(arr, dtype=np.float64), float(alpha))
+        return out.tolist() if isinstance(data, list) else out
+    if arr.ndim == 0 or arr.size == 0 or arr.dtype.kind not in 'biuf':
+        return list(data)
+    # y[i] = alpha * x[i] + (1 - alpha) * y[i-1] as an IIR filter (C loop in scipy);
+    # zi seeds the state so that y[0] = x[0]
+    x = arr.astype(np.float64)
+    zi = (1 - alpha) * x[:1]
+    out, _ = lfilter([alpha], [1.0, alpha - 1.0], x, axis=0, zi=zi)
+    return out.tolist() if isinstance(data, list) else out
 
 def apply_median_filter(data, kernel_size=3):
-    """Apply a median filter to smooth data."""
-    from scipy.signal import medfilt
-    return medfilt(data, kernel_size)
\ No newline at end of file
+    """Apply a median filter to smooth data (zero-padded at the edges, like scipy.signal.medfilt)."""
+    if kernel_size % 2 == 0:
+        raise ValueError("kernel_size must be odd.")
+    # ndimage's selection-based median is much faster than medfilt's sort per window
+    return median_filter(np.asarray(data), size=kernel_size, mode='constant', cval=0)
\ No newline at end of file
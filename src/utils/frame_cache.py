@@ -0,0 +1,50 @@
+from collections import OrderedDict
+from typing import Any, Optional
+
+import cv2
+import numpy as np
+
+
+def dhash(frame, hash_size=8):
+    """Compute a 64-bit difference hash (dHash) of a BGR or grayscale frame."""
+    small = cv2.resize(frame, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class DHashCache:
+    """Small FIFO/LRU cache keyed by dHash, matching keys within a Hamming distance."""
+
+    def __init__(self, maxsize=64, max_distance=3):
+        self.maxsize = maxsize
+        self.max_distance = max_distance
+        self._entries: "OrderedDict[int, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: int) -> Optional[Any]:
+        """Return the value of the most recent key within max_distance of key, else None."""
+        for k in reversed(self._entries):
+            if (k ^ key).bit_count() <= self.max_distance:
+                self._entries.move_to_end(k)
+                self.hits += 1
+                return self._entries[k]
+        self.misses += 1
+        return None
+
+    def clear(self):
+        """Drop all entries and reset the hit/miss counters."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, key: int, value: Any):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
@@ -1,14 +1,24 @@
+import math
+
+import numpy as np
+
+
 def calculate_distance(point1, point2):
     """Calculate the Euclidean distance between two points."""
-    return ((point1[0] - point2[0]) ** 2 + (point1[1] - point2[1]) ** 2) ** 0.5
+    return math.hypot(point1[0] - point2[0], point1[1] - point2[1])
 
 def midpoint(point1, point2):
     """Calculate the midpoint between two points."""
     return ((point1[0] + point2[0]) / 2, (point1[1] + point2[1]) / 2)
 
 def angle_between_points(point1, point2):
-    """Calculate the angle in degrees between two points."""
-    import math
+    """Calculate the angle in degrees between two points.
+
+    Also accepts (N, 2) arrays of points and then returns an (N,) array of angles.
+    """
+    if np.ndim(point1) == 2 or np.ndim(point2) == 2:
+        delta = np.asarray(point2, dtype=np.float64) - np.asarray(point1, dtype=np.float64)
+        return np.degrees(np.arctan2(delta[..., 1], delta[..., 0]))
     delta_y = point2[1] - point1[1]
     delta_x = point2[0] - point1[0]
     return math.degrees(math.atan2(delta_y, delta_x))
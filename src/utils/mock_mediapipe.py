@@ -5,12 +5,24 @@
 実際のポーズ検出は行いませんが、ダミーの骨格点を生成してアプリケーションの動作確認をサポートします。
 """
 
+import logging
+import math
+
 import numpy as np
 from typing import NamedTuple, Optional, List
 
+from src.utils._jit import NUMBA_AVAILABLE, njit
+
+logger = logging.getLogger(__name__)
+
+# モック使用の警告はプロセスで1回だけ出す（Pose をフレームごとに作っても繰り返さない）
+_warned = False
+
 
 class Landmark:
     """MediaPipe Landmarkのモック"""
+    __slots__ = ("x", "y", "z", "visibility")
+
     def __init__(self, x=0.0, y=0.0, z=0.0, visibility=0.0):
         self.x = x
         self.y = y  
@@ -18,11 +30,74 @@ class Landmark:
         self.visibility = visibility
 
 
+class _LandmarkView:
+    """(33, 4) 配列の1行を Landmark と同じ属性名で読み書きするビュー"""
+    __slots__ = ("_a", "_i")
+
+    def __init__(self, a, i):
+        self._a = a
+        self._i = i
+
+    def _get(col):
+        return property(lambda self: float(self._a[self._i, col]),
+                        lambda self, v: self._a.__setitem__((self._i, col), v))
+
+    x = _get(0)
+    y = _get(1)
+    z = _get(2)
+    visibility = _get(3)
+    del _get
+
+
+class _LandmarkArray:
+    """(33, 4) 配列 [x, y, z, visibility] を landmark[i].x の形で引けるようにするリスト風ラッパー"""
+    __slots__ = ("_a",)
+
+    def __init__(self, a):
+        self._a = a
+
+    def __len__(self):
+        return len(self._a)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [_LandmarkView(self._a, j) for j in range(*i.indices(len(self._a)))]
+        if i < 0:
+            i += len(self._a)
+        if not 0 <= i < len(self._a):
+            raise IndexError("landmark index out of range")
+        return _LandmarkView(self._a, i)
+
+    def __setitem__(self, i, lm):
+        self._a[i] = (lm.x, lm.y, lm.z, lm.visibility)
+
+    def __iter__(self):
+        return (_LandmarkView(self._a, i) for i in range(len(self._a)))
+
+
 class PoseLandmarks:
-    """MediaPipe PoseLandmarksのモック"""
-    def __init__(self):
-        # 33個のランドマークを初期化
-        self.landmark = [Landmark() for _ in range(33)]
+    """MediaPipe PoseLandmarksのモック
+
+    data に (33, 4) 配列を渡すと、Landmark オブジェクトを作らずに配列をそのまま参照する。
+    as_array() / landmarks_xyzv で [x, y, z, visibility] の (33, 4) 配列をまとめて取り出せる。
+    """
+    def __init__(self, data=None):
+        self._arr = data
+        if data is None:
+            # 33個のランドマークを初期化
+            self.landmark = [Landmark() for _ in range(33)]
+        else:
+            self.landmark = _LandmarkArray(data)
+
+    def as_array(self):
+        """(33, 4) [x, y, z, visibility] 配列。配列で作った場合はコピーせずそのまま返す"""
+        if self._arr is None:
+            return np.array([(lm.x, lm.y, lm.z, lm.visibility) for lm in self.landmark], np.float64)
+        return self._arr
+
+    @property
+    def landmarks_xyzv(self):
+        return self.as_array()
 
 
 class PoseResults:
@@ -31,12 +106,32 @@ class PoseResults:
         self.pose_landmarks = None
 
 
+@njit(cache=True)
+def _fill_dummy_pose(out, base, arm_swing):
+    """base (33, 4) に腕の振りを足したポーズを out に書く（numba があるときの経路）"""
+    for i in range(base.shape[0]):
+        for j in range(4):
+            out[i, j] = base[i, j]
+    out[14, 0] += arm_swing
+    out[16, 0] += arm_swing * 2
+    for i in range(17, 23):
+        out[i, 0] += arm_swing * 2
+
+
 class MockPose:
     """MediaPipe Poseクラスのモック"""
+    # 顔・頭部（0-10）の中心からのずれ。ループで np.sin を11回呼ばずに1回で求めておく
+    _FACE_DX = 0.05 * np.sin(np.arange(11) * 0.5)
+    _FACE_DY = 0.02 * np.arange(11)
+
     def __init__(self, **kwargs):
-        print("WARNING: Using mock MediaPipe - generating dummy pose landmarks")
+        global _warned
+        if not _warned:
+            _warned = True
+            logger.warning("Using mock MediaPipe - generating dummy pose landmarks")
         self.frame_count = 0
-        pass
+        # 時間に依存しない骨格点はここで1回だけ (33, 4) [x, y, z, visibility] に組み立てておく
+        self._base = self._build_base_pose()
     
     def process(self, image):
         """モック処理 - ダミーの骨格点を生成"""
@@ -47,76 +142,77 @@ class MockPose:
         result.pose_landmarks = self._generate_dummy_pose(image.shape, self.frame_count)
         
         return result
-    
-    def _generate_dummy_pose(self, image_shape, frame_num):
-        """ダミーの人体ポーズを生成"""
-        h, w = image_shape[:2]
-        landmarks = PoseLandmarks()
-        
+
+    @staticmethod
+    def _build_base_pose():
+        """腕の振り（arm_swing）を除いた基準ポーズ (33, 4) float64"""
         # 画面中央を基準にした人体のダミーポーズ
         center_x = 0.5
         center_y = 0.5
-        
-        # 時間による動きを追加（投げ動作をシミュレート）
-        t = frame_num * 0.1
-        arm_swing = 0.1 * np.sin(t)
-        
+        base = np.zeros((33, 4), dtype=np.float64)
+
         # MediaPipeの33個のランドマーク位置を設定
         # 0-10: 顔・頭部
-        for i in range(11):
-            landmarks.landmark[i] = Landmark(
-                x=center_x + 0.05 * np.sin(i * 0.5),
-                y=center_y - 0.2 + 0.02 * i,
-                z=0.0,
-                visibility=0.9
-            )
-        
+        base[0:11, 0] = center_x + MockPose._FACE_DX
+        base[0:11, 1] = center_y - 0.2 + MockPose._FACE_DY
+        base[0:11, 3] = 0.9
+
         # 11-22: 上半身
         # 11: 左肩, 12: 右肩
-        landmarks.landmark[11] = Landmark(x=center_x - 0.15, y=center_y - 0.1, z=0.0, visibility=0.95)
-        landmarks.landmark[12] = Landmark(x=center_x + 0.15, y=center_y - 0.1, z=0.0, visibility=0.95)
-        
-        # 13: 左肘, 14: 右肘
-        landmarks.landmark[13] = Landmark(x=center_x - 0.2, y=center_y + 0.1, z=0.0, visibility=0.9)
-        landmarks.landmark[14] = Landmark(x=center_x + 0.25 + arm_swing, y=center_y + 0.1, z=0.0, visibility=0.9)
-        
-        # 15: 左手首, 16: 右手首（投げ手）
-        landmarks.landmark[15] = Landmark(x=center_x - 0.25, y=center_y + 0.2, z=0.0, visibility=0.9)
-        landmarks.landmark[16] = Landmark(x=center_x + 0.35 + arm_swing * 2, y=center_y + 0.05, z=0.0, visibility=0.95)
-        
-        # 17-22: 手のひら（簡略化）
+        base[11] = (center_x - 0.15, center_y - 0.1, 0.0, 0.95)
+        base[12] = (center_x + 0.15, center_y - 0.1, 0.0, 0.95)
+
+        # 13: 左肘, 14: 右肘（x には arm_swing を足す）
+        base[13] = (center_x - 0.2, center_y + 0.1, 0.0, 0.9)
+        base[14] = (center_x + 0.25, center_y + 0.1, 0.0, 0.9)
+
+        # 15: 左手首, 16: 右手首（投げ手。x には arm_swing * 2 を足す）
+        base[15] = (center_x - 0.25, center_y + 0.2, 0.0, 0.9)
+        base[16] = (center_x + 0.35, center_y + 0.05, 0.0, 0.95)
+
+        # 17-22: 手のひら（簡略化。x には arm_swing * 2 を足す）
         for i in range(17, 23):
-            landmarks.landmark[i] = Landmark(
-                x=center_x + 0.4 + arm_swing * 2,
-                y=center_y + 0.05 + (i-17) * 0.01,
-                z=0.0,
-                visibility=0.8
-            )
-        
+            base[i] = (center_x + 0.4, center_y + 0.05 + (i-17) * 0.01, 0.0, 0.8)
+
         # 23-32: 下半身
         # 23: 左腰, 24: 右腰
-        landmarks.landmark[23] = Landmark(x=center_x - 0.1, y=center_y + 0.3, z=0.0, visibility=0.9)
-        landmarks.landmark[24] = Landmark(x=center_x + 0.1, y=center_y + 0.3, z=0.0, visibility=0.9)
-        
+        base[23] = (center_x - 0.1, center_y + 0.3, 0.0, 0.9)
+        base[24] = (center_x + 0.1, center_y + 0.3, 0.0, 0.9)
+
         # 25: 左膝, 26: 右膝
-        landmarks.landmark[25] = Landmark(x=center_x - 0.08, y=center_y + 0.5, z=0.0, visibility=0.9)
-        landmarks.landmark[26] = Landmark(x=center_x + 0.08, y=center_y + 0.5, z=0.0, visibility=0.9)
-        
+        base[25] = (center_x - 0.08, center_y + 0.5, 0.0, 0.9)
+        base[26] = (center_x + 0.08, center_y + 0.5, 0.0, 0.9)
+
         # 27: 左足首, 28: 右足首
-        landmarks.landmark[27] = Landmark(x=center_x - 0.06, y=center_y + 0.7, z=0.0, visibility=0.9)
-        landmarks.landmark[28] = Landmark(x=center_x + 0.06, y=center_y + 0.7, z=0.0, visibility=0.9)
-        
+        base[27] = (center_x - 0.06, center_y + 0.7, 0.0, 0.9)
+        base[28] = (center_x + 0.06, center_y + 0.7, 0.0, 0.9)
+
         # 29-32: 足先
         for i in range(29, 33):
             side = -1 if i % 2 == 1 else 1
-            landmarks.landmark[i] = Landmark(
-                x=center_x + side * 0.08,
-                y=center_y + 0.72 + (i-29) * 0.01,
-                z=0.0,
-                visibility=0.8
-            )
-        
-        return landmarks
+            base[i] = (center_x + side * 0.08, center_y + 0.72 + (i-29) * 0.01, 0.0, 0.8)
+
+        base.setflags(write=False)
+        return base
+    
+    def _generate_dummy_pose(self, image_shape, frame_num):
+        """ダミーの人体ポーズを生成
+
+        結果はキャッシュや補間で後から参照されるので、フレームごとに新しい配列へ書く。
+        """
+        # 時間による動きを追加（投げ動作をシミュレート）。スカラーなので math.sin で十分
+        t = frame_num * 0.1
+        arm_swing = 0.1 * math.sin(t)
+
+        if NUMBA_AVAILABLE:
+            data = np.empty_like(self._base)
+            _fill_dummy_pose(data, self._base, arm_swing)
+        else:
+            data = self._base.copy()
+            data[14, 0] += arm_swing
+            data[16, 0] += arm_swing * 2
+            data[17:23, 0] += arm_swing * 2
+        return PoseLandmarks(data)
     
     def close(self):
         pass
@@ -148,6 +244,9 @@ class MockSolutions:
             (17, 19), (18, 20),
             (19, 21), (20, 22)
         ]
+        # 一括描画用: (E, 2) の添字配列と、始点・終点に分けた並列配列
+        _conn_arr = np.asarray(POSE_CONNECTIONS, dtype=np.int32)
+        POSE_CONNECTIONS_NP = (_conn_arr[:, 0].copy(), _conn_arr[:, 1].copy())
 
 
 # MediaPipeモジュール構造をモック
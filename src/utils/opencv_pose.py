@@ -3,20 +3,46 @@ OpenCV DNN ベースのポーズ推定実装
 MediaPipeの代替として軽量なポーズ検出を提供
 """
 
+import logging
 import cv2
 import numpy as np
 import os
 from typing import List, Tuple, Optional, Dict
 
+logger = logging.getLogger(__name__)
+
+# モデル未配置の警告はプロセスで1回だけ出す（インスタンスを作るたびに出さない）
+_warned_missing_model = False
+
 
 class OpenCVPoseEstimator:
     """OpenCV DNN を使用したポーズ推定"""
     
-    def __init__(self):
+    def __init__(self, input_size=256, use_int8=False, num_threads=None, detect_every=1, track_with_flow=True):
+        # SIMD 最適化は常に有効化。スレッド数は OpenCV 全体の設定なので、指定されたときだけ変える
+        # （jva.run などのエントリーポイント側で並列ジョブ数に合わせて設定済みのことが多い）
+        cv2.setUseOptimized(True)
+        if num_threads is not None:
+            cv2.setNumThreads(max(1, int(num_threads)))
         self.available = False
         self.net = None
-        self.input_width = 368
-        self.input_height = 368
+        # True なら INT8 量子化した ONNX モデルを優先して読む（PCK の低下を検証してから有効にすること）
+        self.use_int8 = use_int8
+        self.quantized = False
+        self.target = None  # "cuda_fp16" / "opencl_fp16" / "cpu"（モデル読み込み時に決まる）
+        # ネットワーク入力サイズ（旧既定は 368。BlazePose と同じ 256 で前処理・畳み込みの量を約半分にする）
+        self.input_width = input_size
+        self.input_height = input_size
+        # 前処理の使い回しバッファ（縮小画像 (H, W, 3) uint8 と blob (1, 3, H, W) float32）
+        self._resized = None
+        self._blob = None
+        # detect_every フレームに1回だけネットワークを回し、間のフレームは前回の結果を
+        # Lucas-Kanade のオプティカルフローで追う（track_with_flow=False なら前回の結果をそのまま返す）
+        self.detect_every = max(1, int(detect_every))
+        self.track_with_flow = track_with_flow
+        self._frame_idx = 0
+        self._last_points = None
+        self._prev_gray = None
         self.threshold = 0.1
         
         # COCO ポーズモデルのキーポイント定義
@@ -48,11 +74,16 @@ class OpenCVPoseEstimator:
             16: None, # right_ear (スキップ)
             17: None, # left_ear (スキップ)
         }
+        # convert_to_mediapipe_format 用の対応表（COCO 番号 → MediaPipe 番号）を添字配列にしておく
+        pairs = [(k, v) for k, v in self.coco_to_mediapipe.items() if v is not None]
+        self._src = np.array([p[0] for p in pairs], dtype=np.int32)
+        self._dst = np.array([p[1] for p in pairs], dtype=np.int32)
         
         self._try_load_model()
     
     def _try_load_model(self):
         """OpenPoseモデルの読み込みを試行"""
+        global _warned_missing_model
         # COCOモデルのパス（一般的な配置場所）
         model_paths = [
             "models/pose_coco.prototxt",
@@ -65,67 +96,153 @@ class OpenCVPoseEstimator:
             # 簡略化: ファイルが存在しない場合はスキップ
             prototxt_path = "models/pose_coco.prototxt"
             caffemodel_path = "models/pose_coco.caffemodel"
+            int8_path = "models/pose_coco_int8.onnx"
             
-            if os.path.exists(prototxt_path) and os.path.exists(caffemodel_path):
+            if self.use_int8 and os.path.exists(int8_path):
+                # Caffe → ONNX 変換後に onnxruntime.quantization.quantize_dynamic(weight_type=QInt8) で作ったモデル。
+                # OpenCV DNN の INT8 層は CPU 実装のみ（VNNI 対応 CPU で速い）なので GPU ターゲットは選ばない
+                self.net = cv2.dnn.readNetFromONNX(int8_path)
+                self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+                self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+                self.target = "cpu"
+                self.quantized = True
+                self.available = True
+                logger.info("OpenCV DNN pose model loaded successfully (int8, target: cpu)")
+            elif os.path.exists(prototxt_path) and os.path.exists(caffemodel_path):
                 self.net = cv2.dnn.readNetFromCaffe(prototxt_path, caffemodel_path)
+                self.target = self._select_target(self.net)
                 self.available = True
-                print("OpenCV DNN pose model loaded successfully")
+                logger.info(f"OpenCV DNN pose model loaded successfully (target: {self.target})")
             else:
-                print("OpenCV DNN pose model files not found - using fallback")
+                if not _warned_missing_model:
+                    _warned_missing_model = True
+                    logger.warning("OpenCV DNN pose model files not found - using fallback")
                 self.available = False
         except Exception as e:
-            print(f"Failed to load OpenCV DNN model: {e}")
+            logger.warning(f"Failed to load OpenCV DNN model: {e}")
             self.available = False
     
+    @staticmethod
+    def _select_target(net):
+        """推論デバイスを選ぶ: CUDA（FP16）→ OpenCL（FP16）→ CPU の順
+
+        CUDA は OpenCV が CUDA 付きでビルドされている場合のみ。OpenCV DNN の CUDA バックエンドは
+        モデルによって速度差が大きく、MediaPipe 自身の GPU 経路ほど速いとは限らない。
+        対応していない層があれば OpenCV が forward 時に CPU へ戻す。
+        """
+        try:
+            if hasattr(cv2, "cuda") and cv2.cuda.getCudaEnabledDeviceCount() > 0:
+                net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
+                net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA_FP16)
+                return "cuda_fp16"
+            if cv2.ocl.haveOpenCL():
+                net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+                net.setPreferableTarget(cv2.dnn.DNN_TARGET_OPENCL_FP16)
+                return "opencl_fp16"
+        except cv2.error as e:
+            logger.warning(f"OpenCV DNN GPU target unavailable, using CPU: {e}")
+        net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        return "cpu"
+    
+    def _make_blob(self, image):
+        """blobFromImage(image, 1/255, (W, H), swapRB=False, crop=False) と同じ blob を使い回しのバッファに作る"""
+        size = (self.input_width, self.input_height)
+        if self._blob is None or self._blob.shape[2:] != (self.input_height, self.input_width):
+            self._resized = np.empty((self.input_height, self.input_width, 3), np.uint8)
+            self._blob = np.empty((1, 3, self.input_height, self.input_width), np.float32)
+        cv2.resize(image, size, dst=self._resized, interpolation=cv2.INTER_LINEAR)
+        # HWC → CHW と 1/255 のスケーリングを1回で（float32 で計算するので blobFromImage と値も一致）
+        np.multiply(self._resized.transpose(2, 0, 1), np.float32(1.0 / 255), out=self._blob[0], dtype=np.float32)
+        return self._blob
+    
+    def reset_tracking(self):
+        """別の動画を処理する前に、フレーム間引き・追跡の状態を捨てる"""
+        self._frame_idx = 0
+        self._last_points = None
+        self._prev_gray = None
+    
     def detect_pose(self, image) -> List[Tuple[int, int, float]]:
-        """ポーズ検出を実行"""
+        """ポーズ検出を実行
+
+        detect_every > 1 のときは、間のフレームで CNN を回さず前回の点を追跡して返す。
+        """
         if not self.available:
             return []
         
+        idx = self._frame_idx
+        self._frame_idx += 1
+        if (idx % self.detect_every and self._last_points
+                and (self._prev_gray is None or self._prev_gray.shape == image.shape[:2])):
+            if self.track_with_flow:
+                self._last_points = self._track_points(image)
+            return self._last_points
+        
+        points = self._run_net(image)
+        self._last_points = points
+        if self.detect_every > 1 and self.track_with_flow:
+            self._prev_gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return points
+    
+    def _track_points(self, image):
+        """前フレームの検出点を calcOpticalFlowPyrLK で今のフレームへ移す（見失った点は (0, 0, 0.0)）"""
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        points = list(self._last_points)
+        live = [i for i, (_, _, p) in enumerate(points) if p > 0]
+        if live:
+            prev = np.array([points[i][:2] for i in live], np.float32).reshape(-1, 1, 2)
+            nxt, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, prev, None)
+            h, w = gray.shape
+            for i, (x, y), ok in zip(live, nxt.reshape(-1, 2).tolist(), status.ravel().tolist()):
+                if ok and 0 <= x < w and 0 <= y < h:
+                    points[i] = (int(x), int(y), points[i][2])
+                else:
+                    points[i] = (0, 0, 0.0)
+        self._prev_gray = gray
+        return points
+    
+    def _run_net(self, image):
         try:
             # 前処理
-            blob = cv2.dnn.blobFromImage(
-                image, 1.0/255, (self.input_width, self.input_height), 
-                (0, 0, 0), swapRB=False, crop=False
-            )
-            
-            self.net.setInput(blob)
+            self.net.setInput(self._make_blob(image))
+            # 出力は毎回新しい配列になる。Python バインディングの forward(outputBlobs, ...) は
+            # 渡したリストに書き込まず新しい配列を返すので、出力バッファの使い回しはできない
             output = self.net.forward()
             
-            # 後処理
-            points = []
+            # 後処理: COCO 18キーポイントのピークを1回の argmax でまとめて求める
+            # （minMaxLoc と同じく、最大値が複数あれば行優先で最初の位置）
             h, w = image.shape[:2]
+            out_h, out_w = output.shape[2], output.shape[3]
+            flat = output[0, :18].reshape(18, -1)
+            idx = flat.argmax(axis=1)
+            probs = flat[np.arange(len(idx)), idx].astype(np.float64)
+            ys, xs = np.divmod(idx, out_w)
+            coords = np.stack((w * xs / out_w, h * ys / out_h), axis=1).astype(np.int64)
+            # しきい値以下の点は (0, 0, 0.0) にする。点ごとの if ではなくマスクでまとめて落とす
+            # （np.where なので負の確率や NaN でも 0 / 0.0 になる）
+            valid = probs > self.threshold
+            coords = np.where(valid[:, None], coords, 0)
+            probs = np.where(valid, probs, 0.0)
             
-            for i in range(18):  # COCO 18キーポイント
-                prob_map = output[0, i, :, :]
-                min_val, prob, min_loc, point = cv2.minMaxLoc(prob_map)
-                
-                x = int((w * point[0]) / output.shape[3])
-                y = int((h * point[1]) / output.shape[2])
-                
-                if prob > self.threshold:
-                    points.append((x, y, prob))
-                else:
-                    points.append((0, 0, 0.0))
-            
-            return points
+            return [(x, y, p) for (x, y), p in zip(coords.tolist(), probs.tolist())]
         except Exception as e:
-            print(f"Pose detection error: {e}")
+            logger.error(f"Pose detection error: {e}")
             return []
     
     def convert_to_mediapipe_format(self, coco_points, image_shape):
-        """COCOフォーマットをMediaPipe風に変換"""
-        h, w = image_shape[:2]
-        mediapipe_points = [None] * 33
-        
-        for coco_idx, mp_idx in self.coco_to_mediapipe.items():
-            if mp_idx is not None and coco_idx < len(coco_points):
-                x, y, conf = coco_points[coco_idx]
-                if conf > 0.1:
-                    # 正規化座標に変換
-                    mediapipe_points[mp_idx] = (int(x), int(y))
-        
-        return mediapipe_points
+        """COCOフォーマットをMediaPipe風に変換
+
+        戻り値は (33, 2) int32 のピクセル座標。検出されなかった点は -1 で、
+        有効な点は arr[arr[:, 0] >= 0] で取り出せる。
+        """
+        out = np.full((33, 2), -1, dtype=np.int32)
+        coco_arr = np.asarray(coco_points, dtype=np.float64).reshape(-1, 3)
+        in_range = self._src < len(coco_arr)
+        src, dst = self._src[in_range], self._dst[in_range]
+        valid = coco_arr[src, 2] > 0.1
+        # 同じ MediaPipe 番号に複数の COCO 点が対応する場合は、dict の走査順どおり後の点が残る
+        out[dst[valid]] = coco_arr[src[valid], :2].astype(np.int32)
+        return out
 
 
 # グローバルインスタンス
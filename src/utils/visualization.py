@@ -1,20 +1,72 @@
+import queue
+import sys
+import threading
+from functools import lru_cache
+
 import cv2
 import numpy as np
 
-def overlay_heatmap(frame, heatmap_value):
+
+@lru_cache(maxsize=256)
+def _scalar_overlay_lut(value):
+    """スカラー値 value の JET 色を 30% で重ねる変換の (256, 1, 3) LUT（値ごとに1回だけ作る）
+
+    addWeighted 自体で作るので、丸めは全画素に addWeighted をかけた場合と一致する。
+    """
+    color = cv2.applyColorMap(np.full((1, 1), value, dtype=np.uint8), cv2.COLORMAP_JET)
+    ramp = np.repeat(np.arange(256, dtype=np.uint8).reshape(256, 1, 1), 3, axis=2)
+    return cv2.addWeighted(ramp, 0.7, np.broadcast_to(color, ramp.shape).copy(), 0.3, 0)
+
+
+# OpenCL が使えるなら、配列ヒートマップのブレンドは UMat 経由で GPU に任せる
+_USE_UMAT = cv2.ocl.haveOpenCL()
+
+_colored_bufs = {}
+
+
+def _colored_buf(shape):
+    """overlay_heatmap の applyColorMap 出力用バッファ（(h, w) ごとに1枚）"""
+    buf = _colored_bufs.get(shape)
+    if buf is None:
+        buf = _colored_bufs[shape] = np.empty((*shape, 3), np.uint8)
+    return buf
+
+
+def overlay_heatmap(frame, heatmap_value, *, skip_zero=False):
     """
     フレームにヒートマップをオーバーレイする
     heatmap_value: 0-255の範囲のスカラー値
+
+    frame に cv2.UMat を渡すと結果も UMat で返す（GPU 上のまま次の処理に渡せる）。
+    skip_zero=True なら、スカラー値が 0 以下のとき（ウォームアップ中など）は色を重ねずに
+    frame をそのまま返す（通常は 0 でも JET の濃い青が重なる）。
     """
+    is_umat = isinstance(frame, cv2.UMat)
+    if skip_zero and np.isscalar(heatmap_value) and float(heatmap_value) <= 0.0:
+        return frame
+    if not is_umat and frame.size == 0:
+        return frame.copy()  # 画素がないので重ねる必要がない
+    if np.isscalar(heatmap_value) and (is_umat or frame.dtype == np.uint8 and frame.ndim == 3 and frame.shape[2] == 3):
+        # 全画素が同じ色になるので、フレームサイズのヒートマップを作らずに
+        # 「元の値 → ブレンド後の値」の LUT を1回引くだけで済ませる
+        value = int(np.full((1, 1), heatmap_value, dtype=np.uint8)[0, 0])
+        return cv2.LUT(frame, _scalar_overlay_lut(value))
+
     # heatmap_valueがスカラーの場合、フレームサイズの配列に変換
     if np.isscalar(heatmap_value):
         height, width = frame.shape[:2]
         heatmap_array = np.full((height, width), heatmap_value, dtype=np.uint8)
     else:
-        heatmap_array = heatmap_value.astype(np.uint8)
+        heatmap_array = heatmap_value.astype(np.uint8, copy=False)
+    
+    if is_umat or _USE_UMAT:
+        # T-API: UMat を渡すと applyColorMap / addWeighted が OpenCL で実行される
+        overlay = cv2.addWeighted(cv2.UMat(frame) if not is_umat else frame, 0.7,
+                                  cv2.applyColorMap(cv2.UMat(heatmap_array), cv2.COLORMAP_JET), 0.3, 0)
+        return overlay if is_umat else overlay.get()
     
-    # カラーマップを適用
-    heatmap_colored = cv2.applyColorMap(heatmap_array, cv2.COLORMAP_JET)
+    # カラーマップを適用（中間のカラー画像はサイズごとに使い回す）
+    heatmap_colored = cv2.applyColorMap(heatmap_array, cv2.COLORMAP_JET, dst=_colored_buf(heatmap_array.shape[:2]))
     
     # フレームとヒートマップをブレンド
     overlay = cv2.addWeighted(frame, 0.7, heatmap_colored, 0.3, 0)
@@ -23,14 +75,85 @@ def overlay_heatmap(frame, heatmap_value):
 
 def draw_tracking_path(frame, points, color=(0, 255, 0), thickness=2):
     """Draw the tracking path on the video frame."""
-    for i in range(1, len(points)):
-        if points[i - 1] is not None and points[i] is not None:
-            cv2.line(frame, points[i - 1], points[i], color, thickness)
+    # None で途切れた区間ごとに折れ線にまとめ、polylines 1回で描く
+    # （LINE_8 のままなので、線分ごとに cv2.line を呼んだ場合と同じ画素になる）
+    runs, run = [], []
+    for p in points:
+        if p is None:
+            if len(run) > 1:
+                runs.append(np.array(run, dtype=np.int32))
+            run = []
+        else:
+            run.append(p)
+    if len(run) > 1:
+        runs.append(np.array(run, dtype=np.int32))
+    if runs:
+        cv2.polylines(frame, runs, False, color, thickness)
+
+class _Displayer:
+    """imshow + waitKey(1) をバックグラウンドスレッドで回す表示係
+
+    キューは2枚までで、満杯なら古いフレームを捨てて新しいものを入れる（呼び出し側は待たない）。
+    HighGUI をメインスレッド以外から使えない環境（macOS など）では使えない。
+    """
+
+    def __init__(self, maxsize=2):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run, name="jva-display", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            window_name, frame = self.queue.get()
+            cv2.imshow(window_name, frame)
+            cv2.waitKey(1)
+
+    def put(self, window_name, frame):
+        item = (window_name, frame.copy())  # 呼び出し側がバッファを使い回しても表示が崩れないように
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+_displayer = None
+_displayer_lock = threading.Lock()
+# macOS の HighGUI はメインスレッドからしか使えないので、そこでは表示係スレッドを使わない
+_THREADED_DISPLAY = sys.platform != "darwin"
+
+
+def draw_skeleton(frame, points_xy, connections, color=(0, 255, 0), thickness=2, valid=None):
+    """骨格の辺を cv2.polylines 1回で描く
+
+    points_xy: (K, 2) のピクセル座標、connections: (E, 2) の添字配列（または点番号の組のリスト）。
+    valid を渡すと、両端が有効な辺だけを描く。
+    """
+    conn = np.asarray(connections, dtype=np.intp).reshape(-1, 2)
+    if valid is not None:
+        valid = np.asarray(valid, dtype=bool)
+        conn = conn[valid[conn[:, 0]] & valid[conn[:, 1]]]
+    if len(conn):
+        segments = np.asarray(points_xy, dtype=np.int32)[conn]  # (E, 2, 2)
+        cv2.polylines(frame, list(segments), False, color, thickness)
+
 
 def display_frame(frame, window_name='Video'):
     """Display a video frame."""
-    cv2.imshow(window_name, frame)
-    cv2.waitKey(1)
+    global _displayer
+    if not _THREADED_DISPLAY:
+        cv2.imshow(window_name, frame)
+        cv2.waitKey(1)
+        return
+    if _displayer is None:
+        with _displayer_lock:
+            if _displayer is None:
+                _displayer = _Displayer()
+    _displayer.put(window_name, frame)
 
 def save_frame(video_writer, frame):
     """Save a processed frame to the video writer."""
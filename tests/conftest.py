@@ -0,0 +1,21 @@
+"""
+conftest.py - テストセッション共通の設定
+
+OpenCV の最適化（SIMD）とスレッド数をセッション開始時に固定し、
+実行環境によって polylines / GaussianBlur などの速度が変わらないようにする。
+"""
+
+import os
+
+import cv2
+import pytest
+
+
+@pytest.fixture(scope="session", autouse=True)
+def opencv_runtime():
+    """OpenCV の最適化コードを有効にし、parallel_for_ のスレッド数を最大 8 に固定する"""
+    prev_threads = cv2.getNumThreads()
+    cv2.setUseOptimized(True)
+    cv2.setNumThreads(min(8, os.cpu_count() or 1))
+    yield
+    cv2.setNumThreads(prev_threads)
@@ -0,0 +1,45 @@
+"""
+test_frame_cache.py - dHash フレームキャッシュのテスト
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from src.utils.frame_cache import DHashCache, dhash
+
+
+def _gradient_frame(shift=0):
+    x = np.tile(np.arange(640, dtype=np.int32), (480, 1))
+    frame = ((np.sin((x + shift) / 40.0) + 1) * 127).astype(np.uint8)
+    return np.dstack([frame] * 3)
+
+
+def test_dhash_is_stable_and_64bit():
+    frame = _gradient_frame()
+    h = dhash(frame)
+    assert h == dhash(frame.copy())
+    assert 0 <= h < (1 << 64)
+
+
+def test_cache_hit_within_hamming_distance():
+    cache = DHashCache(maxsize=4, max_distance=3)
+    cache.put(0b1011, "state")
+    assert cache.get(0b1011) == "state"
+    assert cache.get(0b0100) is None  # 4 bit 差
+    assert cache.get(0b1000) == "state"  # 2 bit 差
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_cache_evicts_oldest():
+    cache = DHashCache(maxsize=2, max_distance=0)
+    for k in (1, 2, 4):
+        cache.put(k, k)
+    assert len(cache) == 2
+    assert cache.get(1) is None
+    assert cache.get(4) == 4
@@ -0,0 +1,107 @@
+"""
+test_frame_pipeline.py - reader / writer スレッドのテスト
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from jva.frame_pipeline import FrameReaderThread, FrameWriterThread, render_buffers
+
+
+class FakeCapture:
+    def __init__(self, n):
+        self.n = n
+        self.i = 0
+
+    def read(self):
+        if self.i >= self.n:
+            return False, None
+        self.i += 1
+        return True, np.full((4, 4, 3), self.i, dtype=np.uint8)
+
+
+class ListWriter:
+    def __init__(self, fail_at=None):
+        self.frames = []
+        self.fail_at = fail_at
+
+    def write(self, frame):
+        if self.fail_at is not None and len(self.frames) == self.fail_at:
+            raise IOError("disk full")
+        self.frames.append(int(frame[0, 0, 0]))
+
+
+def test_reader_yields_frames_in_order():
+    reader = FrameReaderThread(FakeCapture(50), prefetch=4)
+    got = [(idx, int(f[0, 0, 0])) for idx, f in reader]
+    reader.close()
+    assert got == [(i, i) for i in range(1, 51)]
+
+
+def test_reader_close_before_exhausted():
+    reader = FrameReaderThread(FakeCapture(1000), prefetch=2)
+    next(iter(reader))
+    reader.close()  # ブロックせずに終了できる
+
+
+def test_reader_reraises_read_error_after_buffered_frames():
+    class RaisingCapture(FakeCapture):
+        def read(self):
+            if self.i == 3:
+                raise RuntimeError("corrupt packet")
+            return super().read()
+
+    reader = FrameReaderThread(RaisingCapture(10), prefetch=4)
+    got = []
+    with pytest.raises(RuntimeError, match="corrupt packet"):
+        for idx, _ in reader:
+            got.append(idx)
+    reader.close()
+    assert got == [1, 2, 3]
+
+
+def test_writer_preserves_order_with_buffer_ring():
+    sink = ListWriter()
+    writer = FrameWriterThread(sink, maxsize=3)
+    bufs = render_buffers(writer, (4, 4, 3))
+    for i in range(1, 41):
+        buf = bufs[i % len(bufs)]
+        buf[:] = i
+        writer.write(buf)
+    writer.close()
+    assert sink.frames == list(range(1, 41))
+
+
+def test_writer_error_is_reraised():
+    writer = FrameWriterThread(ListWriter(fail_at=2), maxsize=2)
+    with pytest.raises(IOError):
+        for i in range(10):
+            writer.write(np.zeros((4, 4, 3), dtype=np.uint8))
+        writer.close()
+
+
+def test_stage_thread_runs_items_in_order_and_reraises():
+    from jva.frame_pipeline import StageThread
+
+    seen = []
+    stage = StageThread(seen.append, maxsize=2)
+    for i in range(100):
+        stage.put(i)
+    stage.close()
+    assert seen == list(range(100))
+
+    def boom(item):
+        raise RuntimeError("render failed")
+
+    stage = StageThread(boom, maxsize=2)
+    with pytest.raises(RuntimeError):
+        for i in range(10):
+            stage.put(i)
+        stage.close()
@@ -0,0 +1,117 @@
+"""
+test_landmarks_io.py - ランドマーク JSON ストリーミング書き出しのテスト
+"""
+
+import json
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+import numpy as np
+import pytest
+
+from jva.landmarks_io import LandmarksJsonWriter, dumps_json
+
+
+def test_stream_writer_produces_export_compatible_json(tmp_path):
+    path = tmp_path / "landmarks.json"
+    with LandmarksJsonWriter(str(path)) as writer:
+        for f in range(1, 4):
+            lms = [{"id": i, "x": 0.5, "y": 0.25, "visibility": 1.0} for i in range(33)]
+            writer.write_frame(f, f / 30.0, lms)
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["format"] == "mediapipe_pose_landmarks"
+    assert data["frame_count"] == 3
+    assert [fr["frame"] for fr in data["landmarks"]] == [1, 2, 3]
+    assert len(data["landmarks"][0]["landmarks"]) == 33
+
+
+def test_stream_writer_empty(tmp_path):
+    path = tmp_path / "empty.json"
+    writer = LandmarksJsonWriter(str(path))
+    writer.close()
+    writer.close()  # 二重 close は無害
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["frame_count"] == 0
+    assert data["landmarks"] == []
+
+
+def test_array_frames_are_chunked_in_order(tmp_path):
+    import numpy as np
+
+    path = tmp_path / "arrays.json"
+    writer = LandmarksJsonWriter(str(path), chunk_size=4)
+    for f in range(1, 11):
+        xy = np.full((33, 2), f / 100.0, dtype=np.float32)
+        vis = np.ones(33, dtype=bool)
+        vis[5] = False
+        writer.write_arrays(f, f / 30.0, xy, vis)
+    writer.write_frame(11, 11 / 30.0, [])
+    writer.close()
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["frame_count"] == 11
+    assert [fr["frame"] for fr in data["landmarks"]] == list(range(1, 12))
+    lm = data["landmarks"][2]["landmarks"]
+    assert lm[0] == {"id": 0, "x": pytest.approx(0.03), "y": pytest.approx(0.03), "visibility": 1.0}
+    assert lm[5]["visibility"] == 0.0
+
+
+def test_one_frame_per_line(tmp_path):
+    path = tmp_path / "lines.json"
+    with LandmarksJsonWriter(str(path)) as writer:
+        for f in range(1, 4):
+            writer.write_frame(f, f / 30.0, [{"id": 0, "x": 0.1, "y": 0.2, "visibility": 1.0}])
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    frame_lines = [ln.rstrip(",") for ln in lines[1:-1]]
+    assert [json.loads(ln)["frame"] for ln in frame_lines] == [1, 2, 3]
+
+
+def test_dumps_json_accepts_numpy_and_has_no_indent():
+    data = dumps_json({"xy": np.array([0.5, 0.25], np.float32), "n": np.int64(3), "name": "やり投げ"})
+    assert b"\n" not in data
+    assert json.loads(data) == {"xy": [0.5, 0.25], "n": 3, "name": "やり投げ"}
+
+
+def test_columnar_writer_matches_frame_layout(tmp_path):
+    from jva.landmarks_io import expand_columnar, open_landmarks_writer
+
+    rng = np.random.default_rng(0)
+    paths = {layout: tmp_path / f"{layout}.json" for layout in ("frames", "columnar")}
+    writers = {layout: open_landmarks_writer(str(p), layout) for layout, p in paths.items()}
+    writers["columnar"]._chunk_size = 4  # 次のチャンクから小さくしてチャンク連結を通す
+    for f in range(1, 11):
+        xy = rng.random((33, 2)).astype(np.float32)
+        vis = rng.random(33) > 0.3
+        for w in writers.values():
+            w.write_arrays(f, f / 30.0, xy, vis)
+    for w in writers.values():
+        w.close()
+
+    frames = json.loads(paths["frames"].read_text(encoding="utf-8"))
+    columnar = json.loads(paths["columnar"].read_text(encoding="utf-8"))
+    assert columnar["layout"] == "columnar" and columnar["frame_count"] == 10
+    assert len(columnar["x"]) == 10 and len(columnar["x"][0]) == 33
+    expanded = expand_columnar(columnar)["landmarks"]
+    assert [f["frame"] for f in expanded] == [f["frame"] for f in frames["landmarks"]]
+    # columnar は float32 の最短表記で出るので float32 として一致を見る
+    for key in ("x", "y", "visibility"):
+        got = np.float32([[lm[key] for lm in f["landmarks"]] for f in expanded])
+        want = np.float32([[lm[key] for lm in f["landmarks"]] for f in frames["landmarks"]])
+        assert np.array_equal(got, want)
+
+
+def test_columnar_writer_empty(tmp_path):
+    from jva.landmarks_io import ColumnarLandmarksWriter
+
+    path = tmp_path / "empty.json"
+    with ColumnarLandmarksWriter(str(path)):
+        pass
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["frame_count"] == 0 and data["x"] == []
@@ -23,6 +23,8 @@ from jva_visuals.trails import WristTrailPass
 from jva_visuals.vectors import VectorPass
 from jva_visuals.heatmap import HeatmapPass
 from jva_visuals.hud import HUDPass
+from src.jva.frame_pipeline import FrameReaderThread, FrameWriterThread
+from src.jva.ffmpeg_io import have_ffmpeg, select_encoder
 
 try:
     from src.pipelines.pose_analysis import PoseAnalyzer
@@ -31,24 +33,59 @@ except ImportError:
     POSE_ANALYZER_AVAILABLE = False
 
 
+def open_test_writer(path: str, fps: float, size: tuple):
+    """テスト動画用のライターを返す
+
+    JVA_TEST_NVENC=1 かつ ffmpeg があれば FFmpegPipeWriter（NVENC > QSV > VAAPI > libx264）で
+    書き出し、それ以外は従来どおり cv2.VideoWriter（mp4v）を使う。
+    JVA_FFMPEG_CODEC=libsvtav1 を指定した場合は最速プリセット（12）で回す。
+    """
+    if os.environ.get("JVA_TEST_NVENC") == "1" and have_ffmpeg():
+        from src.io.video_writer import FFmpegPipeWriter
+        codec, extra = select_encoder(realtime=True)
+        if codec == "libsvtav1" and not extra:
+            extra = ["-preset", "12"]
+        writer = FFmpegPipeWriter(path, size[0], size[1], fps, codec=codec, extra_args=extra)
+        if writer.isOpened():
+            return writer
+        writer.release()
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    return cv2.VideoWriter(path, fourcc, fps, size)
+
+
 def create_dummy_video(filepath: str, width: int = 640, height: int = 480, 
                       fps: float = 30.0, duration_sec: float = 2.0):
     """テスト用ダミー動画を生成"""
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out = cv2.VideoWriter(filepath, fourcc, fps, (width, height))
+    out = open_test_writer(filepath, fps, (width, height))
     
     total_frames = int(fps * duration_sec)
     
+    # 白い円（半径 20）は1回だけ描いたスプライトを ROI に重ねる
+    r = 20
+    disc = np.zeros((2 * r + 1, 2 * r + 1, 3), dtype=np.uint8)
+    cv2.circle(disc, (r, r), r, (255, 255, 255), -1)
+    # 黒背景のフレームは1枚を使い回し、前フレームで描いた円と文字の行だけ消す
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    _, baseline = cv2.getTextSize("Frame 0", cv2.FONT_HERSHEY_SIMPLEX, 1, 2)
+    text_rows = min(height, 30 + baseline + 2)
+    prev_box = None
+    
     for frame_idx in range(total_frames):
-        # 黒背景
-        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        if prev_box is not None:
+            frame[prev_box] = 0
+        frame[:text_rows] = 0
         
         # 白い円が右に移動
         t = frame_idx / total_frames
         center_x = int(50 + t * (width - 100))
         center_y = height // 2
         
-        cv2.circle(frame, (center_x, center_y), 20, (255, 255, 255), -1)
+        if r <= center_x < width - r and r <= center_y < height - r:
+            prev_box = np.s_[center_y - r:center_y + r + 1, center_x - r:center_x + r + 1]
+            np.maximum(frame[prev_box], disc, out=frame[prev_box])
+        else:
+            prev_box = np.s_[:, :]  # 端にかかる円はそのまま描き、次のフレームで全面を消す
+            cv2.circle(frame, (center_x, center_y), r, (255, 255, 255), -1)
         
         # フレーム番号を表示
         cv2.putText(frame, f"Frame {frame_idx}", (10, 30), 
@@ -60,6 +97,34 @@ def create_dummy_video(filepath: str, width: int = 640, height: int = 480,
     return total_frames
 
 
+# ベンチマーク用の 1080p ゼロフレーム（読み取り専用で共有する）
+_ZERO_1080 = np.zeros((1080, 1920, 3), dtype=np.uint8)
+_ZERO_1080.setflags(write=False)
+
+# ダミー人物の主要ランドマーク（MediaPipe 番号）と基準点 (base_x, base_y) からのずれ
+_DUMMY_JOINTS = [0, 11, 12, 13, 14, 15, 16, 23, 24, 25, 26, 27, 28]
+_DUMMY_OFFSETS = np.array([
+    (0, -100),   # 鼻
+    (-20, -50),  # 左肩
+    (20, -50),   # 右肩
+    (-30, -20),  # 左肘
+    (30, -20),   # 右肘
+    (-40, 10),   # 左手首
+    (40, 10),    # 右手首（動的）
+    (-10, 20),   # 左腰
+    (10, 20),    # 右腰
+    (-15, 80),   # 左膝
+    (15, 80),    # 右膝
+    (-20, 140),  # 左足首
+    (20, 140),   # 右足首
+], dtype=np.float64)
+_DUMMY_WRIST_ROW = _DUMMY_JOINTS.index(16)
+
+# ダミー速度（0-5）。固定シードで1回だけ作り、フレーム番号で引く（テストを決定的にする）
+_DUMMY_VEL = np.random.default_rng(0).random((1024, 33)) * 5
+_DUMMY_VEL.setflags(write=False)
+
+
 def create_dummy_pose_state(frame_idx: int, total_frames: int):
     """ダミーのポーズ状態を生成"""
     # 移動する人物のダミーランドマーク
@@ -67,33 +132,20 @@ def create_dummy_pose_state(frame_idx: int, total_frames: int):
     base_x = 50 + t * 540  # 左から右へ移動
     base_y = 240
     
+    # 主要な点を基準点 + ずれの表から1回で求める
+    xy = _DUMMY_OFFSETS + (base_x, base_y)
+    # 右手首に動的な動きを追加（やり投げの動作風）
+    xy[_DUMMY_WRIST_ROW, 0] += 30 * np.sin(t * np.pi * 4)  # 振り動作
+    
     # 33個のMediaPipeランドマーク
     points = [None] * 33
-    
-    # 主要な点を設定
-    points[0] = (base_x, base_y - 100)  # 鼻
-    points[11] = (base_x - 20, base_y - 50)  # 左肩
-    points[12] = (base_x + 20, base_y - 50)  # 右肩
-    points[13] = (base_x - 30, base_y - 20)  # 左肘
-    points[14] = (base_x + 30, base_y - 20)  # 右肘
-    points[15] = (base_x - 40, base_y + 10)  # 左手首
-    points[16] = (base_x + 40, base_y + 10)  # 右手首（動的）
-    points[23] = (base_x - 10, base_y + 20)  # 左腰
-    points[24] = (base_x + 10, base_y + 20)  # 右腰
-    points[25] = (base_x - 15, base_y + 80)  # 左膝
-    points[26] = (base_x + 15, base_y + 80)  # 右膝
-    points[27] = (base_x - 20, base_y + 140)  # 左足首
-    points[28] = (base_x + 20, base_y + 140)  # 右足首
-    
-    # 右手首に動的な動きを追加（やり投げの動作風）
-    if points[16]:
-        swing_amplitude = 30 * np.sin(t * np.pi * 4)  # 振り動作
-        points[16] = (points[16][0] + swing_amplitude, points[16][1])
+    for i, p in zip(_DUMMY_JOINTS, xy.tolist()):
+        points[i] = tuple(p)
     
     return {
         "points": points,
         "com": (base_x, base_y),  # 重心
-        "velocities": np.random.rand(33) * 5  # ダミー速度
+        "velocities": _DUMMY_VEL[frame_idx % len(_DUMMY_VEL)]  # ダミー速度
     }
 
 
@@ -111,6 +163,21 @@ def temp_video():
             os.unlink(video_path)
 
 
+@pytest.fixture(scope="module")
+def shared_pose_analyzer():
+    """モジュール内で共有する PoseAnalyzer（MediaPipe グラフの初期化は1回だけ）"""
+    pa = PoseAnalyzer()
+    yield pa
+    pa.close()
+
+
+@pytest.fixture
+def pose_analyzer(shared_pose_analyzer):
+    """動画ごとの状態だけ初期化した共有 PoseAnalyzer"""
+    shared_pose_analyzer.reset()
+    return shared_pose_analyzer
+
+
 @pytest.fixture
 def sample_visuals_config():
     """サンプル可視化設定"""
@@ -203,8 +270,8 @@ class TestVisualPipeline:
         
         result = pipeline.apply_all(frame, state)
         
-        # 何も変更されない
-        np.testing.assert_array_equal(result, frame)
+        # 何も変更されない（入力は全ゼロ）
+        assert not result.any()
     
     def test_single_pass_pipeline(self):
         """単一パスパイプラインのテスト"""
@@ -221,7 +288,7 @@ class TestVisualPipeline:
             frame = result  # 次のフレームに引き継ぎ
         
         # 軌跡が描画されているはず
-        assert not np.array_equal(result, np.zeros((480, 640, 3), dtype=np.uint8))
+        assert result.any()
     
     def test_multi_pass_pipeline(self, sample_visuals_config):
         """複数パスパイプラインのテスト"""
@@ -239,11 +306,32 @@ class TestVisualPipeline:
         
         # 最終結果が元フレームと異なる（何らかの可視化が適用された）
         final_result = results[-1]
-        assert not np.array_equal(final_result, np.zeros((480, 640, 3), dtype=np.uint8))
+        assert final_result.any()
         
         # フレーム間で差がある（動的な可視化）
         assert not np.array_equal(results[0], results[-1])
     
+    def test_parallel_pipeline_matches_sequential(self):
+        """並列モードでも、描画領域が重ならなければ順次適用と同じ結果になる"""
+        config = {"wrist_trail": True, "vectors": True, "hud": True}
+        sequential = VisualPipeline(VisualPassRegistry.build_from_config(config))
+        parallel = VisualPipeline(VisualPassRegistry.build_from_config(config), parallel=True)
+        try:
+            frame = np.zeros((480, 640, 3), dtype=np.uint8)
+            # 1フレーム目は軌跡が1点だけなので、並列区間で描くのは VectorPass のみ
+            state = create_dummy_pose_state(0, 10)
+            expected = sequential.apply_all(frame, state, fps=30.0)
+            result = parallel.apply_all(frame, state, fps=30.0)
+            np.testing.assert_array_equal(result, expected)
+            
+            for i in range(1, 5):
+                state = create_dummy_pose_state(i, 10)
+                result = parallel.apply_all(frame, state, fps=30.0)
+            assert result.any()
+            assert not frame.any()  # 入力フレームは書き換えない
+        finally:
+            parallel.close()
+    
     def test_error_handling(self):
         """エラーハンドリングのテスト"""
         # 意図的にエラーを起こすダミーパス
@@ -265,8 +353,71 @@ class TestVisualPipeline:
         # エラーが発生してもクラッシュしない
         result = pipeline.apply_all(frame, state)
         
-        # 元のフレームが返される
-        np.testing.assert_array_equal(result, frame)
+        # 元のフレーム（全ゼロ）が返される
+        assert not result.any()
+
+    def test_all_modes_apply_passes_enabled_at_construction(self):
+        """順次・並列・縮小のどのモードでも、作成時に無効なパスや後から足したパスは適用しない"""
+        class CountingPass:
+            parallel_safe = True
+            supports_downscale = True
+
+            def __init__(self, enabled):
+                self.enabled = enabled
+                self.calls = 0
+
+            def is_enabled(self):
+                return self.enabled
+
+            def apply(self, frame, landmarks):
+                self.calls += 1
+                return frame
+
+        frame = _ZERO_1080
+        state = create_dummy_pose_state(0, 1)
+        for kwargs in ({}, {"parallel": True}, {"render_scale": 0.5}):
+            disabled, added = CountingPass(False), CountingPass(True)
+            pipeline = VisualPipeline([disabled], **kwargs)
+            pipeline.passes.append(added)
+            try:
+                pipeline.apply_all(frame, state)
+            finally:
+                pipeline.close()
+            assert disabled.calls == 0 and added.calls == 0, kwargs
+
+    def test_output_buffer_reuse(self):
+        """出力バッファ指定時は入力を壊さずそのバッファに書き込む"""
+        pipeline = VisualPipeline([WristTrailPass({"thickness": 2})])
+
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        out_buf = np.empty_like(frame)
+        for i in range(5):
+            state = create_dummy_pose_state(i, 5)
+            result = pipeline.apply_all(frame, state, fps=30.0, out=out_buf)
+
+        assert result.shape == frame.shape
+        assert not frame.any()  # 入力フレームは変更されない
+
+    def test_render_scale_downscales_only_large_frames(self):
+        """render_scale 指定時、720p 以下はそのまま、1080p は縮小描画した軌跡が手首付近に入る"""
+        small_frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        full = VisualPipeline([WristTrailPass({"thickness": 2})])
+        scaled = VisualPipeline([WristTrailPass({"thickness": 2})], render_scale=0.5)
+        for i in range(5):
+            state = create_dummy_pose_state(i, 5)
+            np.testing.assert_array_equal(scaled.apply_all(small_frame, state),
+                                          full.apply_all(small_frame, state))
+
+        pipeline = VisualPipeline([WristTrailPass({"thickness": 2})], render_scale=0.5)
+        frame = _ZERO_1080
+        for i in range(5):
+            state = create_dummy_pose_state(i, 5)
+            state["points"] = [None if p is None else (p[0] * 3, p[1] * 2) for p in state["points"]]
+            result = pipeline.apply_all(frame, state, fps=30.0)
+        wx, wy = (int(v) for v in state["points"][16])
+        assert result[wy - 4:wy + 5, wx - 4:wx + 5].any()
+        # 手首の y は一定なので、軌跡の帯から離れた行は変わらない
+        assert not result[:wy - 20].any() and not result[wy + 20:].any()
 
 
 class TestAdaptersIntegration:
@@ -297,6 +448,17 @@ class TestAdaptersIntegration:
         
         # px2mが異なるはず
         assert landmarks_with_height.px2m < landmarks_without_height.px2m
+    
+    def test_zeros_shares_read_only_points(self):
+        """AdaptedLandmarks.zeros は共有の読み取り専用 points を使い、書き込みは弾く"""
+        a = AdaptedLandmarks.zeros((100, 200), 30.0, 0.01, (480, 640))
+        b = AdaptedLandmarks.zeros(None, 60.0, 1.0, (720, 1280))
+        
+        assert a.points is b.points
+        assert a.points.shape == (33, 3) and not a.points.any()
+        assert a.right_wrist == (100, 200) and b.frame_shape == (720, 1280)
+        with pytest.raises(ValueError):
+            a.points[0, 0] = 1.0
 
 
 @pytest.mark.skipif(not POSE_ANALYZER_AVAILABLE, 
@@ -304,7 +466,7 @@ class TestAdaptersIntegration:
 class TestFullPipelineIntegration:
     """完全なパイプライン統合テスト"""
     
-    def test_video_processing_flow(self, temp_video, sample_visuals_config):
+    def test_video_processing_flow(self, temp_video, sample_visuals_config, pose_analyzer):
         """動画処理フロー全体のテスト"""
         video_path, total_frames = temp_video
         
@@ -326,18 +488,15 @@ class TestFullPipelineIntegration:
             height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
             fps = cap.get(cv2.CAP_PROP_FPS)
             
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+            out = open_test_writer(output_path, fps, (width, height))
             
-            # フレーム処理
+            # フレーム処理: デコードと書き出しは別スレッド、推定と描画はこのスレッドで順に行う
+            # （PoseAnalyzer は状態を持つので1スレッドのみで使う）
             frame_count = 0
-            pose_analyzer = PoseAnalyzer()
+            reader = FrameReaderThread(cap, prefetch=4)
+            writer = FrameWriterThread(out, maxsize=4)
             
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
+            for _, frame in reader:
                 # ポーズ解析（実際のMediaPipe）
                 state = pose_analyzer.process(frame, fps)
                 
@@ -347,12 +506,17 @@ class TestFullPipelineIntegration:
                 # 可視化適用
                 result = pipeline.apply_all(result, state, fps=fps, height_m=1.8)
                 
-                out.write(result)
+                # render_basic / apply_all は毎回新しい配列を返すので、キューに積んでも上書きされない
+                writer.write(result)
                 frame_count += 1
             
+            reader.close()
+            writer.close()
             cap.release()
             out.release()
-            pose_analyzer.close()
+            
+            # reader スレッド経由でも全フレームを処理している
+            assert frame_count == total_frames
             
             # 出力ファイルが作成されていることを確認
             assert os.path.exists(output_path)
@@ -373,6 +537,11 @@ class TestFullPipelineIntegration:
                 os.unlink(output_path)
 
 
+def test_opencv_runtime_optimized():
+    """conftest のセッション設定で OpenCV の最適化コード（SIMD）が有効になっている"""
+    assert cv2.useOptimized()
+
+
 def test_performance_benchmark():
     """パフォーマンステスト"""
     import time
@@ -387,15 +556,16 @@ def test_performance_benchmark():
     passes = VisualPassRegistry.build_from_config(config)
     pipeline = VisualPipeline(passes)
     
-    # 高解像度フレーム
-    frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    # 高解像度フレーム（入力は共有のゼロフレーム、出力は1枚を使い回す）
+    frame = _ZERO_1080
+    out = np.empty_like(frame)
     state = create_dummy_pose_state(0, 1)
     
     # 処理時間測定
     start_time = time.time()
     
     for i in range(10):  # 10フレーム処理
-        result = pipeline.apply_all(frame, state, fps=30.0)
+        result = pipeline.apply_all(frame, state, fps=30.0, out=out)
     
     end_time = time.time()
     processing_time = end_time - start_time
@@ -0,0 +1,183 @@
+"""
+test_pose_analysis.py - PoseAnalyzer のテスト
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from src.pipelines.pose_analysis import FrameContext, PoseAnalyzer, interpolate_landmarks
+
+
+def test_inference_downscale_keeps_full_resolution_points():
+    frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    full = PoseAnalyzer(inference_width=None)
+    small = PoseAnalyzer(inference_width=640)
+
+    assert small.inference_input(frame).shape == (360, 640, 3)
+    s_full = full.process(frame, 30.0)
+    s_small = small.process(frame, 30.0)
+
+    # 正規化座標から元解像度の座標に戻るので、縮小の有無で結果は同じ
+    assert s_small["points"] == s_full["points"]
+    assert max(p[0] for p in s_small["points"] if p is not None) > 640
+
+
+def test_inference_downscale_is_opt_in():
+    # 既定は元解像度のまま。縮小は jva.run の performance.pose_input_width（既定 640）から指定する
+    frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    assert PoseAnalyzer().inference_input(frame).shape == frame.shape
+    assert PoseAnalyzer(inference_width=640).inference_input(frame).shape == (360, 640, 3)
+
+
+def test_jva_run_analyzer_downscales_by_default():
+    from jva.run import create_pose_analyzer
+
+    assert create_pose_analyzer({}).inference_width == 640
+    assert create_pose_analyzer({"performance": {"pose_input_width": None}}).inference_width is None
+
+
+def test_inference_downscale_skipped_for_small_frames():
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    analyzer = PoseAnalyzer(inference_width=640)
+    assert analyzer.inference_input(frame) is frame
+
+
+def test_inference_input_is_c_contiguous():
+    frame = np.zeros((240, 640, 3), dtype=np.uint8)[:, ::2]
+    analyzer = PoseAnalyzer()
+    assert not frame.flags["C_CONTIGUOUS"]
+    assert analyzer.inference_input(frame).flags["C_CONTIGUOUS"]
+
+
+def test_detect_feeds_rgb_from_reused_buffer():
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    frame[..., 0] = 255  # BGR の青
+    analyzer = PoseAnalyzer()
+    seen = []
+    process = analyzer.pose.process
+    analyzer.pose.process = lambda rgb: (seen.append(rgb), process(rgb))[1]
+
+    analyzer.detect(frame)
+    analyzer.detect(frame)
+
+    assert seen[0] is seen[1]
+    assert seen[0].flags["C_CONTIGUOUS"]
+    assert seen[0][0, 0].tolist() == [0, 0, 255]
+
+
+def test_frame_context_converts_once_per_frame():
+    frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    ctx = FrameContext(frame)
+    first, second = PoseAnalyzer(inference_width=640), PoseAnalyzer(inference_width=640)
+    seen = []
+    for analyzer in (first, second):
+        process = analyzer.pose.process
+        analyzer.pose.process = lambda rgb, process=process: (seen.append(rgb), process(rgb))[1]
+
+    s_ctx = first.process(ctx, 30.0)
+    second.detect(ctx)
+
+    # 2つ目の解析器は1つ目が変換した RGB をそのまま使う
+    assert seen[0] is seen[1] and seen[0].shape == (360, 640, 3)
+    assert s_ctx["points"] == PoseAnalyzer(inference_width=640).process(frame, 30.0)["points"]
+
+
+def test_interpolate_landmarks_midpoint_and_missing():
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    analyzer = PoseAnalyzer()
+    a = analyzer.detect(frame)
+    b = analyzer.detect(frame)
+    mid = interpolate_landmarks(a, b, 0.5)
+    for la, lb, lm in zip(a.landmark, b.landmark, mid.landmark):
+        assert abs(lm.x - (la.x + lb.x) / 2) < 1e-9
+        assert abs(lm.visibility - (la.visibility + lb.visibility) / 2) < 1e-9
+    assert interpolate_landmarks(None, b, 0.25) is None
+    assert interpolate_landmarks(None, b, 0.75) is b
+    state = analyzer.process_landmarks(frame.shape, mid, 30.0)
+    assert len(state["points"]) == 33 and state["raw_landmarks"] is not None
+
+
+def test_landmarks_as_array_matches_attribute_loop():
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    analyzer = PoseAnalyzer()
+    a = analyzer.detect(frame)
+    mid = interpolate_landmarks(a, analyzer.detect(frame), 0.5)
+    # 実 MediaPipe の結果は as_array を持たないので、補間結果だけを確かめる
+    for landmarks in ((a, mid) if hasattr(a, "as_array") else (mid,)):
+        loop = np.array([(lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks.landmark], np.float64)
+        assert landmarks.as_array().shape == (33, 4)
+        assert np.array_equal(landmarks.as_array(), loop)
+
+def test_points_xy_matches_points():
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    state = PoseAnalyzer().process(frame, 30.0)
+    xy = state["points_xy"]
+    assert xy.shape == (33, 2)
+    for p, row in zip(state["points"], xy):
+        if p is None:
+            assert np.isnan(row).all()
+        else:
+            assert tuple(row.astype(int)) == p
+    assert state["xy"].dtype == np.int16 and state["valid"].dtype == bool
+    assert state["valid"].tolist() == [p is not None for p in state["points"]]
+    assert [tuple(r) for r in state["xy"][state["valid"]].tolist()] == [p for p in state["points"] if p is not None]
+
+
+def test_right_wrist_path_keeps_latest_points_in_order():
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    analyzer = PoseAnalyzer(max_path_len=4)
+    landmarks = analyzer.detect(frame)
+    lm = landmarks.landmark[16]  # RIGHT_WRIST
+    lm.visibility = 1.0
+    expected = []
+    for i in range(6):
+        lm.x, lm.y = (10 + i) / 320, (20 + i) / 240
+        state = analyzer.process_landmarks(frame.shape, landmarks, 30.0)
+        expected.append(state["points"][16])
+    assert state["right_wrist_path"].tolist() == [list(p) for p in expected[-4:]]
+    # state の軌跡はスナップショットなので、その後の更新の影響を受けない
+    analyzer.process_landmarks(frame.shape, landmarks, 30.0)
+    assert state["right_wrist_path"].tolist() == [list(p) for p in expected[-4:]]
+
+
+def test_process_stream_matches_frame_by_frame():
+    frames = [np.full((240, 320, 3), i * 20, dtype=np.uint8) for i in range(5)]
+
+    class _Cap:
+        def __init__(self):
+            self._it = iter(frames)
+
+        def read(self):
+            frame = next(self._it, None)
+            return frame is not None, frame
+
+    expected = PoseAnalyzer()
+    got = list(PoseAnalyzer().process_stream(_Cap(), 30.0))
+    assert [f is src for (f, _), src in zip(got, frames)] == [True] * len(frames)
+    for (_, state), frame in zip(got, frames):
+        assert state["points"] == expected.process(frame, 30.0)["points"]
+        assert np.array_equal(state["velocities"], expected.velocities)
+
+
+def test_render_methods_allocate_unless_out_is_given():
+    frame = np.full((240, 320, 3), 40, dtype=np.uint8)
+    analyzer = PoseAnalyzer()
+    state = analyzer.process(frame, 30.0)
+
+    for render, args in ((analyzer.render_heatmap, (frame, state)),
+                         (analyzer.render_stickman, (frame.shape, state)),
+                         (analyzer.render_stickman_rgba, (frame.shape, state))):
+        first = render(*args)
+        kept = first.copy()
+        second = render(*args)
+        assert second is not first  # 既定では呼び出しごとに新しい配列を返す
+        assert np.array_equal(first, kept)
+        out = np.empty_like(first)
+        assert render(*args, out=out) is out
+        assert np.array_equal(out, kept)
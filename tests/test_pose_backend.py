@@ -0,0 +1,131 @@
+"""
+test_pose_backend.py - MediaPipe Tasks バッチ投入のテスト（mediapipe はフェイクで差し替える）
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from jva import pose_backend
+
+
+class FakeLandmarker:
+    """detect_async を受けると即座にコールバックを呼ぶ。drop に含まれる投入番号は間引く"""
+
+    def __init__(self, callback, drop=()):
+        self.callback = callback
+        self.drop = set(drop)
+        self.calls = 0
+        self.closed = False
+
+    def detect_async(self, image, timestamp_ms):
+        n = self.calls
+        self.calls += 1
+        if n in self.drop:
+            return
+        lm = SimpleNamespace(x=n / 10, y=0.5, z=0.0, visibility=1.0)
+        self.callback(SimpleNamespace(pose_landmarks=[[lm] * 33]), image, timestamp_ms)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeBaseOptions(SimpleNamespace):
+    Delegate = SimpleNamespace(CPU="cpu", GPU="gpu")
+
+
+def _fake_mp(monkeypatch, drop=(), gpu=True):
+    created = {}
+
+    def create_from_options(options):
+        if options.base_options.delegate == "gpu" and not gpu:
+            raise RuntimeError("no OpenGL context")
+        created["delegate"] = options.base_options.delegate
+        created["landmarker"] = FakeLandmarker(options.result_callback, drop)
+        return created["landmarker"]
+
+    vision = SimpleNamespace(
+        PoseLandmarkerOptions=lambda **kw: SimpleNamespace(**kw),
+        RunningMode=SimpleNamespace(LIVE_STREAM="live"),
+        PoseLandmarker=SimpleNamespace(create_from_options=create_from_options),
+    )
+    fake = SimpleNamespace(
+        tasks=SimpleNamespace(vision=vision, BaseOptions=FakeBaseOptions),
+        Image=lambda image_format, data: data,
+        ImageFormat=SimpleNamespace(SRGB="srgb"),
+    )
+    monkeypatch.setattr(pose_backend, "mp", fake)
+    return created
+
+
+def test_tasks_backend_requires_model_path(monkeypatch):
+    _fake_mp(monkeypatch)
+    assert pose_backend.PoseBackend(use_tasks=True).init(30.0) is None
+
+
+def test_detect_batch_returns_results_in_order_and_holds_dropped(monkeypatch):
+    created = _fake_mp(monkeypatch, drop={2})
+    landmarker = pose_backend.PoseBackend(use_tasks=True, model_asset_path="pose.task").init(30.0)
+    frames = [np.zeros((8, 8, 3), np.uint8)] * 4
+    results = landmarker.detect_batch(frames, [0, 33, 66, 100])
+
+    xs = [r.landmark[0].x for r in results]
+    assert xs == [0.0, 0.1, 0.1, 0.3]  # 間引かれた3枚目は直前の結果で埋める
+    assert landmarker.dropped_frames == 1
+    assert len(results[0].landmark) == 33
+    landmarker.close()
+    assert created["landmarker"].closed
+
+
+def test_detect_batch_does_not_stall_when_last_frame_is_dropped(monkeypatch):
+    import time
+
+    _fake_mp(monkeypatch, drop={3})
+    landmarker = pose_backend.TasksBatchLandmarker("pose.task", timeout_s=5.0, idle_timeout_s=0.05)
+    frames = [np.zeros((8, 8, 3), np.uint8)] * 4
+    start = time.monotonic()
+    results = landmarker.detect_batch(frames, [0, 33, 66, 100])
+    assert time.monotonic() - start < 1.0  # timeout_s まで待たない
+    assert [r.landmark[0].x for r in results] == [0.0, 0.1, 0.2, 0.2]
+    assert landmarker._results == {}
+
+    # 返却済みのタイムスタンプに遅れて届いた結果は溜めない
+    landmarker._on_result(SimpleNamespace(pose_landmarks=[]), None, 100)
+    assert landmarker._results == {}
+
+
+def test_detect_batch_marks_dropped_frames_for_interpolation(monkeypatch):
+    _fake_mp(monkeypatch, drop={1, 2})
+    landmarker = pose_backend.TasksBatchLandmarker("pose.task", idle_timeout_s=0.05)
+    frames = [np.zeros((8, 8, 3), np.uint8)] * 4
+    results = landmarker.detect_batch(frames, [0, 33, 66, 100], hold_dropped=False)
+    assert results[1] is pose_backend.DROPPED and results[2] is pose_backend.DROPPED
+    assert [results[0].landmark[0].x, results[3].landmark[0].x] == [0.0, 0.3]
+    assert landmarker.dropped_frames == 2
+
+
+def test_detect_batch_forces_increasing_timestamps(monkeypatch):
+    _fake_mp(monkeypatch)
+    landmarker = pose_backend.PoseBackend(use_tasks=True, model_asset_path="pose.task").init(30.0)
+    frames = [np.zeros((8, 8, 3), np.uint8)] * 3
+    assert len(landmarker.detect_batch(frames, [5, 5, 5])) == 3
+    assert landmarker._last_submitted == 7
+
+
+def test_tasks_backend_prefers_gpu_delegate(monkeypatch):
+    created = _fake_mp(monkeypatch)
+    landmarker = pose_backend.PoseBackend(use_tasks=True, model_asset_path="pose.task").init(30.0)
+    assert created["delegate"] == "gpu" and landmarker.delegate == "gpu"
+
+
+def test_tasks_backend_falls_back_to_cpu_delegate(monkeypatch):
+    created = _fake_mp(monkeypatch, gpu=False)
+    landmarker = pose_backend.PoseBackend(use_tasks=True, model_asset_path="pose.task").init(30.0)
+    assert created["delegate"] == "cpu" and landmarker.delegate == "cpu"
+    assert len(landmarker.detect_batch([np.zeros((8, 8, 3), np.uint8)], [0])) == 1
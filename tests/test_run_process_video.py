@@ -0,0 +1,198 @@
+"""
+test_run_process_video.py - jva.run の動画処理フローのテスト
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from jva.run import load_config, process_video, process_video_multi
+from test_pipeline_visuals import create_dummy_video
+
+
+def _frame_count(path):
+    cap = cv2.VideoCapture(str(path))
+    n = 0
+    while cap.read()[0]:
+        n += 1
+    cap.release()
+    return n
+
+
+@pytest.fixture
+def job_dir(tmp_path):
+    (tmp_path / "input").mkdir()
+    (tmp_path / "output").mkdir()
+    (tmp_path / "report").mkdir()
+    total = create_dummy_video(str(tmp_path / "input" / "clip.mp4"), width=320, height=240, duration_sec=0.5)
+    return tmp_path, total
+
+
+def test_process_video_multi_fans_out_single_pass(job_dir):
+    job, total = job_dir
+    config = load_config(None)
+    config["output"] = {"export_landmarks": True, "landmarks_filename": "landmarks.json"}
+    outputs = [
+        (str(job / "output" / "a_skeleton.mp4"), {**config, "visuals": {"heatmap": True}}),
+        (str(job / "output" / "a_hud.mp4"), {**config, "visuals": {"hud": True}}),
+    ]
+
+    results = process_video_multi(str(job / "input" / "clip.mp4"), outputs, config)
+
+    assert results == [True, True]
+    for path, vcfg in outputs:
+        assert _frame_count(path) == total
+        report = json.loads(Path(path.replace(".mp4", "_report.json")).read_text(encoding="utf-8"))
+        assert report["enabled_passes"] == list(vcfg["visuals"])
+    landmarks = json.loads((job / "output" / "landmarks.json").read_text(encoding="utf-8"))
+    assert landmarks["frame_count"] == total
+    assert (job / "report" / "pose_landmarks.csv").exists()
+
+
+def test_process_video_missing_input(tmp_path):
+    assert process_video(str(tmp_path / "missing.mp4"), str(tmp_path / "out.mp4"), load_config(None)) is False
+
+
+def test_process_video_pose_stride_keeps_every_frame(job_dir):
+    job, total = job_dir
+    config = load_config(None)
+    config["performance"] = {"pose_stride": 4}
+    config["output"] = {"export_landmarks": True, "landmarks_filename": "landmarks.json"}
+    out = job / "output" / "strided.mp4"
+
+    assert process_video(str(job / "input" / "clip.mp4"), str(out), config) is True
+    assert _frame_count(out) == total
+    landmarks = json.loads((job / "output" / "landmarks.json").read_text(encoding="utf-8"))
+    assert [f["frame"] for f in landmarks["landmarks"]] == list(range(1, total + 1))
+
+
+def test_process_video_smart_skip_keeps_every_frame(job_dir, monkeypatch):
+    from src.pipelines.pose_analysis import PoseAnalyzer
+
+    job, total = job_dir
+    calls = []
+    detect = PoseAnalyzer.detect
+    monkeypatch.setattr(PoseAnalyzer, "detect", lambda self, frame: (calls.append(1), detect(self, frame))[1])
+    config = load_config(None)
+    config["performance"] = {"smart_skip": True, "smart_skip_thresh": 1e9, "smart_skip_max": 3}
+    config["output"] = {"export_landmarks": True, "landmarks_filename": "landmarks.json"}
+    out = job / "output" / "skipped.mp4"
+
+    assert process_video(str(job / "input" / "clip.mp4"), str(out), config) is True
+    assert _frame_count(out) == total
+    landmarks = json.loads((job / "output" / "landmarks.json").read_text(encoding="utf-8"))
+    assert [f["frame"] for f in landmarks["landmarks"]] == list(range(1, total + 1))
+    # 閾値が大きいので、最初と cooldown 以外は max_skip ごとにしか推論しない
+    assert len(calls) < total
+
+
+def test_process_video_reuses_given_analyzer(job_dir):
+    from jva.run import create_pose_analyzer
+
+    job, total = job_dir
+    config = load_config(None)
+    analyzer = create_pose_analyzer(config)
+    for name in ("first.mp4", "second.mp4"):
+        assert process_video(str(job / "input" / "clip.mp4"), str(job / "output" / name), config,
+                             analyzer=analyzer) is True
+        assert _frame_count(job / "output" / name) == total
+    # 呼び出し側が渡した analyzer は閉じられず、動画ごとの状態は reset 済みで始まる
+    assert analyzer.process(np.zeros((240, 320, 3), np.uint8), 30.0)["points"]
+    analyzer.reset()
+    assert analyzer.prev_xy is None and len(analyzer.right_wrist_path) == 0
+    analyzer.close()
+
+
+def test_deep_merge_keeps_sibling_keys():
+    from jva.run import deep_merge
+
+    base = {"output": {"export_landmarks": False, "landmarks_filename": "lm.json"}, "height_m": 1.8}
+    merged = deep_merge(base, {"output": {"export_landmarks": True}, "visuals": {"hud": True}})
+    assert merged == {
+        "output": {"export_landmarks": True, "landmarks_filename": "lm.json"},
+        "height_m": 1.8,
+        "visuals": {"hud": True},
+    }
+    assert base["output"]["export_landmarks"] is False
+
+
+def test_load_config_returns_independent_copies(tmp_path):
+    import os
+
+    path = tmp_path / "cfg.yaml"
+    path.write_text("visuals:\n  hud: true\n", encoding="utf-8")
+    first = load_config(str(path))
+    first["visuals"]["hud"] = False
+    assert load_config(str(path))["visuals"]["hud"] is True
+
+    # 更新されたファイルは読み直す
+    path.write_text("visuals:\n  hud: false\n", encoding="utf-8")
+    st = path.stat()
+    os.utime(path, (st.st_atime, st.st_mtime + 10))
+    assert load_config(str(path))["visuals"]["hud"] is False
+
+
+def test_process_video_multi_interpolates_frames_dropped_by_tasks_backend(job_dir, monkeypatch, caplog):
+    """Tasks バックエンドが間引いたフレームは前後の結果から補間し、枚数を1回だけ警告する"""
+    from types import SimpleNamespace
+    from jva import pose_backend
+
+    class FakeBatchLandmarker:
+        def __init__(self):
+            self.dropped_frames = 0
+            self.n = 0
+
+        def detect_batch(self, frames, stamps, hold_dropped=True):
+            out = []
+            for _ in frames:
+                self.n += 1
+                if self.n % 3 == 2:
+                    self.dropped_frames += 1
+                    out.append(pose_backend.DROPPED)
+                else:
+                    lm = SimpleNamespace(x=self.n / 32, y=0.5, z=0.0, visibility=1.0)
+                    out.append(SimpleNamespace(landmark=[lm] * 33))
+            return out
+
+        def close(self):
+            pass
+
+    fake = FakeBatchLandmarker()
+    monkeypatch.setattr(pose_backend.PoseBackend, "init", lambda self, fps: fake)
+    job, total = job_dir
+    config = load_config(None)
+    config["performance"] = {"pose_backend": "tasks", "pose_batch_size": 4}
+    config["output"] = {"export_landmarks": True, "landmarks_filename": "landmarks.json"}
+    out = str(job / "output" / "tasks.mp4")
+
+    with caplog.at_level("WARNING"):
+        assert process_video_multi(str(job / "input" / "clip.mp4"), [(out, config)], config) == [True]
+
+    assert _frame_count(out) == total
+    assert f"{fake.dropped_frames} frame(s) dropped" in caplog.text
+    assert caplog.text.count("dropped by the Tasks backend") == 1
+    landmarks = json.loads((job / "output" / "landmarks.json").read_text(encoding="utf-8"))
+    xs = [frame["landmarks"][0]["x"] for frame in landmarks["landmarks"]]
+    # 間引かれた 2, 5, 8... 枚目も前後の結果の中間（保持ではなく補間）になる
+    # （フェイクの x はフレーム番号 n で n / 32、幅 320 px なので補間結果も整数 px に乗る）
+    assert xs == pytest.approx([n / 32 for n in range(1, total + 1)])
+
+
+def test_importing_jva_run_leaves_blas_threads_alone():
+    """BLAS スレッド数は CLI の main() でだけ絞り、import しただけのプロセス（サーバー等）には触らない"""
+    import os
+    import subprocess
+
+    env = {k: v for k, v in os.environ.items() if k != "OPENBLAS_NUM_THREADS"}
+    code = "import os, jva.run; print(os.environ.get('OPENBLAS_NUM_THREADS'))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=project_root / "src", env=env,
+                         capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "None"
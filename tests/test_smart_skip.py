@@ -0,0 +1,70 @@
+"""
+test_smart_skip.py - SmartSkipper のテスト
+"""
+
+import math
+import sys
+from pathlib import Path
+
+import numpy as np
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from jva.smart_skip import SmartSkipper, _score_nb, _score_np
+
+
+def _pose(offset: float = 0.0):
+    pts = [(100.0 + i * 5 + offset, 200.0 + i * 3) for i in range(33)]
+    pts[3] = None
+    return pts
+
+
+def test_score_nb_ignores_missing_joints():
+    prev = np.zeros((3, 2), dtype=np.float32)
+    cur = np.array([[3, 4], [np.nan, np.nan], [0, 0]], dtype=np.float32)
+    assert math.isclose(_score_nb(cur, prev, 1), 12.5)
+    assert _score_nb(cur, np.full((3, 2), np.nan, np.float32), 1) == 0.0
+    # stride 2 samples joints 0 and 2 only
+    cur[1] = (100, 100)
+    assert math.isclose(_score_nb(cur, prev, 2), 12.5)
+
+
+def test_score_np_matches_score_nb():
+    rng = np.random.default_rng(0)
+    cur = rng.normal(size=(33, 2)).astype(np.float32) * 10
+    prev = rng.normal(size=(33, 2)).astype(np.float32) * 10
+    cur[[3, 9]] = np.nan
+    for stride in (1, 3):
+        assert math.isclose(_score_np(cur, prev, stride), _score_nb(cur, prev, stride), rel_tol=1e-5)
+    assert _score_np(cur, np.full((33, 2), np.nan, np.float32), 3) == 0.0
+
+
+def test_array_and_list_landmarks_score_the_same():
+    a, b = SmartSkipper(), SmartSkipper()
+    a.should_infer(_pose())
+    b.should_infer(np.array([p if p else (np.nan, np.nan) for p in _pose()], np.float32))
+    moved = _pose(offset=2.0)
+    assert a._score(moved) == b._score(moved) == 4.0
+
+
+def test_first_frame_and_empty_force_infer():
+    skipper = SmartSkipper()
+    assert skipper._score(_pose()) == math.inf
+    skipper._prev = _pose()
+    assert skipper._score([None] * 33) == math.inf
+
+
+def test_static_pose_is_skipped_up_to_max_skip():
+    skipper = SmartSkipper(pos_thresh=6.0, min_keep=1, max_skip=2)
+    decisions = [skipper.should_infer(_pose()) for _ in range(6)]
+    # 初回推論 → cooldown → 2回スキップ → 強制推論
+    assert decisions[:5] == [True, True, False, False, True]
+
+
+def test_motion_triggers_infer():
+    skipper = SmartSkipper(pos_thresh=6.0, min_keep=0)
+    skipper.should_infer(_pose())
+    assert skipper.should_infer(_pose(offset=0.5)) is False
+    assert skipper.should_infer(_pose(offset=10.0)) is True
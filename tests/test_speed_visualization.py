@@ -22,8 +22,8 @@ class TestSpeedVisualization(unittest.TestCase):
         # Check if the output frame has the same shape as the input frame
         self.assertEqual(output_frame.shape, self.frame.shape)
 
-        # Check if the output frame is not the same as the input frame
-        self.assertFalse(np.array_equal(output_frame, self.frame))
+        # Check that something was drawn on the all-zero input frame
+        self.assertTrue(output_frame.any())
 
     def test_color_mapping(self):
         # Test color mapping based on speed
@@ -33,5 +33,13 @@ class TestSpeedVisualization(unittest.TestCase):
         
         self.assertEqual(mapped_color, expected_color)
 
+    def test_color_mapping_vectorized(self):
+        # The array version agrees with the scalar mapping, boundaries included
+        colors = visualize_speed.map_speed_to_color_vec(self.speed_data, self.color_ranges)
+        self.assertEqual(colors.shape, (len(self.speed_data), 3))
+        for speed, color in zip(self.speed_data, colors):
+            self.assertEqual(tuple(color.tolist()), visualize_speed.map_speed_to_color(speed, self.color_ranges))
+        self.assertEqual(tuple(visualize_speed.map_speed_to_color_vec([-1.0], self.color_ranges)[0]), (0, 0, 0))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
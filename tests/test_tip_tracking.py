@@ -1,4 +1,10 @@
+import os
+import tempfile
 import unittest
+
+import cv2
+import numpy as np
+
 from src.pipelines.tip_tracking import track_javelin_tip
 from src.tracking.marker_based import marker_based_tracking
 from src.tracking.object_tracking import object_tracking
@@ -19,6 +25,20 @@ class TestTipTracking(unittest.TestCase):
         self.assertIsNotNone(result)
         self.assertTrue(len(result) > 0)
 
+    def test_object_tracking_runs_on_generated_clip(self):
+        # Plain opencv-python has no CSRT, so the default must still track (via the MIL fallback)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "clip.avi")
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 10, (160, 120))
+            for i in range(5):
+                frame = np.zeros((120, 160, 3), dtype=np.uint8)
+                cv2.rectangle(frame, (60 + 2 * i, 45), (90 + 2 * i, 70), (255, 255, 255), -1)
+                writer.write(frame)
+            writer.release()
+            result = object_tracking(path)
+        self.assertEqual(result.shape, (5, 4))
+        self.assertEqual(tuple(result[0]), (64, 48, 32, 24))
+
     def test_track_javelin_tip(self):
         result = track_javelin_tip(self.video_path)
         self.assertIsNotNone(result)
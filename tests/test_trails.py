@@ -12,8 +12,9 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from jva_visuals.trails import WristTrailPass, GlowTrailPass, TrailManager
+from jva_visuals.trails import WristTrailPass, GlowTrailPass, CombinedTrailPass, TrailManager
 from jva_visuals.adapters import AdaptedLandmarks
+from jva_visuals.registry import VisualPassRegistry
 
 
 @pytest.fixture
@@ -65,7 +66,7 @@ class TestWristTrailPass:
         result = trail_pass.apply(sample_frame, sample_landmarks)
         
         # 入力と同じフレームが返される
-        np.testing.assert_array_equal(result, sample_frame)
+        assert not result.any()  # sample_frame は全ゼロ
     
     def test_single_point_no_drawing(self, sample_frame, sample_landmarks):
         """1点のみの場合は描画されない"""
@@ -76,7 +77,7 @@ class TestWristTrailPass:
         
         # 軌跡点は追加されるが、線は描画されない（1点のみ）
         assert len(trail_pass.trail_points) == 1
-        np.testing.assert_array_equal(result, sample_frame)
+        assert not result.any()  # sample_frame は全ゼロ
     
     def test_multiple_points_drawing(self, sample_frame):
         """複数点での描画テスト"""
@@ -85,9 +86,9 @@ class TestWristTrailPass:
         
         # 複数の点を追加
         points_sequence = [
-            AdaptedLandmarks(np.zeros((33, 3)), (100, 100), 30.0, 0.01, (480, 640)),
-            AdaptedLandmarks(np.zeros((33, 3)), (120, 110), 30.0, 0.01, (480, 640)),
-            AdaptedLandmarks(np.zeros((33, 3)), (140, 120), 30.0, 0.01, (480, 640)),
+            AdaptedLandmarks.zeros((100, 100), 30.0, 0.01, (480, 640)),
+            AdaptedLandmarks.zeros((120, 110), 30.0, 0.01, (480, 640)),
+            AdaptedLandmarks.zeros((140, 120), 30.0, 0.01, (480, 640)),
         ]
         
         result = sample_frame.copy()
@@ -95,7 +96,7 @@ class TestWristTrailPass:
             result = trail_pass.apply(result, landmarks)
         
         # 軌跡が描画されているはず（フレームが変化している）
-        assert not np.array_equal(result, sample_frame)
+        assert result.any()
         assert len(trail_pass.trail_points) == 3
     
     def test_buffer_length_limit(self, sample_frame):
@@ -105,8 +106,8 @@ class TestWristTrailPass:
         
         # 3つの点を追加（制限は2）
         for i in range(3):
-            landmarks = AdaptedLandmarks(
-                np.zeros((33, 3)), (100 + i*10, 100), 30.0, 0.01, (480, 640)
+            landmarks = AdaptedLandmarks.zeros(
+                (100 + i*10, 100), 30.0, 0.01, (480, 640)
             )
             trail_pass.apply(sample_frame, landmarks)
         
@@ -115,14 +116,27 @@ class TestWristTrailPass:
         assert trail_pass.trail_points[0] == (110, 100)  # 最古が削除
         assert trail_pass.trail_points[1] == (120, 100)
     
+    def test_ring_buffer_wraps_in_order(self, sample_frame):
+        """リングバッファが折り返しても古い順に並ぶ"""
+        trail_pass = WristTrailPass({"enabled": True, "max_length": 3})
+        
+        for i in range(7):
+            landmarks = AdaptedLandmarks.zeros(
+                (100 + i*10, 100), 30.0, 0.01, (480, 640)
+            )
+            trail_pass.apply(sample_frame, landmarks)
+        
+        assert trail_pass.trail_points == [(140, 100), (150, 100), (160, 100)]
+        assert trail_pass._ordered().dtype == np.int32
+    
     def test_out_of_bounds_handling(self, sample_frame):
         """フレーム境界外の点の処理"""
         config = {"enabled": True}
         trail_pass = WristTrailPass(config)
         
         # フレーム外の点
-        out_of_bounds_landmarks = AdaptedLandmarks(
-            np.zeros((33, 3)), (1000, 1000), 30.0, 0.01, (480, 640)
+        out_of_bounds_landmarks = AdaptedLandmarks.zeros(
+            (1000, 1000), 30.0, 0.01, (480, 640)
         )
         
         result = trail_pass.apply(sample_frame, out_of_bounds_landmarks)
@@ -130,6 +144,21 @@ class TestWristTrailPass:
         # 境界外の点は追加されない
         assert len(trail_pass.trail_points) == 0
 
+    def test_apply_batch_matches_per_point_apply(self, sample_frame):
+        """apply_batch は境界外の点を除き、1点ずつ apply したのと同じ軌跡・描画になる"""
+        xs = np.array([-5, 100, 110, 700, 120, 130, 140])
+        ys = np.array([100, 100, 105, 100, 500, 110, 115])
+        per_point = WristTrailPass({"enabled": True, "max_length": 3})
+        batch = WristTrailPass({"enabled": True, "max_length": 3})
+
+        for x, y in zip(xs, ys):
+            landmarks = AdaptedLandmarks.zeros((x, y), 30.0, 1.0, (480, 640))
+            expected = per_point.apply(sample_frame, landmarks)
+        result = batch.apply_batch(sample_frame, xs, ys)
+
+        assert batch.trail_points == per_point.trail_points == [(110, 105), (130, 110), (140, 115)]
+        np.testing.assert_array_equal(result, expected)
+
 
 class TestGlowTrailPass:
     """光軌跡パステスト"""
@@ -165,8 +194,8 @@ class TestGlowTrailPass:
         ]
         
         for i, point in enumerate(points):
-            landmarks = AdaptedLandmarks(
-                np.zeros((33, 3)), point, 30.0, 0.01, (480, 640)
+            landmarks = AdaptedLandmarks.zeros(
+                point, 30.0, 0.01, (480, 640)
             )
             glow_pass.apply(sample_frame, landmarks)
         
@@ -191,8 +220,8 @@ class TestGlowTrailPass:
         
         result = sample_frame.copy()
         for point in points:
-            landmarks = AdaptedLandmarks(
-                np.zeros((33, 3)), point, 30.0, 0.01, (480, 640)
+            landmarks = AdaptedLandmarks.zeros(
+                point, 30.0, 0.01, (480, 640)
             )
             result = glow_pass.apply(result, landmarks)
         
@@ -291,8 +320,8 @@ def test_trail_visual_integration(sample_frame):
         x = 100 + i * 5
         y = 200 + int(10 * np.sin(i * 0.5))  # 波状軌跡
         
-        landmarks = AdaptedLandmarks(
-            np.zeros((33, 3)), (x, y), 30.0, 0.01, (480, 640)
+        landmarks = AdaptedLandmarks.zeros(
+            (x, y), 30.0, 0.01, (480, 640)
         )
         
         # 両方の軌跡を適用
@@ -300,13 +329,72 @@ def test_trail_visual_integration(sample_frame):
         result = glow_trail.apply(result, landmarks)
     
     # 何らかの描画がされているはず
-    assert not np.array_equal(result, sample_frame)
+    assert result.any()
     
     # 軌跡点が記録されている
     assert len(basic_trail.trail_points) == 10
     assert len(glow_trail.trail_points) == 10
 
 
+def test_combined_trail_matches_two_passes(sample_frame):
+    """CombinedTrailPass は基本軌跡 → 光軌跡を続けて適用したのと同じ結果を1パスで描く"""
+    basic_config = {"enabled": True, "thickness": 2, "max_length": 6}
+    glow_config = {"enabled": True, "glow_radius": 10, "speed_responsive": False, "max_length": 8}
+    basic_trail = WristTrailPass(basic_config)
+    glow_trail = GlowTrailPass(glow_config)
+    combined = CombinedTrailPass(basic_config, glow_config)
+
+    for i in range(12):
+        landmarks = AdaptedLandmarks.zeros(
+            (100 + i * 5, 200 + int(10 * np.sin(i * 0.5))), 30.0, 0.01, (480, 640)
+        )
+        expected = glow_trail.apply(basic_trail.apply(sample_frame, landmarks), landmarks)
+        result = combined.apply(sample_frame, landmarks)
+        np.testing.assert_array_equal(result, expected)
+
+    assert combined.trail_points[-8:] == glow_trail.trail_points
+
+
+def test_registry_fuses_trail_passes():
+    """wrist_trail と glow_trail の間に描くパスがなければ1つの CombinedTrailPass にまとめる"""
+    passes = VisualPassRegistry.build_from_config({"wrist_trail": True, "glow_trail": True})
+    assert [type(p).__name__ for p in passes] == ["CombinedTrailPass"]
+
+    # 間に別のパスがあると重なり順が変わるのでまとめない
+    passes = VisualPassRegistry.build_from_config({"wrist_trail": True, "glow_trail": True, "vectors": True})
+    assert [type(p).__name__ for p in passes] == ["WristTrailPass", "VectorPass", "GlowTrailPass"]
+
+    passes = VisualPassRegistry.build_from_config({"wrist_trail": True, "glow_trail": True, "fuse_trails": False})
+    assert [type(p).__name__ for p in passes] == ["WristTrailPass", "GlowTrailPass"]
+
+
+@pytest.mark.parametrize("extra", [{}, {"vectors": True, "hud": True}])
+def test_fused_trails_pipeline_matches_unfused(extra):
+    """fuse_trails の既定でも、2パスに分けた場合と同じフレームが描かれる（他のパスがあっても）"""
+    from jva_visuals.registry import VisualPipeline
+
+    base = {"wrist_trail": True, "glow_trail": True,
+            "glow_trail_cfg": {"speed_responsive": False}, **extra}
+    default = VisualPipeline(VisualPassRegistry.build_from_config(dict(base)))
+    unfused = VisualPipeline(VisualPassRegistry.build_from_config({**base, "fuse_trails": False}))
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    points = [None] * 33
+    for i in range(20):
+        for j in (11, 12, 13, 14, 15, 16, 23, 24):
+            points[j] = (200 + 10 * i + 5 * j, 150 + 4 * j + (i % 3))
+        state = {"points": list(points)}
+        expected = unfused.apply_all(frame, state, fps=30.0)
+        result = default.apply_all(frame, state, fps=30.0)
+        np.testing.assert_array_equal(result, expected)
+    assert result.any()
+
+
+# test_trail_style_variations の短い軌跡。パラメータごとに作り直さずに共有する
+# （パスはランドマークを読むだけで書き換えない）
+_STYLE_POINTS = ((100, 100), (120, 110), (140, 120))
+_STYLE_LANDMARKS = tuple(AdaptedLandmarks.zeros(p, 30.0, 0.01, (480, 640)) for p in _STYLE_POINTS)
+
+
 @pytest.mark.parametrize("thickness,color", [
     (1, (255, 0, 0)),    # 赤、細線
     (3, (0, 255, 0)),    # 緑、太線
@@ -323,14 +411,9 @@ def test_trail_style_variations(sample_frame, thickness, color):
     
     trail_pass = WristTrailPass(config)
     
-    # 短い軌跡を作成
-    points = [(100, 100), (120, 110), (140, 120)]
-    
+    # 短い軌跡（モジュール共通の入力を使い回す）
     result = sample_frame.copy()
-    for point in points:
-        landmarks = AdaptedLandmarks(
-            np.zeros((33, 3)), point, 30.0, 0.01, (480, 640)
-        )
+    for landmarks in _STYLE_LANDMARKS:
         result = trail_pass.apply(result, landmarks)
     
     # スタイル設定が反映されている
@@ -338,7 +421,7 @@ def test_trail_style_variations(sample_frame, thickness, color):
     assert trail_pass.color == color
     
     # 描画されている
-    assert not np.array_equal(result, sample_frame)
+    assert result.any()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,126 @@
+"""
+test_video_reader.py - 動画読み込みのテスト
+"""
+
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from src.io.video_reader import PYAV_AVAILABLE, PyAVReader, open_video_capture
+from test_pipeline_visuals import create_dummy_video
+
+
+@pytest.fixture
+def clip(tmp_path):
+    path = tmp_path / "clip.mp4"
+    total = create_dummy_video(str(path), width=320, height=240, duration_sec=0.5)
+    return str(path), total
+
+
+def _read_all(cap):
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def test_open_video_capture_reads_all_frames(clip):
+    path, total = clip
+    cap = open_video_capture(path)
+    assert cap.isOpened()
+    assert int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) == 320
+    frames = _read_all(cap)
+    assert len(frames) == total
+    assert frames[0].shape == (240, 320, 3)
+
+
+@pytest.mark.skipif(not PYAV_AVAILABLE, reason="PyAV not installed")
+def test_pyav_reader_matches_opencv(clip):
+    path, total = clip
+    reader = PyAVReader(path)
+    assert reader.get(cv2.CAP_PROP_FPS) == pytest.approx(30.0)
+    av_frames = _read_all(reader)
+    cv_frames = _read_all(cv2.VideoCapture(path))
+    assert len(av_frames) == len(cv_frames) == total
+    assert np.abs(av_frames[5].astype(int) - cv_frames[5]).mean() < 1.0
+
+
+def test_cuda_request_falls_back_without_gpu(clip):
+    from src.io.video_reader_cuda import cuda_decode_available
+
+    if cuda_decode_available():
+        pytest.skip("CUDA decode is available")
+    path, total = clip
+    frames = _read_all(open_video_capture(path, cuda=True))
+    assert len(frames) == total
+
+
+@pytest.mark.parametrize("prefetch", [0, 4])
+def test_video_reader_prefetch_returns_frames_in_order(clip, prefetch):
+    from src.io.video_reader import VideoReader
+
+    path, total = clip
+    expected = _read_all(cv2.VideoCapture(path))
+    reader = VideoReader(path, prefetch=prefetch)
+    frames = []
+    while (frame := reader.read_frame()) is not None:
+        frames.append(frame)
+    assert reader.read_frame() is None
+    reader.release()
+    assert len(frames) == total
+    assert all(np.array_equal(a, b) for a, b in zip(frames, expected))
+
+
+def test_video_reader_release_while_prefetching(clip):
+    from src.io.video_reader import VideoReader
+
+    path, _ = clip
+    reader = VideoReader(path, prefetch=2)
+    assert reader.read_frame() is not None
+    reader.release()
+
+
+def test_video_reader_reraises_decode_error_after_buffered_frames(clip, monkeypatch):
+    """デコード途中の例外は EOF 扱いにせず、先読み済みフレームを返し切った後に read_frame で再送出する"""
+    from src.io import video_reader
+
+    real_capture = cv2.VideoCapture
+
+    class BrokenCapture:
+        def __init__(self, path):
+            self._cap = real_capture(path)
+            self._reads = 0
+
+        def isOpened(self):
+            return self._cap.isOpened()
+
+        def read(self):
+            if self._reads == 3:
+                raise RuntimeError("corrupt packet")
+            self._reads += 1
+            return self._cap.read()
+
+        def release(self):
+            self._cap.release()
+
+    monkeypatch.setattr(video_reader.cv2, "VideoCapture", BrokenCapture)
+    path, _ = clip
+    reader = video_reader.VideoReader(path, prefetch=8)
+    try:
+        for _ in range(3):
+            assert reader.read_frame() is not None
+        with pytest.raises(RuntimeError, match="corrupt packet"):
+            reader.read_frame()
+    finally:
+        reader.release()
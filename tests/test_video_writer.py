@@ -0,0 +1,126 @@
+"""
+test_video_writer.py - 動画書き出しのテスト
+"""
+
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from src.io.video_writer import FFmpegPipeWriter, VideoWriter, open_video_writer
+from src.jva import ffmpeg_io
+from src.jva.ffmpeg_io import have_ffmpeg, select_encoder
+
+
+def _write_and_count(writer, path, n=10):
+    for i in range(n):
+        frame = np.full((120, 160, 3), i * 20, dtype=np.uint8)
+        writer.write(frame)
+    writer.release()
+    cap = cv2.VideoCapture(str(path))
+    count = 0
+    while cap.read()[0]:
+        count += 1
+    cap.release()
+    return count
+
+
+def test_open_video_writer_produces_readable_mp4(tmp_path):
+    path = tmp_path / "out.mp4"
+    writer = open_video_writer(str(path), 160, 120, 30.0)
+    assert writer is not None
+    assert _write_and_count(writer, path) == 10
+
+
+def test_open_video_writer_uses_cv2_for_odd_size(tmp_path, monkeypatch):
+    """奇数サイズは ffmpeg パイプ（yuv420p）を使わず cv2 で書き出す"""
+    from src.io import video_writer
+
+    def _no_pipe(*args, **kwargs):
+        raise AssertionError("FFmpegPipeWriter must not be used for odd frame sizes")
+
+    monkeypatch.setattr(video_writer, "have_ffmpeg", lambda: True)
+    monkeypatch.setattr(video_writer, "FFmpegPipeWriter", _no_pipe)
+    path = tmp_path / "odd.mp4"
+    writer = open_video_writer(str(path), 161, 121, 30.0)
+    assert isinstance(writer, cv2.VideoWriter)
+    for i in range(10):
+        writer.write(np.full((121, 161, 3), i * 20, dtype=np.uint8))
+    writer.release()
+    cap = cv2.VideoCapture(str(path))
+    count = 0
+    while cap.read()[0]:
+        count += 1
+    cap.release()
+    assert count == 10
+
+
+@pytest.mark.parametrize("name", ["out.mp4", "out.avi"])
+def test_video_writer_picks_codec_from_suffix(tmp_path, name):
+    path = tmp_path / name
+    writer = VideoWriter(str(path), 160, 120, 30.0)
+    assert writer.isOpened()
+    assert (writer.fourcc is None) == (name.endswith(".mp4"))
+    for i in range(10):
+        writer.write_frame(np.full((120, 160, 3), i * 20, dtype=np.uint8))
+    writer.release()
+    cap = cv2.VideoCapture(str(path))
+    count = 0
+    while cap.read()[0]:
+        count += 1
+    cap.release()
+    assert count == 10
+
+
+@pytest.mark.skipif(not have_ffmpeg(), reason="ffmpeg not installed")
+def test_ffmpeg_pipe_writer(tmp_path):
+    path = tmp_path / "pipe.mp4"
+    writer = FFmpegPipeWriter(str(path), 160, 120, 30.0, codec="libx264", extra_args=["-preset", "ultrafast"])
+    assert writer.isOpened()
+    assert _write_and_count(writer, path) == 10
+
+
+@pytest.mark.skipif(not have_ffmpeg(), reason="ffmpeg not installed")
+def test_ffmpeg_pipe_writer_rejects_wrong_size(tmp_path):
+    writer = FFmpegPipeWriter(str(tmp_path / "bad.mp4"), 160, 120, 30.0, codec="libx264")
+    with pytest.raises(ValueError):
+        writer.write(np.zeros((100, 100, 3), dtype=np.uint8))
+    writer.release()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="uses a POSIX shell script as fake ffmpeg")
+def test_ffmpeg_pipe_writer_does_not_stall_on_verbose_stderr(tmp_path, monkeypatch, caplog):
+    """stderr を大量に出す ffmpeg でも書き込みが詰まらず、終了時にエラー内容をログに残す"""
+    from src.io import video_writer
+    fake = tmp_path / "fake_ffmpeg"
+    fake.write_text(
+        "#!/bin/sh\n"
+        "head -c 262144 /dev/zero | tr '\\0' x >&2\n"
+        "echo 'fake encoder failed' >&2\n"
+        "cat > /dev/null\n"
+        "exit 1\n"
+    )
+    fake.chmod(0o755)
+    monkeypatch.setattr(video_writer, "FFMPEG", str(fake))
+    writer = FFmpegPipeWriter(str(tmp_path / "out.mp4"), 160, 120, 30.0, codec="libx264")
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    for _ in range(30):
+        writer.write(frame)
+    with caplog.at_level("ERROR", logger=video_writer.__name__):
+        writer.release()
+    assert "fake encoder failed" in caplog.text
+
+
+def test_select_encoder_realtime_uses_fast_x264_preset(monkeypatch):
+    monkeypatch.setattr(ffmpeg_io, "_detect_hw_encoder", lambda: ("libx264", ["-preset", "medium"]))
+    assert select_encoder() == ("libx264", ["-preset", "medium"])
+    codec, args = select_encoder(realtime=True)
+    assert codec == "libx264"
+    assert args[args.index("-preset") + 1] == "veryfast"
+    assert "-threads" in args